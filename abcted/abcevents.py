@@ -0,0 +1,777 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Turn a raw ABC tune into the timed notes of the tune
+
+The notes of a tune are stored in columns (see TuneEvents): one compact
+array per note attribute (pitch, onset, duration, ...) instead of one Python
+object per note.  Jobs that process whole tunebooks (analysis,
+transposition, MIDI export) then use little memory and can work on a column
+at a time.
+
+Time is measured in MIDI ticks, TICKS_PER_QUARTER ticks per quarter note.
+
+The events take into account: the key signature (K: fields and inline
+fields), accidentals (they apply to the notes of the same pitch until the end
+of the bar), the default note length (L:, or derived from the meter M:), note
+lengths, broken rhythms ('>' and '<'), chords, ties, tuplets, rests, voices
+(V:, one MIDI channel per voice) and dynamics (eg '!mf!').
+
+The notes are in source order: repeats and variant endings are recorded
+with the bars, unfold_repeats() gives the notes in playing order.  Grace
+notes are ignored.
+
+The tempo changes (Q: fields and inline fields) give a tempo map (see
+TempoMap) to convert ticks to seconds and back, and the bars give a bar index
+(see BarIndex) to convert ticks to positions in the text and back.
+"""
+
+from array import array
+from bisect import bisect_right
+import functools
+import re
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from abcparser import AbcParser, AbcParserException, DEFAULT_TEMPO_QPM
+import abctokenizer
+import musictheory
+
+
+TICKS_PER_QUARTER = 480
+WHOLE_NOTE_TICKS = 4 * TICKS_PER_QUARTER
+
+DEFAULT_VELOCITY = 80
+
+# Velocity of the dynamics decorations (same values as abc2midi)
+DYNAMICS = {'pppp': 30, 'ppp': 30, 'pp': 45, 'p': 60, 'mp': 75,
+            'mf': 90, 'f': 105, 'ff': 120, 'fff': 127, 'ffff': 127}
+
+# Repeat flags of a bar
+START_REPEAT = 1  # The bar starts with '|:'
+END_REPEAT = 2    # The bar ends with ':|'
+
+PERCUSSION_CHANNEL = 9  # Not used for the voices
+MAX_CHANNEL = 15
+
+
+class TuneEvents:
+    """The notes of a tune, in columns
+
+    The note i has the pitch pitch[i], starts at onset[i], etc.  The notes
+    are in source order, not necessarily in onset order (eg with several
+    voices).
+    """
+
+    def __init__(self):
+        self.pitch = array('B')     # MIDI note number
+        self.onset = array('i')     # Start of the note (ticks)
+        self.duration = array('i')  # Duration of the note (ticks)
+        self.velocity = array('B')  # MIDI velocity
+        self.channel = array('B')   # MIDI channel, one per voice
+        self.bar = array('i')       # Index of the bar of the note in its voice
+        self.offset = array('i')    # Offset of the note in the raw tune text
+
+        # Bars of the first voice: onset and offset in the raw tune text of
+        # the beginning of each bar, repeat flags (START_REPEAT, END_REPEAT)
+        # and variant ending (the passes where the bar is played, None if
+        # the bar is always played)
+        self.bar_onsets = array('i')
+        self.bar_offsets = array('i')
+        self.bar_repeats = array('B')
+        self.bar_variants: List[Optional[FrozenSet[int]]] = []
+
+        self.meter: Optional[Tuple[int, int]] = None  # Meter of the tune header
+        self.tempos: List[Tuple[int, float]] = []  # (tick, quarter notes per minute)
+        self.end_tick = 0  # End of the last note or rest
+
+    def __len__(self):
+        return len(self.pitch)
+
+    def get_tempo_map(self) -> 'TempoMap':
+        """Return the tempo map of the tune, see TempoMap"""
+        return TempoMap(self.tempos)
+
+    def get_bar_index(self, raw_tune: Iterable[str], first_line_no: int = 1) -> 'BarIndex':
+        """Return the bar index of the tune, see BarIndex
+
+        Args:
+            raw_tune: lines of raw ABC text of the tune, as given to
+                parse_events()
+            first_line_no: line number of the first line of the tune
+        """
+        return BarIndex(self, raw_tune, first_line_no)
+
+    def append(self, pitch: int, onset: int, duration: int, velocity: int,
+               channel: int, bar: int, offset: int):
+        self.pitch.append(pitch)
+        self.onset.append(onset)
+        self.duration.append(duration)
+        self.velocity.append(velocity)
+        self.channel.append(channel)
+        self.bar.append(bar)
+        self.offset.append(offset)
+
+    def notes(self) -> Iterator[Tuple[int, int, int, int, int, int, int]]:
+        """Iterate over the notes as tuples (pitch, onset, duration,
+        velocity, channel, bar, offset)"""
+        return zip(self.pitch, self.onset, self.duration, self.velocity,
+                   self.channel, self.bar, self.offset)
+
+    def transpose(self, semitones: int):
+        """Transpose all the notes (the pitches are kept in the MIDI range)"""
+        self.pitch = array('B', [min(max(pitch + semitones, 0), 127)
+                                 for pitch in self.pitch])
+
+    def _add_bar(self, onset: int, offset: int, repeats: int,
+                 variant: Optional[FrozenSet[int]]):
+        self.bar_onsets.append(onset)
+        self.bar_offsets.append(offset)
+        self.bar_repeats.append(repeats)
+        self.bar_variants.append(variant)
+
+    def get_bar_order(self) -> List[int]:
+        """Return the indexes of the bars in playing order
+
+        A repeated section is played twice, or more if it has variant
+        endings for more passes (eg '|1-3').
+        """
+        bar_count = len(self.bar_onsets)
+        all_passes = set()
+        for passes in self.bar_variants:
+            if passes is not None:
+                all_passes |= passes
+
+        order = []
+        i = 0
+        section_start = 0  # First bar of the section being repeated
+        pass_no = 1
+        repeat_end = -1     # Last end of repeat seen
+        while i < bar_count:
+            passes = self.bar_variants[i]
+            if pass_no > 1 and i > repeat_end and passes is None:
+                pass_no = 1  # After a repeated section and its variant endings
+                section_start = i
+            if pass_no == 1 and self.bar_repeats[i] & START_REPEAT:
+                section_start = i
+            if passes is not None and pass_no not in passes:
+                i += 1
+                continue
+            order.append(i)
+            if self.bar_repeats[i] & END_REPEAT \
+                    and (pass_no == 1 or (passes is not None and pass_no + 1 in all_passes)) \
+                    and pass_no < 10:
+                repeat_end = max(repeat_end, i)
+                pass_no += 1
+                i = section_start
+                continue
+            i += 1
+        return order
+
+    def unfold_repeats(self) -> 'TuneEvents':
+        """Return the notes in playing order, with the repeats unfolded
+
+        In the result, the bar index of a note is its index in playing
+        order; the source offsets still give the position of the notes in
+        the raw tune.
+        """
+        order = self.get_bar_order()
+        if order == list(range(len(self.bar_onsets))):
+            return self
+
+        notes_by_bar: Dict[int, List[int]] = {}
+        for i, bar in enumerate(self.bar):
+            notes_by_bar.setdefault(bar, []).append(i)
+        bar_ends = self.bar_onsets[1:] + array('i', (self.end_tick,))
+
+        unfolded = TuneEvents()
+        unfolded.meter = self.meter
+        time = 0
+        for played_bar, bar in enumerate(order):
+            start = self.bar_onsets[bar]
+            shift = time - start
+            for i in notes_by_bar.get(bar, ()):
+                unfolded.append(self.pitch[i], self.onset[i] + shift, self.duration[i],
+                                self.velocity[i], self.channel[i], played_bar,
+                                self.offset[i])
+            for tick, qpm in self.tempos:
+                if start <= tick < bar_ends[bar] or (tick == start == bar_ends[bar]):
+                    unfolded.tempos.append((tick + shift, qpm))
+            unfolded._add_bar(time, self.bar_offsets[bar], 0, None)
+            time += bar_ends[bar] - start
+        unfolded.end_tick = time
+        return unfolded
+
+
+class TempoMap:
+    """Conversion between ticks and seconds for a tune with tempo changes
+
+    The tempo map is a sorted list of breakpoints: the tick and the time (in
+    seconds) of each tempo change.  A conversion is a bisection in the
+    breakpoints followed by a linear conversion at the tempo of the
+    breakpoint.  Before the first tempo change, the tempo is
+    DEFAULT_TEMPO_QPM (as in the MIDI files, see midi_writer.py).
+    """
+
+    def __init__(self, tempos: Iterable[Tuple[int, float]]):
+        """
+        Args:
+            tempos: tempo changes (tick, quarter notes per minute), eg
+                TuneEvents.tempos; with several changes at the same tick, the
+                last one wins
+        """
+        self.ticks = array('i', (0,))      # Tick of each breakpoint
+        self.seconds = array('d', (0.0,))  # Time of each breakpoint
+        self.qpms = [DEFAULT_TEMPO_QPM]    # Tempo from each breakpoint
+        for tick, qpm in sorted(tempos, key=lambda tempo: tempo[0]):
+            if tick == self.ticks[-1]:
+                self.qpms[-1] = qpm
+                continue
+            self.seconds.append(self.tick_to_seconds(tick))
+            self.ticks.append(tick)
+            self.qpms.append(qpm)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def get_qpm(self, tick: int) -> float:
+        """Tempo at a tick, in quarter notes per minute"""
+        return self.qpms[max(bisect_right(self.ticks, tick) - 1, 0)]
+
+    def tick_to_seconds(self, tick: int) -> float:
+        """Time of a tick from the beginning of the tune, in seconds"""
+        i = max(bisect_right(self.ticks, tick) - 1, 0)
+        return self.seconds[i] + (tick - self.ticks[i]) * 60 / (self.qpms[i] * TICKS_PER_QUARTER)
+
+    def seconds_to_tick(self, seconds: float) -> int:
+        """Tick at a time from the beginning of the tune (rounded to the
+        nearest tick)"""
+        i = max(bisect_right(self.seconds, seconds) - 1, 0)
+        return self.ticks[i] + round((seconds - self.seconds[i])
+                                     * self.qpms[i] * TICKS_PER_QUARTER / 60)
+
+
+class BarIndex:
+    """Conversion between the ticks of a tune and the positions of its bars
+    in the text
+
+    A position is a (line number, column) pair, eg for a tkinter text index
+    '<line>.<col>'.  The position of a bar is the position just after the
+    bar line that starts it (the first note of the tune for the first bar).
+
+    The index is built from the notes in playing order (see
+    TuneEvents.unfold_repeats()), so that the ticks are the ticks of the
+    MIDI file of the tune.  A conversion is a bisection: in the onsets of
+    the bars (tick -> position), or in the positions of the bars in source
+    order (position -> tick).
+    """
+
+    def __init__(self, events: TuneEvents, raw_tune: Iterable[str], first_line_no: int = 1):
+        """
+        Args:
+            events: the notes of the tune in playing order
+            raw_tune: lines of raw ABC text of the tune
+            first_line_no: line number of the first line of the tune
+        """
+        self._first_line_no = first_line_no
+        self._line_offsets = array('i')  # Offset of each line in the raw tune
+        offset = 0
+        for line in raw_tune:
+            self._line_offsets.append(offset)
+            offset += len(line) + 1
+        self._end_offset = max(offset - 1, 0)
+
+        # Bars in playing order: onset (increasing) and offset.  The first
+        # bar starts at the beginning of the tune: it is moved to its first
+        # note, so that it does not include the header.
+        played_offsets = events.bar_offsets
+        if len(events) and 0 in events.bar_offsets:
+            first_offset = min(events.offset)
+            played_offsets = array('i', (first_offset if offset == 0 else offset
+                                         for offset in events.bar_offsets))
+
+        # Bars in source order: offset (increasing) and first onset, ie the
+        # onset of the first pass of a repeated bar
+        first_onsets = {}
+        for onset, offset in zip(events.bar_onsets, played_offsets):
+            first_onsets.setdefault(offset, onset)
+        self.offsets = array('i', sorted(first_onsets))
+        self.first_onsets = array('i', (first_onsets[offset] for offset in self.offsets))
+
+        # The bars after the end of the tune are empty (eg after the last bar
+        # line): they are not played.  They stay in source order, where they
+        # end the last bar played.
+        bar_count = len(events.bar_onsets)
+        while bar_count > 1 and events.bar_onsets[bar_count - 1] >= events.end_tick:
+            bar_count -= 1
+        self.onsets = events.bar_onsets[:bar_count]
+        self._played_offsets = played_offsets[:bar_count]
+
+    def __len__(self):
+        """Number of bars in playing order"""
+        return len(self.onsets)
+
+    def get_bar(self, tick: int) -> int:
+        """Index (in playing order) of the bar played at a tick"""
+        return max(bisect_right(self.onsets, tick) - 1, 0)
+
+    def get_position(self, tick: int) -> Tuple[int, int]:
+        """Position of the start of the bar played at a tick"""
+        return self._offset_to_position(self._played_offsets[self.get_bar(tick)])
+
+    def get_bar_range(self, tick: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """Positions of the start and of the end of the bar played at a tick"""
+        return self.get_bar_range_at(self.get_bar(tick))
+
+    def get_bar_range_at(self, bar: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """Positions of the start and of the end of a bar, see get_bar()"""
+        offset = self._played_offsets[bar]
+        i = bisect_right(self.offsets, offset)
+        end_offset = self.offsets[i] if i < len(self.offsets) else self._end_offset
+        return self._offset_to_position(offset), self._offset_to_position(end_offset)
+
+    def get_tick(self, line_no: int, col: int) -> int:
+        """Onset of the bar at a position (of its first pass if it is
+        repeated)"""
+        line_index = line_no - self._first_line_no
+        if line_index < 0 or not self._line_offsets:
+            return 0
+        line_index = min(line_index, len(self._line_offsets) - 1)
+        i = bisect_right(self.offsets, self._line_offsets[line_index] + col) - 1
+        return self.first_onsets[max(i, 0)]
+
+    def _offset_to_position(self, offset: int) -> Tuple[int, int]:
+        line_index = max(bisect_right(self._line_offsets, offset) - 1, 0)
+        return (self._first_line_no + line_index,
+                offset - (self._line_offsets[line_index] if self._line_offsets else 0))
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_note(note: str) -> Tuple[Optional[str], str, int, int, int]:
+    """Split a NOTE token into (accidental or None, letter, octave shift,
+    length numerator, length denominator)"""
+    accidental, letter, octave, length = abctokenizer.split_note(note)
+    num, den = parse_length(length)
+    return (accidental or None, letter, octave.count("'") - octave.count(','),
+            num, den)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_length(length: str) -> Tuple[int, int]:
+    """Parse a note length multiplier, eg '' -> (1, 1), '3/2' -> (3, 2),
+    '/' -> (1, 2), '//' -> (1, 4)
+
+    Raises:
+        AbcParserException: the denominator is 0, eg '/0'
+    """
+    if '/' not in length:
+        return (int(length), 1) if length else (1, 1)
+    raw_num, _, raw_den = length.partition('/')
+    num = int(raw_num) if raw_num else 1
+    raw_den = raw_den.lstrip('/')
+    den = int(raw_den) if raw_den else 2 ** length.count('/')
+    if den == 0:
+        raise AbcParserException('Invalid note length: \'' + length + '\'')
+    return num, den
+
+
+_BAR_VARIANT_RE = re.compile(r'([^0-9]*)([0-9][-,0-9]*)?')
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_bar(bar: str) -> Tuple[int, int, Optional[FrozenSet[int]], bool]:
+    """Parse a BAR token
+
+    Returns:
+        A tuple (repeat flags of the bar before, repeat flags of the bar
+        after, passes of the variant ending that starts, whether the bar
+        line ends a variant ending)
+    """
+    core, variant = _BAR_VARIANT_RE.fullmatch(bar).groups()
+    before = END_REPEAT if core.startswith(':') else 0
+    after = START_REPEAT if core.endswith(':') else 0
+    passes = None
+    if variant is not None:
+        passes = set()
+        for part in variant.split(','):
+            first, _, last = part.partition('-')
+            if first:
+                passes.update(range(int(first), int(last or first) + 1))
+        passes = frozenset(passes)
+    ends_variant = bool(before or after) or core in ('||', '|]', '[|')
+    return before, after, passes, ends_variant
+
+
+def _parse_tempo(raw_tempo: str, unit: int) -> Optional[float]:
+    """Parse a tempo, eg '1/4=120', '3/8=40', '"Allegro" 1/4=120' or '120'
+    (beats of the default note length)
+
+    Returns:
+        The tempo in quarter notes per minute, None if the tempo is invalid
+    """
+    raw_tempo = re.sub(r'"[^"]*"', '', raw_tempo.split('%')[0]).strip()
+    beat, _, bpm = raw_tempo.rpartition('=')
+    try:
+        bpm = float(bpm)
+        if beat:
+            beat_ticks = 0
+            for length in beat.split():
+                num, den = _parse_fraction(length)
+                beat_ticks += WHOLE_NOTE_TICKS * num / den
+        else:
+            beat_ticks = unit
+    except (ValueError, TypeError):
+        return None
+    if bpm <= 0 or beat_ticks <= 0:
+        return None
+    return bpm * beat_ticks / TICKS_PER_QUARTER
+
+
+@functools.lru_cache(maxsize=None)
+def _get_midi_note(letter: str) -> int:
+    """MIDI note number of a note letter without accidental or octave
+    marker, same as abc2midi.get_midi_note()"""
+    midi_note = 60 + musictheory.C_MAJOR_SCALE_INTERVALS[letter.upper()]
+    return midi_note + 12 if letter.islower() else midi_note
+
+
+def _parse_fraction(raw: str) -> Optional[Tuple[int, int]]:
+    """Parse a meter or a note length, eg '6/8', 'C' or '1/8'"""
+    raw = raw.split('%')[0].strip()
+    if raw == 'C':
+        return 4, 4
+    if raw == 'C|':
+        return 2, 2
+    num, _, den = raw.partition('/')
+    try:
+        num, den = int(num), int(den)
+    except ValueError:
+        return None
+    if num <= 0 or den <= 0:
+        return None
+    return num, den
+
+
+class _Voice:
+    """Parsing state of a voice"""
+
+    def __init__(self, channel: int, key: musictheory.KeySignature):
+        self.channel = channel
+        self.time = 0
+        self.bar = 0
+        self.bar_onset = 0
+        self.key = key
+        self.bar_alterations = {}  # (letter, octave shift) -> semitones
+        self.velocity = DEFAULT_VELOCITY
+
+
+def parse_events(raw_tune: Iterable[str],
+                 token_cache: Optional[abctokenizer.TokenCache] = None) -> TuneEvents:
+    """Compute the notes of a tune
+
+    Args:
+        raw_tune: lines of raw ABC text of the tune
+        token_cache: token cache to use, the default token cache if None
+
+    Returns:
+        The notes of the tune, see TuneEvents.
+    """
+    if token_cache is None:
+        token_cache = abctokenizer.default_token_cache
+
+    events = TuneEvents()
+    append = events.append
+    durations = events.duration
+
+    meter = None
+    unit = None                 # Default note length (ticks), from L: or M:
+    header = True               # In the tune header (before the first K:)
+    voices = {}                 # Voice id -> _Voice
+    voice = _Voice(0, musictheory.get_key_signature(('C', 'maj')))
+    first_voice = voice
+    events._add_bar(0, 0, 0, None)
+    variant = None              # Variant ending of the current bar
+
+    in_chord = False
+    in_grace = False
+    chord_onset = 0
+    chord_duration = None       # Duration of the first note of the chord
+    group_onset = 0             # Last note, chord or rest:
+    group_first = 0             # - index of its first note
+    group_duration = 0          # - its duration
+    factor_num, factor_den = 1, 1  # Duration factor from a broken rhythm
+    tuplet_num, tuplet_den = 1, 1  # Duration factor of the current tuplet
+    tuplet_count = 0            # Number of notes left in the tuplet
+    tied = {}                   # Pitch -> index of a note tied to the next note
+    next_tied = {}              # Notes tied to the note or chord being read
+
+    line_offset = 0
+    for line in raw_tune:
+        for kind, col, text in token_cache.tokenize_line(line):
+            if kind == abctokenizer.NOTE:
+                if in_grace:
+                    continue
+                try:
+                    accidental, letter, octave, num, den = _parse_note(text)
+                except AbcParserException:
+                    continue  # Invalid length, eg 'A/0': ignore the note
+                if accidental is not None:
+                    alteration = musictheory.ALTERATION_SEMITONES[accidental]
+                    voice.bar_alterations[letter, octave] = alteration
+                else:
+                    alteration = voice.bar_alterations.get((letter, octave))
+                if alteration is None:
+                    pitch = voice.key.midi_notes[letter] + 12 * octave
+                else:
+                    pitch = _get_midi_note(letter) + 12 * octave + alteration
+                pitch = min(max(pitch, 0), 127)
+
+                if unit is None:
+                    unit = _get_default_unit(meter)
+                if in_chord and chord_duration is not None:
+                    # Not the first note of the chord: same factors
+                    duration = unit * num * group_num // (den * group_den)
+                else:
+                    group_num = factor_num * tuplet_num
+                    group_den = factor_den * tuplet_den
+                    factor_num = factor_den = 1
+                    duration = unit * num * group_num // (den * group_den)
+                    group_onset = chord_onset if in_chord else voice.time
+                    group_first = len(events)
+                onset = chord_onset if in_chord else voice.time
+
+                if not in_chord:
+                    next_tied = {}
+                tied_index = tied.pop(pitch, None)
+                if tied_index is not None:
+                    durations[tied_index] += duration
+                    next_tied[pitch] = tied_index
+                else:
+                    next_tied[pitch] = len(events)
+                    append(pitch, onset, duration, voice.velocity, voice.channel,
+                           voice.bar, line_offset + col)
+
+                if in_chord:
+                    if chord_duration is None:
+                        chord_duration = duration
+                else:
+                    group_duration = duration
+                    voice.time += duration
+                    tied = {}
+                    if tuplet_count > 0:
+                        tuplet_count -= 1
+                        if tuplet_count == 0:
+                            tuplet_num = tuplet_den = 1
+
+            elif kind == abctokenizer.REST:
+                if in_grace:
+                    continue
+                try:
+                    num, den = parse_length(text[1:])
+                except AbcParserException:
+                    continue  # Invalid length, eg 'z/0': ignore the rest
+                if unit is None:
+                    unit = _get_default_unit(meter)
+                if text[0] in 'ZX':
+                    bar_meter = meter or (4, 4)
+                    duration = num * WHOLE_NOTE_TICKS * bar_meter[0] // bar_meter[1]
+                else:
+                    duration = unit * num * factor_num * tuplet_num \
+                        // (den * factor_den * tuplet_den)
+                factor_num = factor_den = 1
+                group_onset = voice.time
+                group_first = len(events)
+                group_duration = duration
+                voice.time += duration
+                tied = {}
+                next_tied = {}
+                if tuplet_count > 0:
+                    tuplet_count -= 1
+                    if tuplet_count == 0:
+                        tuplet_num = tuplet_den = 1
+
+            elif kind == abctokenizer.CHORD_START:
+                in_chord = True
+                chord_onset = voice.time
+                chord_duration = None
+                next_tied = {}
+
+            elif kind == abctokenizer.CHORD_END:
+                if not in_chord:
+                    continue
+                in_chord = False
+                try:
+                    num, den = parse_length(text[1:])
+                except AbcParserException:
+                    num, den = 1, 1  # Invalid length, eg ']/0': ignore it
+                if chord_duration is None:
+                    continue  # Empty chord
+                if (num, den) != (1, 1):
+                    for i in range(group_first, len(events)):
+                        durations[i] = durations[i] * num // den
+                    chord_duration = chord_duration * num // den
+                group_duration = chord_duration
+                voice.time = chord_onset + chord_duration
+                tied = {}
+                if tuplet_count > 0:
+                    tuplet_count -= 1
+                    if tuplet_count == 0:
+                        tuplet_num = tuplet_den = 1
+
+            elif kind == abctokenizer.BAR:
+                voice.bar_alterations = {}
+                new_bar = voice.time > voice.bar_onset
+                if new_bar:
+                    voice.bar += 1
+                    voice.bar_onset = voice.time
+                if voice is first_voice:
+                    before, after, passes, ends_variant = _parse_bar(text)
+                    if passes is not None:
+                        variant = passes
+                    elif ends_variant:
+                        variant = None
+                    bar_offset = line_offset + col + len(text)
+                    if new_bar:
+                        events.bar_repeats[-1] |= before
+                        events._add_bar(voice.time, bar_offset, after, variant)
+                    else:
+                        # Bar lines without music between them, eg ':|'
+                        # at the end of a line and '|:' at the beginning of
+                        # the next one
+                        if len(events.bar_repeats) > 1:
+                            events.bar_repeats[-2] |= before
+                        events.bar_repeats[-1] |= after
+                        events.bar_variants[-1] = variant
+                        events.bar_offsets[-1] = bar_offset
+
+            elif kind == abctokenizer.BROKEN_RHYTHM:
+                # Lengthen the previous note or chord and shorten the next one
+                # (or the opposite for '<')
+                n = len(text)
+                long_num, short_den = 2 ** (n + 1) - 1, 2 ** n
+                if text[0] == '>':
+                    previous_num, previous_den = long_num, short_den
+                    factor_num, factor_den = 1, short_den
+                else:
+                    previous_num, previous_den = 1, short_den
+                    factor_num, factor_den = long_num, short_den
+                for i in range(group_first, len(events)):
+                    if events.onset[i] == group_onset:
+                        durations[i] = durations[i] * previous_num // previous_den
+                group_duration = group_duration * previous_num // previous_den
+                voice.time = group_onset + group_duration
+
+            elif kind == abctokenizer.TIE:
+                tied = next_tied
+                next_tied = {}
+
+            elif kind == abctokenizer.TUPLET:
+                try:
+                    tuplet_den, tuplet_num, tuplet_count = parse_tuplet(text, meter)
+                except AbcParserException:
+                    pass  # Invalid tuplet, eg '(0': ignore it
+
+            elif kind == abctokenizer.GRACE_START:
+                in_grace = True
+
+            elif kind == abctokenizer.GRACE_END:
+                in_grace = False
+
+            elif kind == abctokenizer.DECORATION:
+                velocity = DYNAMICS.get(text[1:-1])
+                if velocity is not None:
+                    voice.velocity = velocity
+
+            elif kind == abctokenizer.FIELD or kind == abctokenizer.INLINE_FIELD:
+                if kind == abctokenizer.INLINE_FIELD:
+                    text = text[1:].rstrip(']')
+                field, value = text[0], text[2:]
+                if field == 'K':
+                    try:
+                        abc_key = AbcParser.normalize_abc_key(value.split('%')[0])
+                        voice.key = musictheory.get_key_signature(abc_key)
+                    except (AbcParserException, IndexError):
+                        pass  # Invalid or empty key: keep the current key
+                    header = False
+                elif field == 'L':
+                    note_length = _parse_fraction(value)
+                    if note_length is not None:
+                        unit = WHOLE_NOTE_TICKS * note_length[0] // note_length[1]
+                elif field == 'M':
+                    meter = _parse_fraction(value)
+                    if header:
+                        events.meter = meter
+                elif field == 'Q':
+                    qpm = _parse_tempo(value, unit or _get_default_unit(meter))
+                    if qpm is not None:
+                        events.tempos.append((voice.time, qpm))
+                elif field == 'V':
+                    voice_id = value.split()[0] if value.split() else ''
+                    if not voices:
+                        # The current voice is the first voice if it has
+                        # no music yet, else it is an unnamed voice
+                        voices[voice_id if voice.time == 0 else None] = voice
+                    new_voice = voices.get(voice_id)
+                    if new_voice is None:
+                        new_voice = _Voice(_get_voice_channel(len(voices)),
+                                           voice.key)
+                        voices[voice_id] = new_voice
+                    voice = new_voice
+                    tied = {}
+                    next_tied = {}
+
+        line_offset += len(line) + 1
+
+    events.end_tick = max([first_voice.time] + [v.time for v in voices.values()])
+    return events
+
+
+def _get_voice_channel(voice_index: int) -> int:
+    channel = voice_index if voice_index < PERCUSSION_CHANNEL else voice_index + 1
+    return min(channel, MAX_CHANNEL)
+
+
+def _get_default_unit(meter: Optional[Tuple[int, int]]) -> int:
+    """Default note length when there is no L: field: 1/16 if the meter is
+    less than 3/4, else 1/8"""
+    if meter is not None and 4 * meter[0] < 3 * meter[1]:
+        return WHOLE_NOTE_TICKS // 16
+    return WHOLE_NOTE_TICKS // 8
+
+
+def parse_tuplet(text: str, meter: Optional[Tuple[int, int]]) -> Tuple[int, int, int]:
+    """Parse a tuplet, eg '(3' or '(3:2:3'
+
+    Returns:
+        A tuple (p, q, r): put p notes into the time of q for the next r notes
+
+    Raises:
+        AbcParserException: p, q or r is 0, eg '(0'
+    """
+    parts = text[1:].split(':')
+    p = int(parts[0])
+    q = int(parts[1]) if len(parts) > 1 and parts[1] else None
+    r = int(parts[2]) if len(parts) > 2 and parts[2] else p
+    if q is None:
+        if p in (3, 6):
+            q = 2
+        elif p in (2, 4, 8):
+            q = 3
+        else:
+            compound = meter is not None and meter[0] % 3 == 0 and meter[0] > 3
+            q = 3 if compound else 2
+    if p == 0 or q == 0 or r == 0:
+        raise AbcParserException('Invalid tuplet: \'' + text + '\'')
+    return p, q, r
+
+
+def parse_tunebook_events(raw_tunes: Iterable[List[str]]) -> Iterator[TuneEvents]:
+    """Compute the notes of the tunes of a tunebook, one tune at a time
+
+    The lines of a tunebook are usually seen only once: a private token cache
+    is used so that the shared token cache (see abctokenizer) is not filled
+    with them.
+    """
+    token_cache = abctokenizer.TokenCache(max_lines=1000)
+    for raw_tune in raw_tunes:
+        yield parse_events(raw_tune, token_cache)
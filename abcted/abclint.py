@@ -0,0 +1,218 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Check a raw ABC tune and report the problems found (diagnostics)
+
+Three kinds of problems are reported:
+
+- invalid values of the K:, M:, L: and Q: fields (header or inline fields):
+  the values that AbcParser cannot parse,
+
+- invalid note lengths (eg 'A/0') and tuplets (eg '(0'): they are ignored
+  when the tune is played,
+
+- bars whose length does not match the meter of the tune.  The first and the
+  last bar are not checked (anacrusis), nor the short bars next to a repeat
+  sign: they are the anacrusis of a section or they complete it.  Tunes whose
+  meter changes are not checked.
+
+This module does not need Tk: see lint_engine.py for the checks of the tune
+being edited.
+"""
+
+from array import array
+from bisect import bisect_right
+from fractions import Fraction
+import re
+from typing import Callable, List, NamedTuple, Optional
+
+import abcevents
+from abcparser import AbcParser, AbcParserException
+import abctokenizer
+
+
+class Diagnostic(NamedTuple):
+    line: int       # Start of the problem: line number (from 1) and column
+    col: int
+    end_line: int   # End of the problem (excluded)
+    end_col: int
+    message: str
+
+
+class LintCancelled(Exception):
+    """The check of a tune has been cancelled, see check_tune()"""
+    pass
+
+
+# Values of the fields that are valid ABC but not understood by AbcParser
+_VALID_KEYS = ('none', 'HP', 'Hp')
+_VALID_METERS = ('none',)
+
+
+def _check_key(value: str):
+    # Ignore the clef and the other key parameters (eg 'clef=bass') and
+    # allow a space between the root and the mode (eg 'D mix')
+    words = [word for word in value.split() if '=' not in word]
+    if not words or words[0] in _VALID_KEYS:
+        return
+    AbcParser.normalize_abc_key(''.join(words[:2]))
+
+
+def _check_meter(value: str):
+    value = value.strip()
+    if value in _VALID_METERS or '+' in value:  # '+': complex meter, eg 2+3/8
+        return
+    AbcParser._parse_meter(value)
+
+
+def _check_note_length(value: str):
+    AbcParser._parse_default_note_length(value.strip())
+
+
+def _check_tempo(value: str):
+    value = re.sub(r'"[^"]*"', '', value).strip()  # Remove the tempo text
+    if value:
+        AbcParser._parse_tempo(value)
+
+
+_FIELD_CHECKS = {'K': _check_key, 'M': _check_meter, 'L': _check_note_length,
+                 'Q': _check_tempo}
+
+# Names of the fields in the diagnostic messages (shown in the user interface)
+_FIELD_NAMES = {'K': 'Tonalité', 'M': 'Métrique', 'L': 'Longueur de note par défaut',
+                'Q': 'Tempo'}
+
+# Token kind -> function that raises AbcParserException if the length of the
+# token is invalid
+_LENGTH_CHECKS = {
+    abctokenizer.NOTE: lambda text: abcevents.parse_length(abctokenizer.split_note(text)[3]),
+    abctokenizer.REST: lambda text: abcevents.parse_length(text[1:]),
+    abctokenizer.CHORD_END: lambda text: abcevents.parse_length(text[1:]),
+    abctokenizer.TUPLET: lambda text: abcevents.parse_tuplet(text, None),
+}
+
+_LENGTH_NAMES = {abctokenizer.NOTE: 'Durée', abctokenizer.REST: 'Durée',
+                 abctokenizer.CHORD_END: 'Durée', abctokenizer.TUPLET: 'N-uplet'}
+
+# Token cache of the checks: the checks can run in a worker thread, they do
+# not share the default token cache of the application
+_token_cache = abctokenizer.TokenCache(max_lines=10000)
+
+
+def check_tune(raw_tune: List[str], first_line_no: int = 1,
+               is_cancelled: Optional[Callable[[], bool]] = None) -> List[Diagnostic]:
+    """Check a tune
+
+    Args:
+        raw_tune: lines of raw ABC text of the tune
+        first_line_no: line number of the first line of the tune, for the
+            positions of the diagnostics
+        is_cancelled: function called between the steps of the check; if it
+            returns True, the check is cancelled
+
+    Returns:
+        The diagnostics, in text order.  The messages are in French: they
+        are shown in the user interface.
+
+    Raises:
+        LintCancelled: the check has been cancelled
+    """
+    def check_cancelled():
+        if is_cancelled is not None and is_cancelled():
+            raise LintCancelled()
+
+    diagnostics = []
+    meter_changes = False
+    for line_index, line in enumerate(raw_tune):
+        for kind, col, text in _token_cache.tokenize_line(line):
+            if kind in _LENGTH_CHECKS:
+                try:
+                    _LENGTH_CHECKS[kind](text)
+                except AbcParserException:
+                    line_no = first_line_no + line_index
+                    diagnostics.append(Diagnostic(line_no, col, line_no, col + len(text),
+                                                  f'{_LENGTH_NAMES[kind]} invalide: {text}'))
+                continue
+            if kind == abctokenizer.FIELD:
+                value_col = col + 2
+                value = text[2:].split('%')[0]
+            elif kind == abctokenizer.INLINE_FIELD:
+                value_col = col + 3
+                value = text[3:].rstrip(']')
+            else:
+                continue
+            field = text.lstrip('[')[0]
+            check = _FIELD_CHECKS.get(field)
+            if check is None:
+                continue
+            if field == 'M' and kind == abctokenizer.INLINE_FIELD:
+                meter_changes = True
+            try:
+                check(value)
+            except (AbcParserException, IndexError, ValueError):
+                line_no = first_line_no + line_index
+                diagnostics.append(Diagnostic(line_no, value_col,
+                                              line_no, value_col + len(value.rstrip()),
+                                              f'{_FIELD_NAMES[field]} invalide: {value.strip()}'))
+    check_cancelled()
+
+    events = abcevents.parse_events(raw_tune, _token_cache)
+    check_cancelled()
+
+    if events.meter is not None and not meter_changes and not _has_body_meter(raw_tune):
+        diagnostics += _check_bar_lengths(raw_tune, events, first_line_no)
+    diagnostics.sort()
+    return diagnostics
+
+
+def _has_body_meter(raw_tune: List[str]) -> bool:
+    """Tell whether the meter changes in the body of the tune (M: field after
+    the K: field)"""
+    in_body = False
+    for line in raw_tune:
+        if line.startswith('K:'):
+            in_body = True
+        elif in_body and line.startswith('M:'):
+            return True
+    return False
+
+
+def _check_bar_lengths(raw_tune: List[str], events: abcevents.TuneEvents,
+                       first_line_no: int) -> List[Diagnostic]:
+    num, den = events.meter
+    expected = abcevents.WHOLE_NOTE_TICKS * num // den
+    bar_ends = events.bar_onsets[1:] + array('i', (events.end_tick,))
+    line_offsets = []  # Offset of each line in the raw tune
+    offset = 0
+    for line in raw_tune:
+        line_offsets.append(offset)
+        offset += len(line) + 1
+
+    def get_position(offset: int):
+        line_index = bisect_right(line_offsets, offset) - 1
+        return first_line_no + line_index, offset - line_offsets[line_index]
+
+    # Bars with notes, without the first and the last one
+    bar_repeats = events.bar_repeats + array('B', (0,))
+    bars = [i for i in range(len(events.bar_onsets))
+            if bar_ends[i] > events.bar_onsets[i]][1:-1]
+    diagnostics = []
+    for i in bars:
+        length = bar_ends[i] - events.bar_onsets[i]
+        if length == expected:
+            continue
+        if length < expected and (bar_repeats[i] & (abcevents.START_REPEAT | abcevents.END_REPEAT)
+                                  or bar_repeats[i + 1] & abcevents.START_REPEAT):
+            continue
+        line, col = get_position(events.bar_offsets[i])
+        end_line, end_col = get_position(events.bar_offsets[i + 1])
+        diagnostics.append(Diagnostic(
+            line, col, end_line, end_col,
+            f'Mesure de {_format_length(length)} au lieu de {num}/{den}'))
+    return diagnostics
+
+
+def _format_length(ticks: int) -> str:
+    """Format a length in ticks as a fraction of a whole note, eg '3/8'"""
+    return str(Fraction(ticks, abcevents.WHOLE_NOTE_TICKS))
@@ -5,11 +5,22 @@
 Tools that parse the ABC input
 """
 
+import functools
 import logging as log
-from typing import List
+from typing import IO, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
 
-from edit_zone_buffer import EditZoneBuffer
+import abctokenizer
+import key_index
 import musictheory
+from tune_index import TuneEntry
+
+if TYPE_CHECKING:
+    # Only for the type annotations: the parser must not depend on Tk (see
+    # batch_main.py)
+    from edit_zone_buffer import EditZoneBuffer
+
+
+DEFAULT_TEMPO_QPM = 120  # Quarter notes per minute, when there is no Q: field
 
 
 class AbcParserException(Exception):
@@ -19,8 +30,12 @@ class AbcParserException(Exception):
 class AbcParser():
     """Parse a raw ABC tune and provide access to the tune elements."""
 
-    def __init__(self, raw_tune: List[str]):
+    def __init__(self, raw_tune: List[str],
+                 token_cache: Optional[abctokenizer.TokenCache] = None):
         self._raw_tune = raw_tune
+        if token_cache is None:
+            token_cache = abctokenizer.default_token_cache
+        self._token_cache = token_cache
 
         self._titles = []  # List of tune titles
         self._rhythm = None
@@ -29,6 +44,8 @@ class AbcParser():
         self._tempo = None
         self._key = None
 
+        self._tokens = None  # Tokens of the raw tune, computed on demand
+
         self._parse()
 
     @property
@@ -39,21 +56,60 @@ class AbcParser():
         except IndexError:
             return ""
 
+    @property
+    def tokens(self):
+        """Return the tokens of the tune, one tuple of tokens per raw line.
+
+        See abctokenizer.tokenize().  Only the lines that are not in the token
+        cache yet (eg the lines modified since the last parsing) are actually
+        tokenized.
+        """
+        if self._tokens is None:
+            self._tokens = self._token_cache.tokenize(self._raw_tune)
+        return self._tokens
+
     @property
     def tempo_bpm(self):
         """Return tune tempo in beats per minute.
 
-        This is the tempo for humans, it is relative to the tune meter.
+        This is the tempo for humans, it is relative to the tune meter: the
+        beat is a dotted quarter note in 6/8, a half note in 2/2, etc.
         """
-        return 120
+        beat_num, beat_den = self._get_beat()
+        return self.tempo_qpm * beat_den / (4 * beat_num)
 
     @property
     def tempo_qpm(self):
         """Return tune tempo in quarter notes per minute.
 
-        This is an absolute tempo value for fluidsynth.
+        This is an absolute tempo value for fluidsynth.  It is computed from
+        the Q: header field, the note length of the tempo being the default
+        note length (L:, or derived from M:) if the Q: field has none;
+        DEFAULT_TEMPO_QPM if there is no Q: field.
         """
-        return 120
+        if self._tempo is None:
+            return DEFAULT_TEMPO_QPM
+        note_length, bpm = self._tempo
+        num, den = note_length or self._get_default_note_length()
+        return bpm * 4 * num / den
+
+    def _get_default_note_length(self):
+        """Return the L: header field value, else the default note length
+        for the meter: 1/16 if the meter is less than 3/4, else 1/8"""
+        if self._default_note_length is not None:
+            return self._default_note_length
+        if self._meter is not None and 4 * self._meter[0] < 3 * self._meter[1]:
+            return 1, 16
+        return 1, 8
+
+    def _get_beat(self):
+        """Return the beat of the meter as a fraction (num, den)"""
+        if self._meter is None:
+            return 1, 4
+        num, den = self._meter
+        if num % 3 == 0 and num > 3 and den >= 8:  # Compound meter, eg 6/8
+            return 3, den
+        return 1, den
 
     def _parse(self):
 
@@ -260,6 +316,7 @@ class AbcParser():
         raise AbcParserException('Invalid or unsupported tempo: \'' + line + '\'')
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def normalize_abc_key(raw_key: str):
         """Parse and normalize a key header value (K:<raw_key>)
 
@@ -278,6 +335,9 @@ class AbcParser():
                 or ('A', 'mix') or ('Bb', 'maj')
 
         :exception AbcParserException: the format of raw_text is invalid and cannot be parsed
+
+        The results are memoized: the key of the tune is normalized for each
+        note played while typing.
         """
         raw_key = raw_key.strip()  # Remove leading and trailing spaces
 
@@ -291,7 +351,7 @@ class AbcParser():
             alteration = raw_key[0]
             raw_key = raw_key[1:]
 
-        if root + alteration + 'maj' not in musictheory.MAJOR_SCALES.keys():
+        if (root + alteration, 'maj') not in musictheory.KEY_SIGNATURES:
             msg = root + alteration + raw_key + ' is not a valid key name'
             log.warning(msg)
             raise AbcParserException(msg)
@@ -326,7 +386,28 @@ class AbcParser():
 # Get current raw tune in edit buffer
 # --------------------------------------------------------------------------------
 
-def get_current_raw_tune(buffer: EditZoneBuffer) -> List[str]:
+def get_current_tune(buffer: 'EditZoneBuffer') -> TuneEntry:
+    """Return the index entry of the current tune around the cursor.
+
+    Args:
+        buffer: the EditZoneBuffer to look for the tune
+
+    Returns:
+        The TuneEntry of the tune, see tune_index.TuneIndex.find_tune().
+
+    Raises:
+        AbcParserException: if there is no tune at or above the cursor
+
+    """
+    tune = buffer.find_tune(buffer.get_line_no_at_cursor())
+    if tune is None:
+        msg = 'Reference number (X: header) missing in current tune'
+        log.error(msg)
+        raise AbcParserException(msg)
+    return tune
+
+
+def get_current_raw_tune(buffer: 'EditZoneBuffer') -> List[str]:
     """Return the current tune around the cursor.
 
     Args:
@@ -340,46 +421,62 @@ def get_current_raw_tune(buffer: EditZoneBuffer) -> List[str]:
         AbcParserException: if the tune cannot be extracted
 
     """
-    raw_tune = []
-
-    # Read lines including and above the current line until
-    # the ABC reference number is found.  If no
-    # reference number can be found, raise an exception.
-
-    line_no = cur_line_no = buffer.get_line_no_at_cursor()
-    while True:
-        line = buffer.get_line(line_no)
-        raw_tune.insert(0, line)
-        if AbcParser.is_reference_number(line):
-            break
-        else:
-            line_no -= 1
-            if line_no == 0:  # line numbers start at 1
-                msg = 'Reference number (X: header) missing in current tune'
-                log.error(msg)
-                raise AbcParserException(msg)
+    tune = get_current_tune(buffer)
+    return buffer.get_lines(tune.start_line, tune.end_line)
 
-    # Read lines below the current line until the next reference number or
-    # the end of the buffer (empty line).
-    # TODO: change get_line() to have an exception when we pass the end of
-    # the buffer.  So that we accept empty lines inside a tune.
 
-    line_no = cur_line_no + 1
-    while True:
-        line = buffer.get_line(line_no)
-        if AbcParser.is_reference_number(line) or line.strip() == '':
-            break
-        raw_tune.append(line)
-        line_no += 1
+# --------------------------------------------------------------------------------
+# Read the tunes of a stream
+# --------------------------------------------------------------------------------
 
-    return raw_tune
+def iter_tunes(fileobj: Union[IO[str], IO[bytes]]) -> Iterator[Tuple[int, List[str]]]:
+    """Read the tunes of a text or binary stream, one at a time.
+
+    The tunes are split with the same rules as get_current_raw_tune(): a tune
+    starts with a reference number (X: header) and ends before the next empty
+    line or the next reference number.  The text outside of the tunes is
+    skipped.  The stream is read line by line: only the current tune is kept
+    in memory, whatever the size of the stream.
+
+    Args:
+        fileobj: the stream, eg an open file or sys.stdin.  A binary stream is
+            decoded as UTF-8 (invalid bytes are replaced with U+FFFD).
+
+    Yields:
+        Tuples (offset, raw tune): offset is the offset of the X: line in the
+        stream, in characters for a text stream and in bytes for a binary
+        stream, raw tune is the lines of the tune, without end of lines.
+    """
+    offset = 0
+    tune_offset = 0
+    raw_tune: List[str] = []  # Current tune, empty outside of a tune
+    for line in fileobj:
+        line_length = len(line)
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        line = line.rstrip('\r\n')
+        stripped_line = line.strip()
+        if stripped_line.startswith('X:'):
+            if raw_tune:
+                yield tune_offset, raw_tune
+            raw_tune = [line]
+            tune_offset = offset
+        elif stripped_line == '':
+            if raw_tune:
+                yield tune_offset, raw_tune
+                raw_tune = []
+        elif raw_tune:
+            raw_tune.append(line)
+        offset += line_length
+    if raw_tune:
+        yield tune_offset, raw_tune
 
 
 # --------------------------------------------------------------------------------
 # Get note to play in edit buffer
 # --------------------------------------------------------------------------------
 
-def get_note_to_play(edit_buffer: EditZoneBuffer, keysym):
+def get_note_to_play(edit_buffer: 'EditZoneBuffer', keysym):
     """Given a keysym following a key press, check whether there is a
      note to play. If so, return the note.
 
@@ -446,7 +543,7 @@ def get_note_to_play(edit_buffer: EditZoneBuffer, keysym):
 
         # Get the note to play with all the useful attributes (accidentals,
         # octave changes, ...)
-        alteration = musictheory.get_note_alteration_in_key(simple_note, abc_key)
+        alteration = musictheory.get_key_signature(abc_key).alterations[simple_note]
         abc_note = alteration + simple_note
 
     abc_note = abc_note + octave_marker
@@ -455,7 +552,7 @@ def get_note_to_play(edit_buffer: EditZoneBuffer, keysym):
     return abc_note
 
 
-def get_current_raw_key(edit_buffer: EditZoneBuffer):
+def get_current_raw_key(edit_buffer: 'EditZoneBuffer'):
     """Get the contents of the key info field for the current tune.
 
     :return: a string with whatever can be found in the key info field. It
@@ -463,24 +560,15 @@ def get_current_raw_key(edit_buffer: EditZoneBuffer):
              is not controlled and not guaranteed to be valid here.
     """
 
-    # Assume 'C major' if no key is specified
-    key = 'C'
-
-    # For each line going upward until until the line starts with 'X:'
-    # (beginning of the tune found) or until there are no more lines,
-    # look for the key:
-
-    line_no = edit_buffer.get_line_no_at_cursor()
-    while line_no > 0:
-        line = edit_buffer.get_line(line_no)
-        if line.startswith('K:'):
-            key = line[2:]
-            break
-        if line.startswith('X:'):
-            # We reached the beginning of the tune
-            break
-        line_no -= 1
-
+    # Look for the closest key before the cursor in the current tune: an
+    # inline key field in the current line, or the key after the closest line
+    # above that changes the key (key index); assume 'C major' if no key is
+    # specified
+    changes_key, key = key_index.get_key_change(edit_buffer.get_current_line_to_cursor())
+    if not changes_key:
+        key = edit_buffer.get_key_index().get_raw_key(edit_buffer.get_line_no_at_cursor() - 1)
+    if key is None:
+        key = 'C'
     return key
 
 
@@ -0,0 +1,174 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Split raw ABC text into compact tokens
+
+The tokenizer works line by line with a single compiled regular expression:
+each line of text is scanned once from left to right and each match gives one
+token.  Tokens are small tuples (kind, col, text) where col is the column of
+the token in its line, so that a token can be mapped back to its source
+position, eg a tkinter text index '<line>.<col>'.
+
+Whitespace is not emitted as tokens.
+
+Since the tokens of a line only depend on the text of the line, they can be
+cached: after an edit, only the lines whose text has changed are tokenized
+again (see TokenCache).
+"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+
+# Token kinds
+
+FIELD = 'field'                # Information field line, eg 'K:G' or 'w:lyrics'
+INLINE_FIELD = 'inline_field'  # Inline information field, eg '[K:D]'
+COMMENT = 'comment'            # Comment ('% ...') or directive ('%%...')
+NOTE = 'note'                  # Note with accidental, octave and length, eg '^f'3/2'
+REST = 'rest'                  # Rest, eg 'z2' or 'x' (invisible) or 'Z4' (multi-measure)
+BAR = 'bar'                    # Bar line, repeat or variant ending, eg '|', ':|2', '[1'
+CHORD_START = 'chord_start'    # '['
+CHORD_END = 'chord_end'        # ']' with the optional chord length, eg ']2'
+TUPLET = 'tuplet'              # Tuplet, eg '(3' or '(3:2:3'
+DECORATION = 'decoration'      # Decoration, eg '~' or '!trill!' or '+fermata+'
+ANNOTATION = 'annotation'      # Chord symbol or annotation, eg '"Am"'
+BROKEN_RHYTHM = 'broken_rhythm'  # '>' or '<' (or '>>', '<<', ...)
+TIE = 'tie'                    # '-'
+SLUR_START = 'slur_start'      # '('
+SLUR_END = 'slur_end'          # ')'
+GRACE_START = 'grace_start'    # '{'
+GRACE_END = 'grace_end'        # '}'
+OTHER = 'other'                # Anything else (line continuation, spacer, ...)
+
+
+class Token(NamedTuple):
+    kind: str  # One of the token kinds above
+    col: int   # Column of the first character of the token in its line
+    text: str  # Raw text of the token
+
+
+# A line is either a whole-line token (information field or comment) or a
+# sequence of music tokens.
+_LINE_RE = re.compile(r'[ \t]*%|[A-Za-z]:')
+
+_LENGTH = r'[0-9]*(?:/+[0-9]*)?'
+_VARIANT = r'[0-9]+(?:[-,][0-9]+)*'
+
+# rem: the order of the alternatives matters, eg inline fields and bar lines
+# have to be tried before chord brackets and tuplets before slurs.
+_BODY_RE = re.compile('|'.join([
+    r'(?P<' + NOTE + r'>(?:\^\^|\^|__|_|=)?[A-Ga-g][,\']*' + _LENGTH + ')',
+    r'(?P<' + BAR + r'>\[\|[\]:]*|:*\|[\]|]*:*(?:' + _VARIANT + r')?|::+|\[' + _VARIANT + ')',
+    r'(?P<' + REST + r'>[zxZX]' + _LENGTH + ')',
+    r'(?P<' + INLINE_FIELD + r'>\[[A-Za-z]:[^\]]*\]?)',
+    r'(?P<' + CHORD_START + r'>\[)',
+    r'(?P<' + CHORD_END + r'>\]' + _LENGTH + ')',
+    r'(?P<' + TUPLET + r'>\([0-9](?::[0-9]*){0,2})',
+    r'(?P<' + ANNOTATION + r'>"[^"]*"?)',
+    r'(?P<' + DECORATION + r'>![^!]*!|\+[^+\s]*\+|[.~HLMOPSTuv])',
+    r'(?P<' + BROKEN_RHYTHM + r'>>+|<+)',
+    r'(?P<' + TIE + r'>-)',
+    r'(?P<' + SLUR_START + r'>\()',
+    r'(?P<' + SLUR_END + r'>\))',
+    r'(?P<' + GRACE_START + r'>\{)',
+    r'(?P<' + GRACE_END + r'>\})',
+    r'(?P<' + COMMENT + r'>%.*)',
+    r'(?P<' + OTHER + r'>[^ \t])',
+]))
+
+# Split a note token into its components: accidental, letter, octave markers
+# and length
+_NOTE_RE = re.compile(r'(\^\^|\^|__|_|=)?([A-Ga-g])([,\']*)(.*)')
+
+# Create tokens without the overhead of the Token constructor
+_tuple_new = tuple.__new__
+
+
+def tokenize_line(line: str) -> Tuple[Token, ...]:
+    """Split a line of ABC text into tokens
+
+    Args:
+        line: a line of raw ABC text, without the trailing end of line
+
+    Returns:
+        a tuple of tokens, in the order they appear in the line
+    """
+    m = _LINE_RE.match(line)
+    if m is not None:
+        kind = COMMENT if line[m.end() - 1] == '%' else FIELD
+        return (Token(kind, 0, line),)
+    return tuple([_tuple_new(Token, (m.lastgroup, m.start(), m.group()))
+                  for m in _BODY_RE.finditer(line)])
+
+
+def tokenize(raw_lines: Iterable[str]) -> List[Tuple[Token, ...]]:
+    """Split lines of ABC text (eg a raw tune) into tokens
+
+    Args:
+        raw_lines: lines of raw ABC text
+
+    Returns:
+        a list with one tuple of tokens per line: the source position of a
+        token is given by the index of its line in the list and its column.
+    """
+    return [tokenize_line(line) for line in raw_lines]
+
+
+class TokenCache:
+    """Cache the tokens of lines of ABC text, keyed by the text of the line.
+
+    The cache is bounded: it keeps two generations of lines.  When the
+    current generation is full, it becomes the old generation and the
+    previous old generation is dropped.  A line found in the old generation
+    is promoted to the current generation, so the lines in use (eg the lines
+    of the tune being edited) stay in the cache.
+    """
+
+    def __init__(self, max_lines: int = 50000):
+        self._max_lines = max_lines
+        self._tokens: Dict[str, Tuple[Token, ...]] = {}  # Current generation
+        self._old_tokens: Dict[str, Tuple[Token, ...]] = {}  # Old generation
+
+    def __len__(self):
+        return len(self._tokens) + len(self._old_tokens)
+
+    def clear(self):
+        self._tokens = {}
+        self._old_tokens = {}
+
+    def tokenize_line(self, line: str) -> Tuple[Token, ...]:
+        """Same as the tokenize_line() function, with a cache"""
+        tokens = self._tokens.get(line)
+        if tokens is None:
+            tokens = self._old_tokens.get(line)
+            if tokens is None:
+                tokens = tokenize_line(line)
+            if len(self._tokens) >= self._max_lines:
+                self._old_tokens = self._tokens
+                self._tokens = {}
+            self._tokens[line] = tokens
+        return tokens
+
+    def tokenize(self, raw_lines: Iterable[str]) -> List[Tuple[Token, ...]]:
+        """Same as the tokenize() function, with a cache"""
+        return [self.tokenize_line(line) for line in raw_lines]
+
+
+# Cache shared by the parsers of the application
+default_token_cache = TokenCache()
+
+
+def split_note(note: str) -> Tuple[str, str, str, str]:
+    """Split the text of a note token into its components
+
+    Args:
+        note: text of a NOTE token, eg '^f'3/2'
+
+    Returns:
+        a tuple (accidental, letter, octave markers, length), eg
+        ('^', 'f', "'", '3/2')
+    """
+    accidental, letter, octave, length = _NOTE_RE.match(note).groups()
+    return accidental or '', letter, octave, length
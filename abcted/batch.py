@@ -0,0 +1,290 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Convert all the tunes of tunebooks to MIDI files, or check them, in parallel
+
+A tunebook is split at the X: boundaries (see tune_index.py) and its tunes
+are processed in a pool of processes (concurrent.futures), so that all the
+cores are used.  The tunes are sent to the worker processes in chunks to
+limit the communication overhead.  The standard input ('-') can also be
+processed: it is read as a stream (see abcparser.iter_tunes()), so that
+tunebooks of any size can be piped.
+
+Each tune is written to its own MIDI file, whose name only depends on the
+tunebook and on the tune: '<tunebook>_<number>_<title>.mid' where number is
+the position of the tune in the tunebook, eg 'session_0042_the_kesh.mid'.
+Converting the same tunebook again gives the same files.
+
+This module does not need Tk nor fluidsynth, see batch_main.py.
+"""
+
+import concurrent.futures
+import os
+import re
+import sys
+import threading
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import abc2midi
+import abcevents
+import abcparser
+from tune_index import TuneEntry, TuneIndex
+from tune_search import normalize_text
+from tunebook import Tunebook
+
+
+CHUNK_SIZE = 16  # Number of tunes converted by a worker at a time
+
+STDIN_PATH = '-'  # Tunebook path of the standard input
+
+MAX_TITLE_LENGTH = 40  # Max number of characters of the title in a file name
+
+
+class ConversionResult(NamedTuple):
+    number: int             # Position of the tune in the tunebook, from 1
+    tune: TuneEntry
+    midi_path: str          # Path of the MIDI file (not written on error)
+    error: Optional[str]    # Error message, None if the tune was converted
+
+
+class CheckResult(NamedTuple):
+    number: int             # Position of the tune in the tunebook, from 1
+    tune: TuneEntry
+    error: Optional[str]    # Error message, None if the tune was parsed
+    note_count: int
+    bar_count: int
+
+
+def get_midi_filename(tunebook_path: str, number: int, tune: TuneEntry) -> str:
+    """Return the name of the MIDI file of a tune
+
+    Args:
+        tunebook_path: path of the tunebook of the tune, '-' for the
+            standard input
+        number: position of the tune in the tunebook, from 1
+        tune: the tune
+
+    Returns:
+        A file name without directory, eg 'session_0042_the_kesh.mid'
+    """
+    if tunebook_path == STDIN_PATH:
+        stem = 'stdin'
+    else:
+        stem = os.path.splitext(os.path.basename(tunebook_path))[0]
+    title = '_'.join(re.findall(r'[a-z0-9]+', normalize_text(tune.title)))
+    title = title[:MAX_TITLE_LENGTH].rstrip('_')
+    parts = [stem, '{:04d}'.format(number)] + ([title] if title else [])
+    return '_'.join(parts) + '.mid'
+
+
+def iter_tunebook(tunebook_path: str) -> Iterator[Tuple[int, TuneEntry, Optional[List[str]],
+                                                         Optional[str]]]:
+    """Read the tunes of a tunebook, one at a time
+
+    The tunebook '-' is the standard input, read as a stream (see
+    abcparser.iter_tunes()): the line numbers of its tunes are None.
+
+    Args:
+        tunebook_path: path of the ABC file, or '-'
+
+    Yields:
+        Tuples (number, tune, raw tune, error): number is the position of the
+        tune in the tunebook, from 1; on error, raw tune is None and error is
+        an error message.
+
+    Raises:
+        OSError: the tunebook cannot be read
+    """
+    if tunebook_path == STDIN_PATH:
+        tunes = abcparser.iter_tunes(sys.stdin.buffer)
+        for number, (offset, raw_tune) in enumerate(tunes, 1):
+            tune = TuneIndex.from_lines(raw_tune).tunes[0]
+            tune.start_line = tune.end_line = None
+            tune.offset = offset
+            tune.end_offset = None
+            yield number, tune, raw_tune, None
+        return
+
+    with Tunebook(tunebook_path) as tunebook:
+        for number, tune in enumerate(tunebook.index.tunes, 1):
+            try:
+                raw_tune = tunebook.get_raw_tune(tune)
+            except UnicodeDecodeError as e:
+                yield number, tune, None, _format_error(e)
+                continue
+            yield number, tune, raw_tune, None
+
+
+def _convert_tunes(jobs: List[Tuple[List[str], str]]) -> List[Tuple[Optional[str], None]]:
+    """Convert tunes to MIDI files (run in the worker processes)
+
+    Args:
+        jobs: list of (raw tune, path of the MIDI file)
+
+    Returns:
+        For each tune, (error, None): error is None if the tune was
+        converted, else an error message
+    """
+    results = []
+    for raw_tune, midi_path in jobs:
+        try:
+            midi_data = abc2midi.get_midi_data(raw_tune)
+            # Write to a temporary file first, so that an interrupted
+            # conversion does not leave a truncated MIDI file
+            temp_path = midi_path + '.tmp'
+            with open(temp_path, 'wb') as midi_file:
+                midi_file.write(midi_data)
+            os.replace(temp_path, midi_path)
+            results.append((None, None))
+        except Exception as e:  # Catch-all handler: report the error, go on
+            results.append((_format_error(e), None))
+    return results
+
+
+def _check_tunes(raw_tunes: List[List[str]]) -> List[Tuple[Optional[str], Optional[Tuple[int, int]]]]:
+    """Parse tunes (run in the worker processes)
+
+    Args:
+        raw_tunes: the raw tunes
+
+    Returns:
+        For each tune, (error, (number of notes, number of bars)): error is
+        None if the tune was parsed, else an error message and the counts
+        are None
+    """
+    results = []
+    for raw_tune in raw_tunes:
+        try:
+            abcparser.AbcParser(raw_tune)  # Check the header fields
+            events = abcevents.parse_events(raw_tune)
+            results.append((None, (len(events), len(events.bar_onsets))))
+        except Exception as e:  # Catch-all handler: report the error, go on
+            results.append((_format_error(e), None))
+    return results
+
+
+def _format_error(e: Exception) -> str:
+    return '{}: {}'.format(type(e).__name__, e)
+
+
+class BatchProcessor:
+    """Process the tunes of tunebooks in a pool of processes
+
+    The processing can be cancelled from another thread with cancel():
+    the tunes not processed yet are skipped.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: number of worker processes, the number of CPUs if None
+        """
+        self._max_workers = max_workers
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def convert_tunebook(self, tunebook_path: str,
+                         output_dir: str) -> Iterator[ConversionResult]:
+        """Convert all the tunes of a tunebook to MIDI files
+
+        This is a generator: the results are yielded as soon as the tunes
+        are converted, not in tunebook order, so that the progress can be
+        shown.  Closing the generator cancels the conversion.
+
+        Args:
+            tunebook_path: path of the ABC file, '-' for the standard input
+            output_dir: directory of the MIDI files, created if needed
+
+        Raises:
+            OSError: the tunebook cannot be read
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        def get_job(number: int, tune: TuneEntry, raw_tune: List[str]):
+            return raw_tune, self._get_midi_path(tunebook_path, output_dir, number, tune)
+
+        for number, tune, error, _ in self._map_tunes(tunebook_path, _convert_tunes, get_job):
+            yield ConversionResult(number, tune,
+                                   self._get_midi_path(tunebook_path, output_dir, number, tune),
+                                   error)
+
+    @staticmethod
+    def _get_midi_path(tunebook_path: str, output_dir: str, number: int, tune: TuneEntry):
+        return os.path.join(output_dir, get_midi_filename(tunebook_path, number, tune))
+
+    def check_tunebook(self, tunebook_path: str) -> Iterator[CheckResult]:
+        """Parse all the tunes of a tunebook: header fields and notes
+
+        This is a generator, see convert_tunebook().
+
+        Args:
+            tunebook_path: path of the ABC file, '-' for the standard input
+
+        Raises:
+            OSError: the tunebook cannot be read
+        """
+        def get_job(number: int, tune: TuneEntry, raw_tune: List[str]):
+            return raw_tune
+
+        for number, tune, error, counts in self._map_tunes(tunebook_path, _check_tunes, get_job):
+            note_count, bar_count = counts if counts is not None else (0, 0)
+            yield CheckResult(number, tune, error, note_count, bar_count)
+
+    def _map_tunes(self, tunebook_path: str, worker: Callable, get_job: Callable) -> Iterator:
+        """Run a worker function over the tunes of a tunebook, in the pool
+
+        Args:
+            tunebook_path: path of the ABC file, '-' for the standard input
+            worker: function of the worker processes, called with a list of
+                jobs, returns a list of (error, result)
+            get_job: function(number, tune, raw_tune) that returns the job
+                of a tune
+
+        Returns:
+            An iterator over the tuples (number, tune, error, result),
+            in completion order.
+        """
+        max_pending = 2 * (self._max_workers or os.cpu_count() or 1)
+        pending = {}  # Future -> chunk of (number, tune, job)
+        chunk = []
+        executor = concurrent.futures.ProcessPoolExecutor(self._max_workers)
+        try:
+            # Only a few chunks are in the pool at a time, so that the memory
+            # does not depend on the size of the tunebook (see iter_tunebook())
+            for number, tune, raw_tune, error in iter_tunebook(tunebook_path):
+                if self.cancelled:
+                    return
+                if error is not None:
+                    yield number, tune, error, None
+                    continue
+                chunk.append((number, tune, get_job(number, tune, raw_tune)))
+                if len(chunk) == CHUNK_SIZE:
+                    pending[executor.submit(worker, [job for _, _, job in chunk])] = chunk
+                    chunk = []
+                    while len(pending) >= max_pending:
+                        yield from self._get_results(pending)
+            if chunk:
+                pending[executor.submit(worker, [job for _, _, job in chunk])] = chunk
+            while pending and not self.cancelled:
+                yield from self._get_results(pending)
+        finally:
+            # On cancellation (or generator closed, or error), do not wait
+            # for the chunks that are not started yet
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _get_results(self, pending: dict) -> Iterator:
+        """Wait for at least one chunk of the pool and yield its results"""
+        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            chunk = pending.pop(future)
+            if self.cancelled:
+                continue
+            for (number, tune, job), (error, result) in zip(chunk, future.result()):
+                yield number, tune, error, result
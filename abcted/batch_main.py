@@ -0,0 +1,183 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+abcted-batch: process tunebooks from the command line, without Tk nor
+fluidsynth
+
+Commands:
+    index: list the tunes of the tunebooks
+    validate: parse the tunes (header fields and notes)
+    convert: convert the tunes to MIDI files
+    stats: count the tunes, notes, rhythms, keys... of each tunebook
+
+The arguments are ABC files or directories (searched recursively for *.abc
+files), or '-' for the standard input.  The output is made of JSON lines,
+one per tune (one per tunebook for stats, plus a total), on stdout; the logs
+go to stderr.  The exit status
+is 1 if a tunebook cannot be read or if a tune has an error.
+"""
+
+import argparse
+from collections import Counter
+import json
+import logging as log
+import os
+import sys
+from typing import Iterator, List, Optional
+
+from batch import BatchProcessor, iter_tunebook
+from tune_index import TuneEntry
+from tune_search import normalize_key
+
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+EXIT_INTERRUPTED = 130
+
+ABC_EXTENSION = '.abc'
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog='abcted-batch',
+        description='Traitement de recueils ABC en ligne de commande (sortie en JSON lines)')
+    parser.add_argument('-d', '--debug',
+                        help='Affiche les messages de log (en anglais)',
+                        action='store_true')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Nombre de processus (défaut: nombre de processeurs)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('index', help='Liste les morceaux')
+    subparsers.add_parser('validate', help='Vérifie les morceaux')
+    convert_parser = subparsers.add_parser('convert', help='Convertit les morceaux en MIDI')
+    convert_parser.add_argument('-o', '--output-dir', required=True,
+                                help='Répertoire des fichiers MIDI')
+    subparsers.add_parser('stats', help='Statistiques par recueil')
+
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('paths', nargs='+', metavar='path',
+                               help="Fichier ABC ou répertoire, '-' pour l'entrée standard")
+    return parser.parse_args(argv)
+
+
+def setup_logging(enable_debug):
+    # The logs go to stderr, stdout is for the JSON lines
+    if enable_debug:
+        log.basicConfig(
+            format='%(asctime)s:%(levelname)s:%(processName)s'
+                   ':%(filename)s:%(funcName)s: %(message)s',
+            level=log.DEBUG)
+        log.info("Debug mode enabled")
+    else:
+        log.basicConfig(format='%(levelname)s:%(message)s', level=log.ERROR)
+
+
+def find_tunebooks(paths: List[str]) -> Iterator[str]:
+    """Yield the ABC files: the files given, and the *.abc files found in
+    the directories given, in a stable order"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.lower().endswith(ABC_EXTENSION):
+                    yield os.path.join(dir_path, file_name)
+
+
+def _print_record(record: dict):
+    print(json.dumps(record, ensure_ascii=False), flush=True)
+
+
+def _get_tune_record(path: str, number: int, tune: TuneEntry) -> dict:
+    return {'path': path, 'number': number, 'x': tune.x, 'title': tune.title}
+
+
+class _Runner:
+    def __init__(self, args):
+        self._args = args
+        self._processor = BatchProcessor(max_workers=args.jobs)
+        self.failed = False
+        self._total_stats = None
+
+    def run(self):
+        for path in find_tunebooks(self._args.paths):
+            try:
+                getattr(self, '_run_' + self._args.command)(path)
+            except BrokenPipeError:
+                raise
+            except OSError as e:
+                self.failed = True
+                _print_record({'path': path, 'error': '{}: {}'.format(type(e).__name__, e)})
+        if self._total_stats is not None:
+            _print_record(self._total_stats)
+
+    def _run_index(self, path: str):
+        for number, tune, raw_tune, error in iter_tunebook(path):
+            record = _get_tune_record(path, number, tune)
+            record.update({'composer': tune.composer, 'rhythm': tune.rhythm,
+                           'meter': tune.raw_meter, 'key': tune.raw_key,
+                           'start_line': tune.start_line, 'end_line': tune.end_line,
+                           'error': error})
+            self.failed |= error is not None
+            _print_record(record)
+
+    def _run_validate(self, path: str):
+        for result in self._processor.check_tunebook(path):
+            record = _get_tune_record(path, result.number, result.tune)
+            record['error'] = result.error
+            self.failed |= result.error is not None
+            _print_record(record)
+
+    def _run_convert(self, path: str):
+        for result in self._processor.convert_tunebook(path, self._args.output_dir):
+            record = _get_tune_record(path, result.number, result.tune)
+            record.update({'midi_path': result.midi_path, 'error': result.error})
+            self.failed |= result.error is not None
+            _print_record(record)
+
+    def _run_stats(self, path: str):
+        stats = {'path': path, 'tunes': 0, 'errors': 0, 'notes': 0, 'bars': 0,
+                 'rhythms': Counter(), 'keys': Counter()}
+        for result in self._processor.check_tunebook(path):
+            stats['tunes'] += 1
+            stats['errors'] += result.error is not None
+            stats['notes'] += result.note_count
+            stats['bars'] += result.bar_count
+            if result.tune.rhythm:
+                stats['rhythms'][result.tune.rhythm.strip().lower()] += 1
+            if result.tune.raw_key:
+                stats['keys'][normalize_key(result.tune.raw_key)] += 1
+        self.failed |= stats['errors'] > 0
+        _print_record(stats)
+
+        # The last line sums up all the tunebooks: its path is null
+        if self._total_stats is None:
+            self._total_stats = dict(stats, path=None, rhythms=Counter(), keys=Counter(),
+                                     tunes=0, errors=0, notes=0, bars=0)
+        for name, value in stats.items():
+            if name != 'path':
+                self._total_stats[name] += value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    setup_logging(enable_debug=args.debug)
+    runner = _Runner(args)
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # The reader of stdout has gone (eg 'abcted-batch index . | head'):
+        # avoid another error when Python flushes stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_FAILURE
+    return EXIT_FAILURE if runner.failed else EXIT_SUCCESS
+
+
+if __name__ == "__main__":
+    sys.exit(main())
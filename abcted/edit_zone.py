@@ -4,14 +4,21 @@
 import logging as log
 import tkinter as tk
 import tkinter.scrolledtext as tk_scrolledtext
+from typing import Tuple
 
 import abc2midi
 import abcparser
 import edit_zone_buffer
+import highlighter
+import latency
+import lint_engine
 from player import Synth
 import theme
 
 
+PLAYBACK_TAG = 'playback'
+
+
 class EditZone():
     def __init__(self, tk_root: tk.Tk, theme: theme.Theme, synth: Synth):
         self._theme = theme
@@ -39,16 +46,29 @@ class EditZone():
 
         self._scrolled_text.bind('<Key>', self._on_key_press)
         self._scrolled_text.bind('<KeyRelease>', self._on_key_release)
+        self._scrolled_text.bind('<<Modified>>', self._on_text_modified)
 
         self._scrolled_text.grid(row=1, sticky=tk.N + tk.S + tk.E + tk.W)
 
         self._buffer = edit_zone_buffer.EditZoneBuffer(self._scrolled_text)
+        # rem: created before the lint engine so that the lint tag has the
+        # priority over the syntax tags
+        self._highlighter = highlighter.Highlighter(self._scrolled_text, theme)
+        self._lint_engine = lint_engine.LintEngine(self._scrolled_text, self._buffer, theme)
+
+        # Bar being played, see show_playback_range().  rem: lowest
+        # priority, so that the selection remains visible.
+        self._scrolled_text.tag_config(PLAYBACK_TAG, background=theme.playbackbg)
+        self._scrolled_text.tag_lower(PLAYBACK_TAG)
 
         self._check_text_change_since_last_save_cb = None
 
     def get_buffer(self):
         return self._buffer
 
+    def exit(self):
+        self._lint_engine.stop()
+
     def focus(self):
         self._scrolled_text.focus()
 
@@ -62,7 +82,8 @@ class EditZone():
     def _on_key_press(self, event):
         """
         When an ABC note is input, play that note in order to get a musical
-        feedback.
+        feedback.  The latency of each stage, up to the note on of the synth,
+        is recorded (see latency.py).
 
         Args:
             event: KeyPress event
@@ -77,9 +98,33 @@ class EditZone():
             # Key press without Ctrl/Left Alt/Right Alt modifiers
             # (rem: when a single Ctrl/Alt modifier key is pressed,
             # event.state does not include that key; but we do not care)
+            tracker = latency.default_tracker
+            tracker.start()
             abc_note = abcparser.get_note_to_play(self._buffer, event.char)
-            if abc_note is not None:
-                self._synth.play_midi_note(abc2midi.get_midi_note(abc_note))
+            tracker.mark('get_note_to_play')
+            if abc_note is None:
+                tracker.cancel()
+                return
+            midi_note = abc2midi.get_midi_note(abc_note)
+            tracker.mark('get_midi_note')
+            self._synth.play_midi_note(midi_note)  # Marks the 'noteon' stage
+            tracker.finish()
+
+    def _on_text_modified(self, event):
+        """Called each time the text is modified (typing, paste, undo, ...)
+
+        The buffer is told that the text has changed, then the "modified"
+        flag of the text widget is reset so that the next change triggers a
+        new <<Modified>> event.  The tune is checked again once the user
+        stops typing (see lint_engine.py), and highlighted (see
+        highlighter.py).
+        """
+        if not self._scrolled_text.edit_modified():
+            return  # The event comes from the reset of the flag
+        self._buffer.on_text_modified()
+        self._highlighter.on_text_modified()
+        self._lint_engine.on_text_modified()
+        self._scrolled_text.edit_modified(False)
 
     def _on_key_release(self, event):
         if self._check_text_change_since_last_save_cb:
@@ -108,3 +153,31 @@ class EditZone():
     def on_edit_select_all(self, event=None):
         self._scrolled_text.tag_add('sel', '1.0', 'end')
         return "break"
+
+    def show_playback_range(self, start: Tuple[int, int], end: Tuple[int, int]):
+        """Highlight the part of the text being played (eg a bar) and make it
+        visible
+
+        Args:
+            start: (line number, column) of the beginning of the range
+            end: (line number, column) of the end of the range
+        """
+        start_index, end_index = '{}.{}'.format(*start), '{}.{}'.format(*end)
+        self._scrolled_text.tag_remove(PLAYBACK_TAG, '1.0', tk.END)
+        self._scrolled_text.tag_add(PLAYBACK_TAG, start_index, end_index)
+        self._scrolled_text.see(start_index)
+
+    def hide_playback_range(self):
+        self._scrolled_text.tag_remove(PLAYBACK_TAG, '1.0', tk.END)
+
+    def goto_line(self, line_no: int):
+        """Move the cursor at the beginning of a line and show the line
+
+        The line is shown at the top of the edit zone when possible, so that
+        the tune that starts at this line is visible.
+        """
+        index = '{}.0'.format(line_no)
+        self._scrolled_text.mark_set(tk.INSERT, index)
+        self._scrolled_text.tag_remove(tk.SEL, '1.0', tk.END)
+        self._scrolled_text.yview(index)
+        self._scrolled_text.focus()
@@ -3,6 +3,10 @@
 
 import tkinter as tk
 import tkinter.scrolledtext as tk_scrolledtext
+from typing import List, Optional
+
+from key_index import KeyIndex, get_key_change
+from tune_index import TuneEntry, TuneIndex
 
 
 class EditZoneBuffer:
@@ -18,6 +22,11 @@ class EditZoneBuffer:
 
     def __init__(self, scrolled_text: tk_scrolledtext.ScrolledText):
         self._scrolled_text = scrolled_text
+        # Indexes built on demand, then updated when the text changes (see
+        # on_text_modified())
+        self._tune_index = None
+        self._key_index = None
+        self._guessed = False  # Whether the indexes have been updated from guesses
 
     def get(self):
         """Get the whole buffer contents
@@ -52,6 +61,124 @@ class EditZoneBuffer:
         index_end = str(line_no) + ".end"
         return self._scrolled_text.get(index_start, index_end)
 
+    def get_lines(self, first_line_no: int, last_line_no: int) -> List[str]:
+        """
+        Get the contents of a range of lines.
+
+        :param first_line_no: Number of the first line, starting at 1.
+        :param last_line_no: Number of the last line (included).
+
+        :return: A list of strings, one per line.
+        """
+        index_start = str(first_line_no) + ".0"
+        index_end = str(last_line_no) + ".end"
+        return self._scrolled_text.get(index_start, index_end).split('\n')
+
+    def get_tune_index(self) -> TuneIndex:
+        """Get the index of the tunes in the buffer.
+
+        The index is built on the first call, with a single read of the
+        whole buffer, then updated when the text changes.  The updates may
+        be wrong (see on_text_modified()): use find_tune() to find the tune
+        at a line.
+        """
+        if self._tune_index is None:
+            lines = self.get().split('\n')
+            self._tune_index = TuneIndex.from_lines(lines)
+            # Rebuild the key index from the same text, it may have been
+            # updated from guesses
+            self._key_index = KeyIndex(lines)
+            self._guessed = False
+        return self._tune_index
+
+    def find_tune(self, line_no: int) -> Optional[TuneEntry]:
+        """Find the tune that contains a line, see TuneIndex.find_tune().
+
+        The tune found, and the keys of its lines in the key index, are
+        checked against the text of the tune: if they are wrong, the indexes
+        are built again from the whole text.
+        """
+        tune = self.get_tune_index().find_tune(line_no)
+        if self._guessed and not self._check_tune(tune, line_no):
+            self.invalidate_tune_index()
+            tune = self.get_tune_index().find_tune(line_no)
+        return tune
+
+    def _check_tune(self, tune: Optional[TuneEntry], line_no: int) -> bool:
+        """Tell whether the indexes are right about the tune at a line
+
+        The lines from the beginning of the tune (or of the text if there is
+        no tune) to the line, and to the line after the end of the tune, are
+        indexed again.
+        """
+        if tune is None:  # The text above the line must have no tune
+            first_line_no, last_line_no = 1, line_no
+        else:
+            first_line_no = tune.start_line
+            last_line_no = max(tune.end_line, line_no) + 1
+        lines = self.get_lines(first_line_no, last_line_no)
+        index = TuneIndex.from_lines(lines)
+        if tune is None:
+            if len(index) > 0:
+                return False
+        else:
+            checked_tune = index.find_tune(line_no - first_line_no + 1)
+            if checked_tune is not index.tunes[0] or checked_tune.start_line != 1 \
+                    or checked_tune.end_line != tune.end_line - first_line_no + 1:
+                return False
+            if any(getattr(checked_tune, name) != getattr(tune, name)
+                   for name in ('x', 'titles', 'composer', 'origin', 'rhythm',
+                                'raw_meter', 'raw_note_length', 'raw_key')):
+                return False
+        key_changes = []
+        for key_line_no, line in enumerate(lines, first_line_no):
+            changes_key, raw_key = get_key_change(line)
+            if changes_key:
+                key_changes.append((key_line_no, raw_key))
+        return key_changes == self._key_index.get_key_changes(first_line_no, last_line_no)
+
+    def get_key_index(self) -> KeyIndex:
+        """Get the index of the lines that change the key.
+
+        The index is built on the first call, then updated when the text
+        changes.
+        """
+        if self._key_index is None:
+            self._key_index = KeyIndex(self.get().split('\n'))
+        return self._key_index
+
+    def invalidate_tune_index(self):
+        """Tell the buffer that its text has changed: drop the indexes."""
+        self._tune_index = None
+        self._key_index = None
+
+    def on_text_modified(self):
+        """Tell the buffer that its text has changed (typing, paste, undo...)
+
+        The indexes are updated: the lines added or removed are guessed to
+        end at the cursor, where tkinter leaves it after typing, paste, cut,
+        undo and redo.  If the guess is wrong (eg a selection replaced with
+        a different number of lines), the indexes are wrong until
+        find_tune() finds it out and builds them again.
+        """
+        if self._key_index is None:  # rem: there is no tune index either
+            return
+        # rem: like the text from get(), 'end' counts an extra empty line
+        line_count = int(self._scrolled_text.index(tk.END).split('.')[0])
+        delta = line_count - self._key_index.line_count
+        cursor_line_no = self.get_line_no_at_cursor()
+        first_line_no = cursor_line_no - max(delta, 0)
+        new_lines = self.get_lines(first_line_no, cursor_line_no)
+        old_line_count = len(new_lines) - delta
+        if first_line_no < 1 or first_line_no + old_line_count - 1 > self._key_index.line_count:
+            self.invalidate_tune_index()  # Cannot be a change at the cursor
+            return
+        self._key_index.update(first_line_no, old_line_count, new_lines)
+        if self._tune_index is not None:
+            self._tune_index.update(first_line_no, old_line_count, len(new_lines),
+                                    self.get_lines)
+        self._guessed = True
+
     def get_line_no_at_cursor(self):
         """Get the number of the line where the text cursor is.
 
@@ -68,6 +195,7 @@ class EditZoneBuffer:
 
     def replace(self, text: str):
         """Replace the contents of the buffer with the given text."""
+        self.invalidate_tune_index()
         self._scrolled_text.delete(1.0, tk.END)
         self._scrolled_text.insert(1.0, text)
 
@@ -165,6 +165,10 @@ class File():
         self.open(raw_path)
         return 'break'
 
+    def get_path(self):
+        """Return the normalized path of the file or None for a new file"""
+        return self._path
+
     #
     # Add/remove favorite file
     #
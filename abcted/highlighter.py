@@ -0,0 +1,172 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Syntax highlighting of the edit zone
+
+Highlighting the whole text after each key press would freeze the edit zone
+on a large tunebook.  Instead:
+
+- the text of each line is kept when the line is highlighted: a line is
+  highlighted again only if its text has changed (dirty line), and its
+  tokens come from a token cache;
+
+- after a change, only the visible lines (plus a margin) are checked, so
+  the work per key press does not depend on the size of the file;
+
+- the other lines are checked in idle time, a chunk at a time;
+
+- the tag operations are batched: one tag_add per tag for all the dirty
+  lines of a pass, and one tag_remove per tag and run of dirty lines.
+"""
+
+import tkinter as tk
+import tkinter.scrolledtext as tk_scrolledtext
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import abctokenizer
+import theme
+
+
+MARGIN_LINES = 50       # Lines highlighted above and below the visible lines
+CATCH_UP_LINES = 500    # Lines checked per idle step
+CATCH_UP_DELAY_MS = 300  # Typing pause before the idle steps
+
+# Token kind -> tag
+_TAGS = {
+    abctokenizer.FIELD: 'syntax_field',
+    abctokenizer.INLINE_FIELD: 'syntax_field',
+    abctokenizer.COMMENT: 'syntax_comment',
+    abctokenizer.BAR: 'syntax_bar',
+    abctokenizer.ANNOTATION: 'syntax_annotation',
+    abctokenizer.DECORATION: 'syntax_decoration',
+}
+
+
+def get_tag_ranges(numbered_lines: Iterable[Tuple[int, str]],
+                   token_cache: abctokenizer.TokenCache) -> Dict[str, List[str]]:
+    """Compute the syntax tags of lines of text
+
+    Args:
+        numbered_lines: (line number, text of the line) pairs
+        token_cache: cache of the tokens of the lines
+
+    Returns:
+        tag -> text indices of the ranges of the tag, in pairs (start, end)
+        as expected by tag_add()
+    """
+    ranges: Dict[str, List[str]] = {}
+    for line_no, line in numbered_lines:
+        for kind, col, text in token_cache.tokenize_line(line):
+            tag = _TAGS.get(kind)
+            if tag is not None:
+                ranges.setdefault(tag, []).extend(
+                    (f'{line_no}.{col}', f'{line_no}.{col + len(text)}'))
+    return ranges
+
+
+class Highlighter:
+    def __init__(self, scrolled_text: tk_scrolledtext.ScrolledText, theme: theme.Theme):
+        self._text = scrolled_text
+        self._token_cache = abctokenizer.default_token_cache
+        colors = {'syntax_field': theme.fieldfg, 'syntax_comment': theme.commentfg,
+                  'syntax_bar': theme.barfg, 'syntax_annotation': theme.annotationfg,
+                  'syntax_decoration': theme.decorationfg}
+        for tag, color in colors.items():
+            self._text.tag_config(tag, foreground=color)
+        self._tags = tuple(colors)
+
+        # Text of each line when it was last highlighted, None if the line
+        # has not been highlighted yet
+        self._painted: List[Optional[str]] = [None]
+        self._paint_id = None     # after_idle() of the highlighting of the visible lines
+        self._catch_up_id = None  # after() of the next idle step
+        self._catch_up_line = 1   # First line of the next idle step
+
+        # Highlight the lines that become visible when the text is scrolled
+        self._text.config(yscrollcommand=self._on_yscroll)
+
+    def on_text_modified(self):
+        """Tell the highlighter that the text has changed: highlight the
+        visible lines now, the other lines later"""
+        self._update_line_count()
+        self._highlight_visible_lines()
+        if self._catch_up_id is not None:
+            self._text.after_cancel(self._catch_up_id)
+        self._catch_up_line = 1
+        self._catch_up_id = self._text.after(CATCH_UP_DELAY_MS, self._catch_up)
+
+    def _update_line_count(self):
+        """Keep one entry of self._painted per line
+
+        The lines added or removed are guessed to end at the cursor (typing,
+        paste, undo...): the entries of the lines below are moved so that
+        these lines, that keep their tags, are not highlighted again.  A
+        wrong guess only costs the highlighting of a few more lines.
+        """
+        line_count = int(self._text.index('end-1c').split('.')[0])
+        delta = line_count - len(self._painted)
+        if delta == 0:
+            return
+        cursor_line = int(self._text.index(tk.INSERT).split('.')[0])
+        if delta > 0:
+            index = max(cursor_line - delta, 0)
+            self._painted[index:index] = [None] * delta
+        else:
+            del self._painted[cursor_line:cursor_line - delta]
+        del self._painted[line_count:]
+        self._painted.extend([None] * (line_count - len(self._painted)))
+
+    def _on_yscroll(self, first: str, last: str):
+        self._text.vbar.set(first, last)
+        if self._paint_id is None:
+            self._paint_id = self._text.after_idle(self._highlight_visible_lines)
+
+    def _highlight_visible_lines(self):
+        self._paint_id = None
+        first_line_no = int(self._text.index('@0,0').split('.')[0])
+        last_line_no = int(self._text.index(
+            '@0,{}'.format(self._text.winfo_height())).split('.')[0])
+        self._highlight_lines(first_line_no - MARGIN_LINES, last_line_no + MARGIN_LINES)
+
+    def _catch_up(self):
+        """Idle step: check a chunk of lines, then schedule the next step"""
+        last_line_no = self._catch_up_line + CATCH_UP_LINES - 1
+        self._highlight_lines(self._catch_up_line, last_line_no)
+        if last_line_no >= len(self._painted):
+            self._catch_up_id = None
+            return
+        self._catch_up_line = last_line_no + 1
+        self._catch_up_id = self._text.after_idle(self._catch_up)
+
+    def _highlight_lines(self, first_line_no: int, last_line_no: int):
+        """Highlight the dirty lines of a range of lines"""
+        first_line_no = max(first_line_no, 1)
+        last_line_no = min(last_line_no, len(self._painted))
+        if first_line_no > last_line_no:
+            return
+        lines = self._text.get(f'{first_line_no}.0', f'{last_line_no}.end').split('\n')
+        dirty_lines = []
+        for line_no, line in enumerate(lines, first_line_no):
+            if self._painted[line_no - 1] != line:
+                self._painted[line_no - 1] = line
+                dirty_lines.append((line_no, line))
+        if not dirty_lines:
+            return
+
+        # Remove the tags of the dirty lines: one range per run of dirty lines
+        # rem: unlike tag_add(), tag_remove() takes a single range
+        remove_ranges = []
+        run_start = run_end = dirty_lines[0][0]
+        for line_no, line in dirty_lines[1:]:
+            if line_no != run_end + 1:
+                remove_ranges.append((f'{run_start}.0', f'{run_end}.end'))
+                run_start = line_no
+            run_end = line_no
+        remove_ranges.append((f'{run_start}.0', f'{run_end}.end'))
+        for tag in self._tags:
+            for start, end in remove_ranges:
+                self._text.tag_remove(tag, start, end)
+
+        for tag, ranges in get_tag_ranges(dirty_lines, self._token_cache).items():
+            self._text.tag_add(tag, *ranges)
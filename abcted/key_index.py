@@ -0,0 +1,106 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Index the lines of a text that change the key, to find the key at a line
+
+The lines that change the key are the key fields (K:), the lines with inline
+key fields (eg '[K:D]') and the reference numbers (X:): a new tune has no
+key until its K: field.  Finding the key at a line is a bisection in the
+sorted list of these lines.
+
+Unlike the tune index (see tune_index.py), the key index is updated in place
+when lines of the text change (see update()): it is used on each key press
+in the edit zone.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+
+
+def get_key_change(line: str) -> Tuple[bool, Optional[str]]:
+    """Find whether a line changes the key
+
+    Args:
+        line: a line of raw ABC text
+
+    Returns:
+        A tuple (whether the line changes the key, raw key after the line).
+        The raw key is the text following 'K:' in the last key field of the
+        line, None for a reference number (X:).
+    """
+    if line[1:2] == ':':
+        if line[0] == 'K':
+            return True, line[2:]
+        if line[0] == 'X':
+            return True, None
+        return False, None
+    if line.lstrip().startswith('X:'):
+        return True, None
+    i = line.split('%')[0].rfind('[K:')
+    if i < 0:
+        return False, None
+    return True, line[i + 3:].split(']')[0]
+
+
+class KeyIndex:
+    def __init__(self, lines: Iterable[str] = ()):
+        """
+        Args:
+            lines: lines of text (without end of lines)
+        """
+        self._lines: List[int] = []  # Lines that change the key, sorted
+        self._raw_keys: List[Optional[str]] = []  # Raw key after each of these lines
+        self.line_count = 0
+        self.update(1, 0, list(lines))
+
+    def __len__(self):
+        return len(self._lines)
+
+    def update(self, first_line_no: int, old_line_count: int, new_lines: List[str]):
+        """Replace lines of the text
+
+        Args:
+            first_line_no: number of the first line replaced, starting at 1
+            old_line_count: number of lines replaced (0 to insert lines)
+            new_lines: text of the new lines
+        """
+        delta = len(new_lines) - old_line_count
+        i = bisect_left(self._lines, first_line_no)
+        j = bisect_left(self._lines, first_line_no + old_line_count)
+        lines, raw_keys = [], []
+        for line_no, line in enumerate(new_lines, first_line_no):
+            changes_key, raw_key = get_key_change(line)
+            if changes_key:
+                lines.append(line_no)
+                raw_keys.append(raw_key)
+        if delta == 0:  # Typing in a line: the lines below do not move
+            self._lines[i:j] = lines
+        else:
+            self._lines[i:] = lines + [line_no + delta for line_no in self._lines[j:]]
+        self._raw_keys[i:j] = raw_keys
+        self.line_count += delta
+
+    def get_key_changes(self, first_line_no: int,
+                        last_line_no: int) -> List[Tuple[int, Optional[str]]]:
+        """Return the (line number, raw key) pairs of the lines of a range
+        of lines that change the key, see get_key_change()"""
+        i = bisect_left(self._lines, first_line_no)
+        j = bisect_right(self._lines, last_line_no)
+        return list(zip(self._lines[i:j], self._raw_keys[i:j]))
+
+    def get_raw_key(self, line_no: int) -> Optional[str]:
+        """Find the key that applies after a line
+
+        Args:
+            line_no: line number, starting at 1
+
+        Returns:
+            The raw key set by the closest line at or above the line that
+            changes the key, None if there is no such line or if it is a
+            reference number (X:).
+        """
+        k = bisect_right(self._lines, line_no) - 1
+        if k < 0:
+            return None
+        return self._raw_keys[k]
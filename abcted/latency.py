@@ -0,0 +1,143 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measure the latency of the musical feedback: from a key press in the edit
+zone to the note on of the synth
+
+A key press goes through stages (eg 'get_note_to_play', 'get_midi_note',
+'noteon'): the tracker takes a monotonic timestamp at the end of each stage
+and records the duration of each stage, and the total duration, in
+histograms.
+
+The histograms are HDR-style (High Dynamic Range): the buckets are linear
+within each power of two, so the relative error of a percentile is bounded
+(less than 1/64, ie 1.6%) from 1 microsecond to minutes, with about a
+thousand counters per histogram.  Recording a value is a few integer
+operations: the tracker is always on.
+"""
+
+from array import array
+import time
+from typing import Callable, Dict, Optional
+
+
+SUB_BUCKET_BITS = 7  # 128 sub-buckets per power of two: relative error < 1/64
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKET_COUNT = SUB_BUCKET_COUNT // 2
+MAX_VALUE = 60 * 1000 * 1000  # Microseconds, larger values are clamped
+
+TOTAL = 'total'  # Stage name of the total duration
+
+
+def _get_index(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return (shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+
+def _get_highest_value(index: int) -> int:
+    """Highest value of a bucket"""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index >> (SUB_BUCKET_BITS - 1)) - 1
+    mantissa = index - (shift << (SUB_BUCKET_BITS - 1))
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Histogram of durations, in microseconds"""
+
+    def __init__(self):
+        self._counts = array('Q', bytes(8 * (_get_index(MAX_VALUE) + 1)))
+        self.count = 0
+        self.total = 0  # Sum of the values
+        self.max = 0
+
+    def record(self, value: int):
+        """Record a duration, in microseconds"""
+        value = min(max(value, 0), MAX_VALUE)
+        self._counts[_get_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def get_percentile(self, percentile: float) -> int:
+        """Return the value below or at which a percentage of the recorded
+        values are (the highest value of its bucket), 0 if the histogram is
+        empty"""
+        rank = max(self.count * percentile / 100, 1)
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return min(_get_highest_value(index), self.max)
+        return 0
+
+    def format(self) -> str:
+        """Summary of the histogram, eg 'n=42 p50=0.41ms p95=0.80ms
+        p99=1.20ms max=3.10ms'"""
+        if self.count == 0:
+            return 'n=0'
+        values = [(f'p{percentile}', self.get_percentile(percentile))
+                  for percentile in (50, 95, 99)]
+        values.append(('max', self.max))
+        return f'n={self.count} ' + ' '.join(f'{name}={value / 1000:.2f}ms'
+                                             for name, value in values)
+
+
+class LatencyTracker:
+    """Record the durations of the stages of the key presses, see the module
+    documentation"""
+
+    def __init__(self, clock: Callable[[], int] = time.monotonic_ns):
+        """
+        Args:
+            clock: monotonic clock, in nanoseconds
+        """
+        self._clock = clock
+        self.histograms: Dict[str, LatencyHistogram] = {}  # Stage -> histogram
+        self._start: Optional[int] = None  # Timestamp of the key press being tracked
+        self._last: Optional[int] = None   # Timestamp of the end of the last stage
+
+    def start(self):
+        """Start tracking a key press"""
+        self._start = self._last = self._clock()
+
+    def mark(self, stage: str):
+        """End a stage of the key press being tracked, if any"""
+        if self._start is None:
+            return
+        now = self._clock()
+        self._record(stage, now - self._last)
+        self._last = now
+
+    def finish(self):
+        """Stop tracking the key press: record the total duration, from the
+        start to the end of the last stage"""
+        if self._start is None:
+            return
+        self._record(TOTAL, self._last - self._start)
+        self._start = self._last = None
+
+    def cancel(self):
+        """Stop tracking the key press without recording its total duration
+        (eg no note to play)"""
+        self._start = self._last = None
+
+    def _record(self, stage: str, duration_ns: int):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(duration_ns // 1000)
+
+    def format(self) -> str:
+        """Summary of the histograms, one line per stage, the total last"""
+        stages = sorted(self.histograms, key=lambda stage: stage == TOTAL)
+        return '\n'.join(f'{stage}: {self.histograms[stage].format()}' for stage in stages)
+
+
+# Tracker of the key presses of the edit zone
+default_tracker = LatencyTracker()
@@ -0,0 +1,139 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Check the tune being edited in the background, see abclint.py
+
+When the user stops typing for a short time (debounce), the tune at the
+cursor is copied and checked in a worker thread, then the problems found are
+underlined in the edit zone.  Typing never waits for a check: a check that
+becomes stale (the text has changed again) is cancelled, and only the
+results of the latest check are shown.
+"""
+
+import logging as log
+import queue
+import threading
+import tkinter as tk
+import tkinter.scrolledtext as tk_scrolledtext
+from typing import List, Optional, Tuple
+
+import abclint
+from edit_zone_buffer import EditZoneBuffer
+import theme
+
+
+LINT_DELAY_MS = 300  # Typing pause before a check
+POLL_DELAY_MS = 50   # Period of the polling of the results of a check
+LINT_TAG = 'lint'
+
+
+class LintEngine:
+    def __init__(self, scrolled_text: tk_scrolledtext.ScrolledText,
+                 buffer: EditZoneBuffer, theme: theme.Theme):
+        self._scrolled_text = scrolled_text
+        self._buffer = buffer
+        self._scrolled_text.tag_config(LINT_TAG, underline=True,
+                                       foreground=theme.lintfg)
+
+        # Each change of the text starts a new generation: the checks of
+        # the previous generations are stale
+        self._generation = 0
+        self._delay_id = None  # after() of the next check
+        self._poll_id = None   # after() of the polling of the results
+        self.diagnostics: List[abclint.Diagnostic] = []
+
+        # Next check for the worker thread: at most one check is waiting,
+        # a new check replaces the waiting one
+        self._condition = threading.Condition()
+        self._job: Optional[Tuple[int, List[str], int]] = None
+        self._stopped = False
+        self._results = queue.Queue()  # (generation, diagnostics)
+        self._worker = threading.Thread(target=self._run_worker, name='lint', daemon=True)
+        self._worker.start()
+
+    def on_text_modified(self):
+        """Tell the engine that the text has changed: (re)start the delay
+        before the next check"""
+        self._generation += 1
+        if self._delay_id is not None:
+            self._scrolled_text.after_cancel(self._delay_id)
+        self._delay_id = self._scrolled_text.after(LINT_DELAY_MS, self._start_job)
+
+    def stop(self):
+        """Stop the checks and the worker thread"""
+        for after_id in (self._delay_id, self._poll_id):
+            if after_id is not None:
+                self._scrolled_text.after_cancel(after_id)
+        self._delay_id = self._poll_id = None
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    # ------------------------------------------------------------------------
+    # Main thread
+    # ------------------------------------------------------------------------
+
+    def _start_job(self):
+        """Copy the tune at the cursor and hand it to the worker thread"""
+        self._delay_id = None
+        tune = self._buffer.find_tune(self._buffer.get_line_no_at_cursor())
+        if tune is None:
+            # No check: stop polling the results of the stale checks
+            if self._poll_id is not None:
+                self._scrolled_text.after_cancel(self._poll_id)
+                self._poll_id = None
+            self._show_diagnostics([])
+            return
+        raw_tune = self._buffer.get_lines(tune.start_line, tune.end_line)
+        with self._condition:
+            self._job = (self._generation, raw_tune, tune.start_line)
+            self._condition.notify()
+        if self._poll_id is None:
+            self._poll_id = self._scrolled_text.after(POLL_DELAY_MS, self._poll_results)
+
+    def _poll_results(self):
+        self._poll_id = None
+        while True:
+            try:
+                generation, diagnostics = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._generation:
+                self._show_diagnostics(diagnostics)
+                return
+        self._poll_id = self._scrolled_text.after(POLL_DELAY_MS, self._poll_results)
+
+    def _show_diagnostics(self, diagnostics: List[abclint.Diagnostic]):
+        self.diagnostics = diagnostics
+        self._scrolled_text.tag_remove(LINT_TAG, '1.0', tk.END)
+        for diagnostic in diagnostics:
+            log.debug('lint: {}.{}: {}'.format(diagnostic.line, diagnostic.col,
+                                               diagnostic.message))
+            self._scrolled_text.tag_add(LINT_TAG, f'{diagnostic.line}.{diagnostic.col}',
+                                        f'{diagnostic.end_line}.{diagnostic.end_col}')
+
+    # ------------------------------------------------------------------------
+    # Worker thread: must not call Tk
+    # ------------------------------------------------------------------------
+
+    def _run_worker(self):
+        while True:
+            with self._condition:
+                while self._job is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, raw_tune, first_line_no = self._job
+                self._job = None
+            try:
+                diagnostics = abclint.check_tune(
+                    raw_tune, first_line_no,
+                    is_cancelled=lambda: generation != self._generation)
+            except abclint.LintCancelled:
+                log.debug(f'lint: check of generation {generation} cancelled')
+                continue
+            except Exception as e:  # Catch-all handler: the tune may be anything
+                log.debug(f'lint: check failed: {type(e).__name__}: {e}')
+                diagnostics = []
+            self._results.put((generation, diagnostics))
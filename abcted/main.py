@@ -4,7 +4,7 @@
 import argparse
 import logging as log
 
-import root_window
+import startup_trace
 
 
 def parse_args():
@@ -14,6 +14,9 @@ def parse_args():
                         action='store_true')
     parser.add_argument("-l", "--libfluidsynth-path",
                         help="Path to libfluidsynth (default: pyfluidsynth3 will try to find it).")
+    parser.add_argument('-t', '--trace-startup',
+                        help='Affiche les durées du démarrage, par phase et par import',
+                        action='store_true')
     parser.add_argument('filename', help='Fichier ABC à ouvrir au démarrage (optionnel)',
                         type=str, nargs='?')
     args = parser.parse_args()
@@ -35,11 +38,39 @@ def setup_logging(enable_debug):
     # https://docs.python.org/3/library/logging.html#logrecord-attributes
 
 
+def report_startup_trace_after_first_paint(tk_root):
+    """Log the startup trace once the root window is drawn: the first
+    Expose event schedules the drawing of the widgets in idle time, and the
+    report is scheduled after them"""
+    trace = startup_trace.default_trace
+
+    def on_expose(event):
+        tk_root.unbind('<Expose>', funcid)
+        tk_root.after_idle(on_first_paint)
+
+    def on_first_paint():
+        trace.mark('first paint')
+        trace.uninstall_import_hook()
+        log.info('startup time:\n' + trace.format())
+
+    funcid = tk_root.bind('<Expose>', on_expose, '+')
+
+
 def main():
     args = parse_args()
     setup_logging(enable_debug=args.debug)
+    trace = startup_trace.default_trace
+    if args.trace_startup:
+        trace.install_import_hook()
+    trace.mark('arguments')
+
+    import root_window  # Imported here so that its imports can be traced
+    trace.mark('imports')
+
     root_win = root_window.RootWindow(raw_path=args.filename,
                                       libfluidsynth_path=args.libfluidsynth_path)
+    if args.trace_startup:
+        report_startup_trace_after_first_paint(root_win.tk_root)
     root_win.tk_root.mainloop()
 
 
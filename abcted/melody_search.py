@@ -0,0 +1,233 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Find tunes by their melody, in any key
+
+A tune is turned into the sequence of the intervals (in semitones) between
+its successive notes: this sequence does not depend on the key the tune is
+written in.  The melody index is an inverted index of the interval n-grams
+(NGRAM_LENGTH successive intervals) of the tunes.
+
+A query is a phrase of ABC notes, eg 'ADED A2dc', turned into intervals the
+same way.  The candidate tunes are the tunes that contain enough n-grams of
+the query.  They are ranked first by whether they contain the whole query
+melody, then by the number of n-grams of the query they contain.  The query
+notes are read in the key of C, unless the query starts with an inline key
+field, eg '[K:G] GFGA Bcde'.
+
+To be robust to rhythm variations, repeated notes (eg 'A2' vs 'AA') are
+merged, rests are ignored and only the first note of a chord is used.  Grace
+notes are ignored.
+"""
+
+from array import array
+from collections import Counter
+import heapq
+import logging as log
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import abc2midi
+from abcparser import AbcParser, AbcParserException
+import abctokenizer
+import musictheory
+import recent_files
+from tune_index import TuneEntry
+import tune_index_cache
+from tune_search import SearchResult
+
+
+NGRAM_LENGTH = 3  # Number of intervals in an n-gram, ie 4 notes
+
+MIN_SCORE = 0.5  # Minimum ratio of query n-grams found in a tune
+
+DEFAULT_KEY = ('C', 'maj')
+
+_get_midi_note = abc2midi.MIDI_NOTES.__getitem__
+
+
+def get_pitches(raw_lines: Iterable[str],
+                token_cache: Optional[abctokenizer.TokenCache] = None) -> List[int]:
+    """Return the MIDI pitches of the melody of a tune
+
+    Key changes (K: fields and inline fields) and accidentals (they apply to
+    the notes of the same pitch until the end of the bar) are taken into
+    account.  Repeated notes are merged.
+
+    Args:
+        raw_lines: lines of raw ABC text, eg a raw tune
+        token_cache: token cache to use, the default token cache if None
+
+    Returns:
+        A list of MIDI note numbers.
+    """
+    if token_cache is None:
+        token_cache = abctokenizer.default_token_cache
+    key_alterations = musictheory.get_key_alterations(DEFAULT_KEY)
+    bar_alterations = {}  # Note (letter + octave) -> alteration in the bar
+    in_chord = False
+    chord_note_seen = False
+    in_grace = False
+    pitches = []
+    last_pitch = None
+    for line in raw_lines:
+        for kind, col, text in token_cache.tokenize_line(line):
+            if kind == abctokenizer.NOTE:
+                if in_grace or chord_note_seen:
+                    continue
+                chord_note_seen = in_chord
+                if text[0] in '^_=':
+                    accidental, letter, octave, length = abctokenizer.split_note(text)
+                    alteration = '' if accidental == '=' else accidental
+                    bar_alterations[letter + octave] = alteration
+                else:
+                    letter = text[0]
+                    octave = text[1:].rstrip('0123456789/')
+                    alteration = bar_alterations.get(letter + octave)
+                    if alteration is None:
+                        alteration = key_alterations[letter]
+                pitch = _get_midi_note(alteration + letter) \
+                    + 12 * (octave.count("'") - octave.count(','))
+                if pitch != last_pitch:
+                    pitches.append(pitch)
+                    last_pitch = pitch
+            elif kind == abctokenizer.BAR:
+                bar_alterations = {}
+            elif kind == abctokenizer.CHORD_START:
+                in_chord = True
+            elif kind == abctokenizer.CHORD_END:
+                in_chord = chord_note_seen = False
+            elif kind == abctokenizer.GRACE_START:
+                in_grace = True
+            elif kind == abctokenizer.GRACE_END:
+                in_grace = False
+            elif kind == abctokenizer.FIELD or kind == abctokenizer.INLINE_FIELD:
+                field = text.lstrip('[')
+                if field.startswith('K:'):
+                    raw_key = field[2:].split('%')[0].rstrip(' ]')
+                    try:
+                        key_alterations = musictheory.get_key_alterations(
+                            AbcParser.normalize_abc_key(raw_key))
+                    except (AbcParserException, IndexError):
+                        pass  # Invalid or empty key: keep the current key
+    return pitches
+
+
+def get_intervals(pitches: List[int]) -> bytes:
+    """Return the intervals between successive pitches, as signed bytes"""
+    return array('b', [max(-128, min(127, b - a))
+                       for a, b in zip(pitches, pitches[1:])]).tobytes()
+
+
+def _get_ngrams(intervals: bytes) -> set:
+    return {intervals[i:i + NGRAM_LENGTH]
+            for i in range(len(intervals) - NGRAM_LENGTH + 1)}
+
+
+class MelodyIndex:
+    """Inverted index of the interval n-grams of the tunes of tunebooks"""
+
+    def __init__(self):
+        self._tunes: List[Tuple[str, TuneEntry]] = []  # Tune id -> (path, tune)
+        self._intervals: List[bytes] = []  # Tune id -> intervals of the tune
+        self._postings: Dict[bytes, array] = {}  # N-gram -> tune ids
+
+    def __len__(self):
+        return len(self._tunes)
+
+    def add_tune(self, path: str, tune: TuneEntry, intervals: bytes):
+        """Add a tune to the index
+
+        Args:
+            path: normalized path of the tunebook of the tune
+            tune: tune entry in the index of the tunebook
+            intervals: intervals of the melody of the tune, see get_intervals()
+        """
+        tune_id = len(self._tunes)
+        self._tunes.append((path, tune))
+        self._intervals.append(intervals)
+        postings = self._postings
+        for ngram in _get_ngrams(intervals):
+            tune_ids = postings.get(ngram)
+            if tune_ids is None:
+                postings[ngram] = array('i', (tune_id,))
+            else:
+                tune_ids.append(tune_id)
+
+    def search(self, query: str, max_results: int = 50) -> List[SearchResult]:
+        """Find the tunes that contain a melody, in any key
+
+        Args:
+            query: ABC notes, eg 'ADED A2dc', see the module doc
+            max_results: maximum number of results
+
+        Returns:
+            The tunes found, best matches first.  The score is 1.0 if the
+            tune contains the whole query melody, else it is based on the
+            ratio of the query n-grams found in the tune.
+        """
+        query_intervals = get_intervals(get_pitches([query]))
+        query_ngrams = _get_ngrams(query_intervals)
+        if not query_ngrams:
+            return []
+        counts = Counter()
+        for ngram in query_ngrams:
+            counts.update(self._postings.get(ngram, ()))
+
+        min_count = MIN_SCORE * len(query_ngrams)
+        intervals = self._intervals
+        scores = ((1.0 if query_intervals in intervals[tune_id]
+                   else count / (len(query_ngrams) + 1), -tune_id)
+                  for tune_id, count in counts.items() if count >= min_count)
+        # Best scores first, then tunes in index order
+        return [SearchResult(*self._tunes[-minus_tune_id], score)
+                for score, minus_tune_id in heapq.nlargest(max_results, scores)]
+
+
+# Intervals of the tunes of the tunebooks already indexed:
+# path -> (size, mtime_ns, [(tune, intervals), ...])
+_tunebook_intervals = {}
+
+
+def _get_tunebook_intervals(path: str) -> List[Tuple[TuneEntry, bytes]]:
+    """Return the tunes of a tunebook with the intervals of their melody
+
+    Raises:
+        OSError: the file cannot be read
+    """
+    stat = os.stat(path)
+    cached = _tunebook_intervals.get(path)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    tune_intervals = []
+    # The lines of a tunebook are seen only once: do not fill the shared
+    # token cache with them
+    token_cache = abctokenizer.TokenCache(max_lines=1000)
+    with tune_index_cache.open_tunebook(path) as tunebook:
+        for tune in tunebook.index.tunes:
+            try:
+                raw_tune = tunebook.get_raw_tune(tune)
+            except UnicodeDecodeError:
+                continue
+            tune_intervals.append(
+                (tune, get_intervals(get_pitches(raw_tune, token_cache))))
+    _tunebook_intervals[path] = (stat.st_size, stat.st_mtime_ns, tune_intervals)
+    return tune_intervals
+
+
+def build_melody_index() -> MelodyIndex:
+    """Index the melodies of the tunes of the recent and favorite files.
+
+    The files that cannot be read are skipped.
+    """
+    melody_index = MelodyIndex()
+    for path in recent_files.get_recent_files():
+        try:
+            for tune, intervals in _get_tunebook_intervals(path):
+                melody_index.add_tune(path, tune, intervals)
+        except OSError as e:
+            log.debug('cannot index ' + path + ': ' + str(e))
+    log.debug(f'melody index: {len(melody_index)} tunes')
+    return melody_index
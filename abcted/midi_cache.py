@@ -0,0 +1,203 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Keep the MIDI conversions of the tunes in a cache
+
+The cache is content-addressed: the key of a tune is a hash of its
+normalized lines and of the conversion options, so an unchanged tune is
+found in the cache whatever its position in the tunebook, and a modified
+tune gets a new key.
+
+The MIDI data is kept in memory.  The MIDI player needs a file: the data is
+also written to a file in a cache directory when a file is requested.  Both
+the memory and the disk usage are bounded: the least recently used entries
+are first dropped from memory (their file is kept, or written, so that the
+data can be read again: spill to disk), then removed from the disk.
+
+The cache lives for the session: the cache directory is removed by clear().
+"""
+
+from collections import OrderedDict
+import hashlib
+import logging as log
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+
+import abc2midi
+
+
+# Version of the MIDI conversion, part of the cache key.  To be incremented
+# each time the conversion changes (the cache lives for the session: this only
+# matters if the cache directory is ever kept between sessions).
+CONVERSION_VERSION = 1
+
+MAX_MEMORY_SIZE = 8 * 1024 * 1024   # Bytes of MIDI data kept in memory
+MAX_DISK_SIZE = 64 * 1024 * 1024    # Bytes of MIDI files kept on disk
+
+
+def get_tune_key(raw_tune: Iterable[str], options: Tuple = ()) -> str:
+    """Return the cache key of a tune.
+
+    The lines are normalized (trailing spaces and trailing empty lines are
+    removed) so that changes that do not change the music do not change
+    the key.
+
+    Args:
+        raw_tune: lines of raw ABC text of the tune
+        options: conversion options, eg (instrument, ...); they have to be
+            hashable with repr()
+
+    Returns:
+        A hexadecimal hash.
+    """
+    lines = [line.rstrip() for line in raw_tune]
+    while lines and not lines[-1]:
+        lines.pop()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((CONVERSION_VERSION, options)).encode('utf-8'))
+    digest.update('\n'.join(lines).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _Entry:
+    __slots__ = ('data', 'path', 'size')
+
+    def __init__(self, data: bytes):
+        self.data: Optional[bytes] = data  # None once dropped from memory
+        self.path: Optional[str] = None    # MIDI file, None if not written
+        self.size = len(data)
+
+
+class MidiCache:
+    """Size-bounded LRU cache of MIDI conversions, in memory and on disk"""
+
+    def __init__(self, max_memory_size: int = MAX_MEMORY_SIZE,
+                 max_disk_size: int = MAX_DISK_SIZE):
+        self._max_memory_size = max_memory_size
+        self._max_disk_size = max_disk_size
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()  # Least recent first
+        self._memory_size = 0
+        self._disk_size = 0
+        self._dir: Optional[str] = None  # Created on demand
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str):
+        return key in self._entries
+
+    def get_midi_data(self, raw_tune: List[str], options: Tuple = ()) -> bytes:
+        """Return the MIDI data of a tune, convert the tune if needed.
+
+        Args:
+            raw_tune: lines of raw ABC text of the tune
+            options: conversion options, see get_tune_key()
+        """
+        entry = self._get_entry(raw_tune, options)
+        if entry.data is None:
+            with open(entry.path, 'rb') as midi_file:
+                entry.data = midi_file.read()
+            self._memory_size += entry.size
+            self._evict()
+        return entry.data
+
+    def get_midi_file(self, raw_tune: List[str], options: Tuple = ()) -> str:
+        """Return the path of a MIDI file of a tune, convert the tune if needed.
+
+        The file belongs to the cache: it must not be modified or removed.
+
+        Args:
+            raw_tune: lines of raw ABC text of the tune
+            options: conversion options, see get_tune_key()
+        """
+        key = get_tune_key(raw_tune, options)
+        entry = self._get_entry(raw_tune, options, key)
+        if entry.path is None:
+            self._write_file(key, entry)
+            self._evict()
+        return entry.path
+
+    def _get_entry(self, raw_tune: List[str], options: Tuple,
+                   key: Optional[str] = None) -> _Entry:
+        if key is None:
+            key = get_tune_key(raw_tune, options)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            log.debug('MIDI cache hit: ' + key)
+            return entry
+
+        self.misses += 1
+        log.debug('MIDI cache miss: ' + key)
+        entry = _Entry(abc2midi.get_midi_data(raw_tune))
+        self._entries[key] = entry
+        self._memory_size += entry.size
+        self._evict()
+        return entry
+
+    def _write_file(self, key: str, entry: _Entry):
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix='abcted-midi-')
+        path = os.path.join(self._dir, key + '.mid')
+        with open(path, 'wb') as midi_file:
+            midi_file.write(entry.data)
+        entry.path = path
+        self._disk_size += entry.size
+
+    def _evict(self):
+        """Drop the least recently used entries until the cache fits in its
+        bounds.  The most recently used entry is always kept."""
+        keys = list(self._entries)[:-1]
+        # Spill to disk: drop the data from memory, keep (or write) the file
+        for key in keys:
+            if self._memory_size <= self._max_memory_size:
+                break
+            entry = self._entries[key]
+            if entry.data is None:
+                continue
+            if entry.path is None:
+                try:
+                    self._write_file(key, entry)
+                except OSError as e:
+                    log.warning('Failed to write to the MIDI cache: ' + str(e))
+                    del self._entries[key]
+            entry.data = None
+            self._memory_size -= entry.size
+        # Remove files, and the entries that are neither in memory nor on disk
+        for key in keys:
+            if self._disk_size <= self._max_disk_size:
+                break
+            entry = self._entries.get(key)
+            if entry is None or entry.path is None:
+                continue
+            self._remove_file(entry)
+            if entry.data is None:
+                del self._entries[key]
+
+    def _remove_file(self, entry: _Entry):
+        try:
+            os.remove(entry.path)
+        except OSError as e:
+            log.debug('Failed to remove a MIDI cache file: ' + str(e))
+        entry.path = None
+        self._disk_size -= entry.size
+
+    def clear(self):
+        """Empty the cache and remove its files"""
+        self._entries.clear()
+        self._memory_size = 0
+        self._disk_size = 0
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
+# Cache shared by the application
+default_midi_cache = MidiCache()
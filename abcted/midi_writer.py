@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Write the notes of a tune as a Standard MIDI File, in memory
+
+The MIDI file has a single track (format 0) with the time signature, the
+tempo changes and the notes of the tune.  The notes come from
+abcevents.parse_events(), the repeats should be unfolded first (see
+TuneEvents.unfold_repeats()).
+"""
+
+import struct
+from typing import List, Tuple
+
+from abcevents import DEFAULT_TEMPO_QPM, TICKS_PER_QUARTER, TuneEvents
+
+
+# Order of the events that happen at the same tick
+_META_EVENT = 0
+_NOTE_OFF = 1
+_NOTE_ON = 2
+
+
+def _encode_variable_length(value: int) -> bytes:
+    """Encode a delta time or a length as a MIDI variable length quantity"""
+    data = bytearray((value & 0x7f,))
+    value >>= 7
+    while value:
+        data.append(0x80 | (value & 0x7f))
+        value >>= 7
+    data.reverse()
+    return bytes(data)
+
+
+def _get_tempo_event(qpm: float) -> bytes:
+    microseconds_per_quarter = min(round(60_000_000 / qpm), 0xffffff)
+    return b'\xff\x51\x03' + microseconds_per_quarter.to_bytes(3, 'big')
+
+
+def _get_time_signature_event(num: int, den: int) -> bytes:
+    # The denominator is a power of 2: only its exponent is written
+    den_exponent = max(den.bit_length() - 1, 0)
+    return bytes((0xff, 0x58, 0x04, num & 0xff, den_exponent, 24, 8))
+
+
+def write_midi(events: TuneEvents) -> bytes:
+    """Serialize the notes of a tune to a Standard MIDI File
+
+    Args:
+        events: the notes of the tune
+
+    Returns:
+        The contents of the MIDI file.
+    """
+    messages: List[Tuple[int, int, bytes]] = []  # (tick, order, message)
+    if events.meter is not None:
+        messages.append((0, _META_EVENT, _get_time_signature_event(*events.meter)))
+    if not events.tempos or events.tempos[0][0] > 0:
+        messages.append((0, _META_EVENT, _get_tempo_event(DEFAULT_TEMPO_QPM)))
+    for tick, qpm in events.tempos:
+        messages.append((tick, _META_EVENT, _get_tempo_event(qpm)))
+
+    for pitch, onset, duration, velocity, channel, bar, offset in events.notes():
+        if duration <= 0:
+            continue
+        messages.append((onset, _NOTE_ON, bytes((0x90 | channel, pitch, velocity))))
+        messages.append((onset + duration, _NOTE_OFF, bytes((0x80 | channel, pitch, 0))))
+    messages.sort(key=lambda message: message[:2])
+
+    track = bytearray()
+    time = 0
+    for tick, order, message in messages:
+        track += _encode_variable_length(tick - time)
+        track += message
+        time = tick
+    end_tick = max(events.end_tick, time)
+    track += _encode_variable_length(end_tick - time) + b'\xff\x2f\x00'  # End of track
+
+    header = b'MThd' + struct.pack('>IHHH', 6, 0, 1, TICKS_PER_QUARTER)
+    return header + b'MTrk' + struct.pack('>I', len(track)) + bytes(track)
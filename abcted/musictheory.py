@@ -5,6 +5,9 @@
 Tools and constants with the knowledge of the musical theory
 """
 
+from array import array
+
+
 MAJOR_SCALES = {
     'Cmaj' : ['C', 'D', 'E', 'F', 'G', 'A', 'B'],
 
@@ -41,16 +44,16 @@ MAJOR_SCALE_INTERVALS = [0, 2, 4, 5, 7, 9, 11]
 C_MAJOR_SCALE_INTERVALS = dict(zip(C_MAJOR_SCALE, MAJOR_SCALE_INTERVALS))
 
 
-def get_note_alteration_in_key(simple_note, abc_key):
-    """Given a note without ABC alteration (no '_', '^' or '=') and a
-    normalized key, tell whether the note is natural, sharp or flat in the key.
+# Semitones of the ABC alterations
+ALTERATION_SEMITONES = {'': 0, '=': 0, '^': 1, '^^': 2, '_': -1, '__': -2}
+_SEMITONE_ALTERATIONS = {0: '', 1: '^', 2: '^^', -1: '_', -2: '__'}
 
-    :param simple_note: A text string representing a note without alteration eg 'b'
-    :param abc_key: A tuple representing a normalized ABC key, eg ('D', 'mix')
-                    or ('Bb', 'min').
+NOTE_LETTERS = 'ABCDEFGabcdefg'  # ABC notes without alteration nor octave marker
 
-    :return: '' (natural), '_' (flat), '__' (double flat), '^' (sharp), '^^' (double sharp)
-    """
+
+def _compute_note_alteration(simple_note, abc_key):
+    """Compute the alteration of a note in a key, see
+    get_note_alteration_in_key(): the result is stored in KEY_SIGNATURES."""
 
     (root, mode) = abc_key
 
@@ -70,18 +73,101 @@ def get_note_alteration_in_key(simple_note, abc_key):
                 alteration = -1
             break
 
-    # Add the alteration of the note in the mode of abc_key to the major scale
+    # Add the alteration of the note in the mode of abc_key to the major scale
     # alteration
 
     alteration += MODE_ALTERATIONS[mode][index]
+    return alteration
+
+
+class KeySignature:
+    """Precomputed alterations and MIDI numbers of the notes of a key
+
+    The key signatures of all the keys are built once, at import time: see
+    KEY_SIGNATURES and get_key_signature().  They must not be modified.
+    """
+
+    __slots__ = ('abc_key', 'alterations', 'semitones', 'midi_notes')
+
+    def __init__(self, abc_key):
+        """
+        :param abc_key: A tuple representing a normalized ABC key, eg ('D', 'mix')
+        """
+        self.abc_key = abc_key
+        # Note letter ('A' to 'G' and 'a' to 'g') -> alteration in the key:
+        # semitones (eg 1) and ABC alteration (eg '^')
+        self.semitones = {note: _compute_note_alteration(note, abc_key)
+                          for note in NOTE_LETTERS}
+        self.alterations = {note: _SEMITONE_ALTERATIONS[semitones]
+                            for note, semitones in self.semitones.items()}
+        # Note letter -> MIDI number of the note in the key, eg 'f' -> 78
+        # in G major, same as abc2midi.get_midi_note()
+        self.midi_notes = {note: (60 if note.isupper() else 72)
+                           + C_MAJOR_SCALE_INTERVALS[note.upper()] + semitones
+                           for note, semitones in self.semitones.items()}
+
+    def __repr__(self):
+        return f'KeySignature({self.abc_key!r})'
+
+    def get_midi_notes(self, notes, octaves=None):
+        """Give the MIDI numbers of a sequence of notes in the key.
+
+        :param notes: A sequence of note letters without alteration nor octave
+                      marker, eg 'GABc' or ['G', 'A', 'B', 'c']
+        :param octaves: An optional sequence of octave shifts, one per note,
+                        eg [0, 0, -1, 1] for "G A B, c'"
+
+        :return: an array('B') of MIDI note numbers
+        """
+        midi_notes = map(self.midi_notes.__getitem__, notes)
+        if octaves is not None:
+            midi_notes = map(_shift_octave, midi_notes, octaves)
+        return array('B', midi_notes)
+
+
+def _shift_octave(midi_note, octave):
+    return min(max(midi_note + 12 * octave, 0), 127)
+
+
+# Normalized key (root, mode) -> KeySignature, for the 15 roots and the 7 modes
+KEY_SIGNATURES = {(root, mode): KeySignature((root, mode))
+                  for root in (scale_name[:-3] for scale_name in MAJOR_SCALES)
+                  for mode in MODE_ALTERATIONS}
 
-    if alteration == 1:
-        return '^'
-    elif alteration == 2:
-        return '^^'
-    elif alteration == -1:
-        return '_'
-    elif alteration == -2:
-        return '__'
-    else:
-        return ''
+
+def get_key_signature(abc_key):
+    """Give the precomputed signature of a normalized key.
+
+    :param abc_key: A tuple representing a normalized ABC key, eg ('D', 'mix')
+
+    :return: a KeySignature
+
+    :exception KeyError: abc_key is not a normalized key
+    """
+    return KEY_SIGNATURES[abc_key]
+
+
+def get_note_alteration_in_key(simple_note, abc_key):
+    """Given a note without ABC alteration (no '_', '^' or '=') and a
+    normalized key, tell whether the note is natural, sharp or flat in the key.
+
+    :param simple_note: A text string representing a note without alteration eg 'b'
+    :param abc_key: A tuple representing a normalized ABC key, eg ('D', 'mix')
+                    or ('Bb', 'min').
+
+    :return: '' (natural), '_' (flat), '__' (double flat), '^' (sharp), '^^' (double sharp)
+    """
+    return KEY_SIGNATURES[abc_key].alterations[simple_note]
+
+
+def get_key_alterations(abc_key):
+    """Give the alteration of each note (without ABC alteration) in a
+    normalized key, see get_note_alteration_in_key().
+
+    :param abc_key: A tuple representing a normalized ABC key, eg ('D', 'mix')
+
+    :return: a dict note -> alteration for the notes 'A' to 'G' and 'a' to
+             'g', eg {'F': '^', 'f': '^', 'C': '', ...} for ('G', 'maj').
+             The dict is shared: it must not be modified.
+    """
+    return KEY_SIGNATURES[abc_key].alterations
@@ -0,0 +1,122 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Play notes of a given duration: schedule their note offs
+
+The note offs are kept in a heap (earliest first) and sent by a single
+scheduler thread, started with the first note and kept for the life of the
+scheduler: playing a note does not create a thread.
+
+Notes can overlap (polyphony, eg fast typing or chords), up to a number of
+voices.  When all the voices are in use, the oldest note is stopped to play
+the new one (voice stealing).  A note that is played again while it sounds
+is restarted.
+
+The heap entries of the notes stopped early (stolen or restarted) are not
+removed from the heap: they are skipped when they come out of it.
+"""
+
+from collections import OrderedDict
+import heapq
+import threading
+import time
+from typing import Callable, List, Tuple
+
+
+DEFAULT_MAX_VOICES = 8
+
+
+class NoteScheduler:
+    def __init__(self, noteon: Callable[[int, int, float], None],
+                 noteoff: Callable[[int, int], None],
+                 max_voices: int = DEFAULT_MAX_VOICES,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            noteon: function called to start a note: noteon(channel, note,
+                velocity)
+            noteoff: function called to stop a note: noteoff(channel, note)
+            max_voices: number of notes that can sound at the same time
+            clock: monotonic clock, in seconds
+        """
+        self._noteon = noteon
+        self._noteoff = noteoff
+        self.max_voices = max_voices
+        self._clock = clock
+
+        # 'self._condition' protects the heap and the voices, and serializes
+        # the calls to noteon() and noteoff() (eg libfluidsynth, in case it is
+        # not reentrant)
+        self._condition = threading.Condition()
+        self._heap: List[Tuple[float, int, int, int]] = []  # (off time, id, channel, note)
+        self._voices: 'OrderedDict[Tuple[int, int], int]' = OrderedDict()  # (channel, note) -> id, oldest first
+        self._next_id = 0
+        self._thread = None
+        self._stopped = False
+
+    def play(self, channel: int, note: int, velocity: float, duration: float):
+        """Start a note and schedule its note off
+
+        Args:
+            channel: MIDI channel
+            note: MIDI note number
+            velocity: velocity, passed to noteon()
+            duration: duration of the note, in seconds
+        """
+        with self._condition:
+            voice = (channel, note)
+            if voice in self._voices:
+                del self._voices[voice]
+                self._noteoff(channel, note)
+            while self._voices and len(self._voices) >= self.max_voices:
+                (stolen_channel, stolen_note), _ = self._voices.popitem(last=False)
+                self._noteoff(stolen_channel, stolen_note)
+            self._noteon(channel, note, velocity)
+
+            note_id = self._next_id
+            self._next_id += 1
+            self._voices[voice] = note_id
+            heapq.heappush(self._heap, (self._clock() + duration, note_id, channel, note))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='note_scheduler',
+                                                daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def get_voice_count(self) -> int:
+        """Number of notes sounding"""
+        with self._condition:
+            return len(self._voices)
+
+    def all_notes_off(self):
+        """Stop all the notes now"""
+        with self._condition:
+            for channel, note in self._voices:
+                self._noteoff(channel, note)
+            self._voices.clear()
+            self._heap.clear()
+
+    def stop(self):
+        """Stop all the notes and the scheduler thread"""
+        self.all_notes_off()
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        with self._condition:
+            while not self._stopped:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                off_time, note_id, channel, note = self._heap[0]
+                delay = off_time - self._clock()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                voice = (channel, note)
+                if self._voices.get(voice) == note_id:
+                    del self._voices[voice]
+                    self._noteoff(channel, note)
@@ -4,19 +4,17 @@
 # PSL imports
 import enum
 import logging as log
-from threading import Timer, Lock
 import time
 from typing import Optional
 import traceback
 
-# Third-party imports
-from pyfluidsynth3 import fluidaudiodriver, fluidhandle, fluidsettings, fluidsynth
-from pyfluidsynth3.fluiderror import FluidError
-from pyfluidsynth3.fluidplayer import FluidPlayer, PlayerStatus, TempoType
-
+# Third-party imports: pyfluidsynth3 is imported by Synth.setup_synth(), not
+# at startup (see startup_trace.py)
 
 # abcted imports
 import abc2midi
+import latency
+from note_scheduler import DEFAULT_MAX_VOICES, NoteScheduler
 
 
 # midi utils
@@ -39,35 +37,52 @@ class PlayerException(Exception):
 
 
 class Synth:
-    def __init__(self, libfluidsynth_path: str = None):
+    def __init__(self, libfluidsynth_path: str = None, max_voices: int = DEFAULT_MAX_VOICES):
         """Create a soundless player. This object cannot produce a sound (yet), but
            it can be used as a stub in soundless setups.
+
+           Args:
+               libfluidsynth_path: path to libfluidsynth, None to let
+                   pyfluidsynth3 find it
+               max_voices: number of notes played by play_midi_note() that
+                   can sound at the same time (see note_scheduler.py)
         """
         self._libfluidsynth_path = libfluidsynth_path
+        self._max_voices = max_voices
 
         self._instrument = 'Acoustic Grand Piano'
-        self._midi_note = None  # MIDI note number
         self._midi_channel = 0  # MIDI channel to play the note
         self._midi_program = midi_programs[self._instrument]
         self._velocity = 1.0    # MIDI note velocity
         self._delay_s = 0.5     # Note duration in seconds
 
-        self._timer = None
-
-        # 'self._lock' protects:
-        # - the instance variables used by _on_timeout()
-        # - libfluidsynth (in case it is not reentrant, which is unknown to me at the moment)
-        self._lock = Lock()
+        # The note scheduler sends the note offs of play_midi_note() from a
+        # single thread; it serializes the calls to libfluidsynth for the
+        # notes (in case it is not reentrant, which is unknown to me at the
+        # moment)
+        self._note_scheduler: Optional[NoteScheduler] = None
 
         self._no_sound = True
 
     def setup_synth(self):
         """Setup the synth so that it can produce sound.
 
+           This takes time (eg loading the soundfont): it can be called from a
+           background thread.  Until it is done, the notes are not played
+           (see ready).
+
            Raises:
                PlayerException: an error occured during the synth setup.
                    Most common errors: fluidsynth library not found, soundfont not found.
         """
+        try:
+            from pyfluidsynth3 import fluidaudiodriver, fluidhandle, fluidsettings, fluidsynth
+            from pyfluidsynth3.fluiderror import FluidError
+        except ImportError as e:
+            message = 'Failed to import pyfluidsynth3: ' + str(e) + '. Audio output will be disabled.'
+            log.warning(message)
+            raise PlayerException(message)
+
         try:
             if self._libfluidsynth_path is not None:
                 log.info("Using libfluidsynth: " + self._libfluidsynth_path)
@@ -87,8 +102,17 @@ class Synth:
             log.debug(traceback.format_exc())
             raise PlayerException(message)
 
-        self._no_sound = False  # If we can reach that point without exception, we should have sound
-        self.select_instrument(self._instrument)
+        self._note_scheduler = NoteScheduler(self._fluidsynth.noteon, self._fluidsynth.noteoff,
+                                             self._max_voices)
+        self._fluidsynth.program_change(self._midi_channel, self._midi_program)
+        # If we can reach that point without exception, we should have sound.
+        # rem: set last, the other threads may play notes from now on
+        self._no_sound = False
+
+    @property
+    def ready(self) -> bool:
+        """Whether the synth can produce sound, see setup_synth()"""
+        return not self._no_sound
 
     def _load_soundfont(self):
         """Look for a soundfont and load it into fluidsynth.
@@ -96,6 +120,8 @@ class Synth:
            Raises:
                PlayerException: could not find a soundfont
         """
+        from pyfluidsynth3.fluiderror import FluidError
+
         soundfont_found = False
         for soundfont in soundfonts:
             try:
@@ -127,36 +153,34 @@ class Synth:
         self._fluidsynth.program_change(self._midi_channel, self._midi_program)
 
     def play_midi_note(self, note_number):
+        """Play a note for a short time.  The notes can overlap, up to
+        max_voices notes: then the oldest note is stopped."""
         if self._no_sound:
             return
-        try:
-            self._lock.acquire()
-            if self._midi_note is not None:
-                self._fluidsynth.noteoff(self._midi_channel, self._midi_note)
-                self._timer.cancel()
-
-            self._midi_note = note_number
-            self._fluidsynth.noteon(self._midi_channel, self._midi_note, self._velocity)
-            self._timer = Timer(self._delay_s, self._on_timeout)
-            self._timer.start()
-        finally:
-            self._lock.release()
+        self._note_scheduler.play(self._midi_channel, note_number, self._velocity,
+                                  self._delay_s)
+        latency.default_tracker.mark('noteon')
 
     def play_abc_note(self, abc_note):
         self.play_midi_note(abc2midi.get_midi_note(abc_note))
 
-    def _on_timeout(self):
-        try:
-            self._lock.acquire()
-            self._fluidsynth.noteoff(self._midi_channel, self._midi_note)
-            self._midi_note = None
-        finally:
-            self._lock.release()
+    @property
+    def max_voices(self) -> int:
+        return self._max_voices
+
+    @max_voices.setter
+    def max_voices(self, max_voices: int):
+        if max_voices < 1:
+            raise ValueError("max_voices must be > 0")
+        self._max_voices = max_voices
+        if self._note_scheduler is not None:
+            self._note_scheduler.max_voices = max_voices
 
     def create_midi_player(self):
         return MidiPlayer(self)
 
     def create_fluid_player(self):
+        from pyfluidsynth3.fluidplayer import FluidPlayer
         return FluidPlayer(self._fluidhandle, self._fluidsynth)
 
 
@@ -207,6 +231,12 @@ class MidiPlayer:
         """Start playing tunes in the playlist."""
         log.debug("start playing")
 
+        if not self._synth.ready:
+            log.info("the synth is not ready: cannot play")
+            return
+
+        from pyfluidsynth3.fluidplayer import PlayerStatus
+
         # If playback is finished, need to stop first:
         if self._fluidplayer is not None and self._paused is False \
            and self._fluidplayer.get_status() == PlayerStatus.DONE:
@@ -314,6 +344,8 @@ class MidiPlayer:
         if self._fluidplayer is None:
             return
 
+        from pyfluidsynth3.fluidplayer import TempoType
+
         if bpm is not None:
             log.debug(f'set tempo (bpm): {bpm}')
             self._fluidplayer.set_tempo(TempoType.TEMPO_EXTERNAL_BPM, tempo=bpm)
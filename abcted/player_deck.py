@@ -3,15 +3,15 @@
 
 # PSL imports
 import logging as log
-import os
 import tkinter as tk
 import tkinter.ttk as ttk
 from typing import Optional, Union
 
 # abcted imports
-import abc2midi
+import abcevents
 import abcparser
 from edit_zone import EditZone
+import midi_cache
 import player
 
 
@@ -27,8 +27,15 @@ class PlayerDeck:
 
         self._midi_player = synth.create_midi_player()
         self._midi_filename = None
+        self._tempo_map = abcevents.TempoMap(())  # Tempo map of the tune being played
+        self._bar_index: Optional[abcevents.BarIndex] = None  # Bar index of the tune being played
+        self._seek_enabled = True  # False if the ticks of the tune cannot be converted to seconds
 
         self._timer_id = None
+        self._timer_period = None  # Milliseconds
+        self._frame_count = 0      # Timeouts since the start of the timer
+        self._last_ticks = None    # Ticks of the player at the last timeout
+        self._followed_bar = None  # Bar highlighted in the edit zone
 
     # ------------------------------------------------------------------------
     # Create/show player deck
@@ -41,8 +48,7 @@ class PlayerDeck:
         # In case the user requests to open the deck while the deck is already
         # opened, take it as a "I want to play a new tune" or "I want to play
         # an updated version of the current tune": stop the current playback (no
-        # effect if the playback is already stopped) and remove the midi file of
-        # the old tune.
+        # effect if the playback is already stopped).
         self._stop()
 
         self._setup_tune()
@@ -76,6 +82,9 @@ class PlayerDeck:
             w.bind('<Key-minus>', self._on_slow_down)
             w.bind('<KP_Subtract>', self._on_slow_down)
             w.bind('<Key-equal>', self._on_reset_tempo)
+            if not isinstance(w, tk.Entry):  # Keep the arrows to move in the entries
+                w.bind('<Key-Left>', self._on_seek_backward)
+                w.bind('<Key-Right>', self._on_seek_forward)
 
         # TODO: bind enter key to all the buttons
 
@@ -89,14 +98,13 @@ class PlayerDeck:
     def _on_close_deck(self, event=None):
         """Stop playback, hide player deck and focus the edit zone"""
         self._stop()
-        self._remove_midi_file()
         self._hide_player_deck()
         self._edit_zone.focus()
 
     def exit(self):
         """Stop playback and cleanup (for use on program exit)"""
         self._stop()
-        self._remove_midi_file()
+        midi_cache.default_midi_cache.clear()
         del self._midi_player
 
     # ------------------------------------------------------------------------
@@ -106,30 +114,40 @@ class PlayerDeck:
     def _setup_tune(self):
         """Create a MIDI file from the current ABC tune and pass it to the MIDI player"""
 
-        # In case there is already a MIDI file, remove it
-        self._remove_midi_file()
-
-        # Get the current ABC tune, ie the tune at the cursor position in the edit zone
-        raw_tune = abcparser.get_current_raw_tune(self._edit_zone.get_buffer())
+        # Get the current ABC tune, ie the tune at the cursor position in the
+        # edit zone, from the tune index of the edit zone
+        buffer = self._edit_zone.get_buffer()
+        tune = abcparser.get_current_tune(buffer)
+        raw_tune = buffer.get_lines(tune.start_line, tune.end_line)
         log.debug("raw_tune: " + str(raw_tune))
 
-        # Parse the ABC tune and display its title on the player deck
-        try:
-            self._abc_tune = abcparser.AbcParser(raw_tune)
-        except abcparser.AbcParserException:
-            # TODO: notify user
-            pass
-        self._tune_title_label.config(text=self._abc_tune.title)
-
-        # Create a MIDI file from the ABC tune and give its name to the player
-        self._midi_filename = abc2midi.abc2midi(raw_tune)
+        # Display the tune title on the player deck
+        self._tune_title_label.config(text=tune.title)
+
+        # Get a MIDI file of the ABC tune and give its name to the player.
+        # The tune is converted only if it has changed since it was last
+        # played: the MIDI file comes from the MIDI cache, which owns it.
+        self._midi_filename = midi_cache.default_midi_cache.get_midi_file(raw_tune)
         self._midi_player.set_playlist([self._midi_filename])
 
-    def _remove_midi_file(self):
-        if self._midi_filename is not None:
-            log.debug(f"remove MIDI file: {self._midi_filename}")
-            os.remove(self._midi_filename)
-            self._midi_filename = None
+        # The tempo map converts the ticks of the player to seconds and the
+        # bar index converts them to positions in the edit zone: they are
+        # computed from the notes in playing order, like the MIDI file.  If
+        # the tune was converted by the external abc2midi program (see
+        # abc2midi.get_midi_data()), its ticks cannot be mapped: follow and
+        # seek are disabled for this tune.
+        try:
+            events = abcevents.parse_events(raw_tune).unfold_repeats()
+        except Exception as e:  # Catch-all handler, like abc2midi.get_midi_data()
+            log.warning(f"cannot follow the tune: {type(e).__name__}: {e}")
+            self._tempo_map = abcevents.TempoMap(())
+            self._bar_index = None
+            self._seek_enabled = False
+        else:
+            self._tempo_map = events.get_tempo_map()
+            self._bar_index = events.get_bar_index(raw_tune, tune.start_line)
+            self._seek_enabled = True
+        self._followed_bar = None
 
     # ------------------------------------------------------------------------
     # Playback control: play, stop, pause
@@ -156,6 +174,12 @@ class PlayerDeck:
         self._playback_position = tk.Label(frame, text="Playback position:")
         self._playback_position.pack(side=tk.LEFT, fill=tk.X)
 
+        self._follow_value = tk.BooleanVar(value=True)
+        follow_button = tk.Checkbutton(frame, text="Follow", variable=self._follow_value,
+                                       command=self._on_toggle_follow)
+        follow_button.pack(side=tk.RIGHT)
+        self._widgets.append(follow_button)
+
         frame.pack(fill=tk.X)
 
         # TODO:
@@ -182,6 +206,7 @@ class PlayerDeck:
         self._stop_timer()
         self._midi_player.pause()
         self._update_playback_position()
+        self._update_follow()
 
     def _stop(self):
         """Stop playback"""
@@ -199,6 +224,7 @@ class PlayerDeck:
         self._midi_player.stop()
 
         self._update_playback_position()
+        self._hide_follow()
 
     def _on_toggle_play_pause(self, event=None):
         player_status = self._midi_player.get_status()
@@ -220,7 +246,70 @@ class PlayerDeck:
 
     def _update_playback_position(self):
         current, total = self._midi_player.get_ticks()
-        self._playback_position.config(text=f"Playback position (ticks): {current}/{total}")
+        if current is None:
+            text = "Playback position:"
+        else:
+            text = (f"Playback position: {self._format_time(self._ticks_to_seconds(current))}"
+                    f"/{self._format_time(self._ticks_to_seconds(total))}")
+        self._playback_position.config(text=text)
+
+    @staticmethod
+    def _format_time(seconds: float) -> str:
+        """Format a duration as mm:ss"""
+        minutes, seconds = divmod(int(seconds), 60)
+        return f"{minutes:02d}:{seconds:02d}"
+
+    # ------------------------------------------------------------------------
+    # Playback time: conversion between ticks and seconds
+    #
+    # The conversions use the tempo map of the tune, unless the tempo is
+    # forced (bpm) or scaled by the user.  Fluidsynth counts the bpm in
+    # quarter notes (MIDI beats).
+    # ------------------------------------------------------------------------
+
+    def _ticks_to_seconds(self, ticks: int) -> float:
+        tempo_bpm = self._midi_player.tempo_bpm
+        if tempo_bpm is not None:
+            return ticks * 60 / (tempo_bpm * abcevents.TICKS_PER_QUARTER)
+        return self._tempo_map.tick_to_seconds(ticks) / self._get_tempo_scale_factor()
+
+    def _seconds_to_ticks(self, seconds: float) -> int:
+        tempo_bpm = self._midi_player.tempo_bpm
+        if tempo_bpm is not None:
+            return round(seconds * tempo_bpm * abcevents.TICKS_PER_QUARTER / 60)
+        return self._tempo_map.seconds_to_tick(seconds * self._get_tempo_scale_factor())
+
+    def _get_tempo_scale_factor(self) -> float:
+        return self._midi_player.tempo_scale_factor or 1
+
+    # ------------------------------------------------------------------------
+    # Seek backward/forward
+    # ------------------------------------------------------------------------
+
+    SEEK_STEP = 5  # Seconds
+
+    def _on_seek_backward(self, event=None):
+        self._seek(-self.SEEK_STEP)
+        return 'break'
+
+    def _on_seek_forward(self, event=None):
+        self._seek(self.SEEK_STEP)
+        return 'break'
+
+    def _seek(self, delta_seconds: float):
+        """Move the playback position by a number of seconds: the target tick
+        is computed from the tempo map"""
+        if not self._seek_enabled:
+            return
+        current, total = self._midi_player.get_ticks()
+        if current is None:
+            return
+        seconds = self._ticks_to_seconds(current) + delta_seconds
+        ticks = min(max(self._seconds_to_ticks(seconds), 0), total)
+        log.debug(f"seek {delta_seconds:+}s: tick {current} -> {ticks}")
+        self._midi_player.seek(ticks)
+        self._update_playback_position()
+        self._update_follow(ticks)
 
     # ------------------------------------------------------------------------
     # Playback loop/repeat control
@@ -376,16 +465,60 @@ class PlayerDeck:
         self._get_tempo_label.config(text=f"Get tempo: bpm={tempo_bpm}, MIDI tempo={midi_tempo}")
 
     # ------------------------------------------------------------------------
-    # GUI periodic update every second
+    # Follow-playback: highlight the bar being played in the edit zone
+    # ------------------------------------------------------------------------
+
+    def _on_toggle_follow(self):
+        if self._follow_value.get():
+            self._update_follow()
+        else:
+            self._hide_follow()
+
+    def _update_follow(self, ticks: Optional[int] = None):
+        """Highlight the bar played at the current position of the player (or
+        at the given ticks)
+
+        The work is bounded: a bisection in the bar index, and a move of the
+        highlighting only when the bar changes.
+        """
+        if not self._follow_value.get() or self._bar_index is None:
+            return
+        if ticks is None:
+            ticks, total = self._midi_player.get_ticks()
+            if ticks is None:
+                return
+        bar = self._bar_index.get_bar(ticks)
+        if bar != self._followed_bar:
+            self._followed_bar = bar
+            self._edit_zone.show_playback_range(*self._bar_index.get_bar_range_at(bar))
+
+    def _hide_follow(self):
+        self._followed_bar = None
+        self._edit_zone.hide_playback_range()
+
+    # ------------------------------------------------------------------------
+    # GUI periodic update while playing
     #
     # We use tkinter universal widget method "after()" so that the callback gets
     # called in the context of the main thread: no risk of race conditions.
+    #
+    # The rate adapts to the playback: ~30 Hz while the playback position
+    # moves (follow-playback), 1 Hz when it does not move any more (end of
+    # the tune), no timer while paused or stopped.  The labels are updated
+    # about once per second.
     # ------------------------------------------------------------------------
 
+    FOLLOW_PERIOD = 33   # Milliseconds, ~30 Hz
+    IDLE_PERIOD = 1000   # Milliseconds
+    LABELS_PERIOD = 1000  # Milliseconds
+
     def _start_timer(self):
         """Start the timer if it is not already running"""
         if self._timer_id is None:
-            self._timer_id = self._player_frame.after(1000, self._timeout)
+            self._frame_count = 0
+            self._last_ticks = None
+            self._timer_period = self.FOLLOW_PERIOD
+            self._timer_id = self._player_frame.after(self._timer_period, self._timeout)
 
     def _stop_timer(self):
         """Stop the timer if it is running"""
@@ -395,7 +528,14 @@ class PlayerDeck:
 
     def _timeout(self):
         """Update UI and restart timer unless it has been stopped"""
-        self._update_playback_position()
-        self._update_get_tempo_label()
+        ticks, total = self._midi_player.get_ticks()
+        self._update_follow(ticks)
+        self._frame_count += 1
+        if self._frame_count * self._timer_period >= self.LABELS_PERIOD:
+            self._frame_count = 0
+            self._update_playback_position()
+            self._update_get_tempo_label()
+        self._timer_period = self.IDLE_PERIOD if ticks == self._last_ticks else self.FOLLOW_PERIOD
+        self._last_ticks = ticks
         if self._timer_id is not None:
-            self._timer_id = self._player_frame.after(1000, self._timeout)
+            self._timer_id = self._player_frame.after(self._timer_period, self._timeout)
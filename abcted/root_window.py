@@ -2,18 +2,20 @@
 # -*- coding: utf-8 -*-
 
 import logging as log
+import queue
+import threading
 import tkinter as tk
-import tkinter.messagebox as tk_messagebox
 from typing import Optional
 import os
 
 import edit_zone
 import file
 import file_utils
+import latency
 import player
-import player_deck
 import recent_files
-import search_bar
+import startup_trace
+import status_bar
 import theme
 
 
@@ -27,19 +29,26 @@ def get_star_image():
 
 class RootWindow():
     def __init__(self, raw_path=None, libfluidsynth_path=None):
+        trace = startup_trace.default_trace
+
         self.tk_root = tk.Tk()
+        trace.mark('tk')
 
         self._theme = theme.Theme()
 
+        self._status_bar = status_bar.StatusBar(self.tk_root, row=3)
+
         self._setup_synth(libfluidsynth_path)
+        trace.mark('synth (setup started)')
 
         self._edit_zone = edit_zone.EditZone(self.tk_root, self._theme, self._synth)
+        trace.mark('edit zone')
 
-        self._player_deck = player_deck.PlayerDeck(self.tk_root, self._edit_zone, self._synth)
-
-        self._search_bar = search_bar.SearchBar(self.tk_root, self._edit_zone._scrolled_text)
-        self._search_bar.match_color_bg = self._theme.hlsearchbg
-        self._search_bar.match_color_fg = self._theme.hlsearchfg
+        # Created on first use (see _get_player_deck(), _get_search_bar() and
+        # _get_tune_finder()): their modules are imported then, not at startup
+        self._player_deck = None
+        self._search_bar = None
+        self._tune_finder = None
 
         # Allow text cell to grow when more space is available
         self.tk_root.columnconfigure(0, weight=1)
@@ -51,6 +60,7 @@ class RootWindow():
             self._file.check_text_change_since_last_save)
         if raw_path:
             self._file.open(raw_path)
+        trace.mark('file')
 
         # ---------------------------------------------------------------------
         #     Menu bar
@@ -109,14 +119,17 @@ class RootWindow():
         self._edit_menu.add_separator()
         self._edit_menu.add_command(label='Rechercher...', underline=0,
                                     accelerator='Ctrl+F',
-                                    command=self._search_bar.on_edit_search)
+                                    command=self._on_edit_search)
+        self._edit_menu.add_command(label='Rechercher un morceau...', underline=13,
+                                    accelerator='Ctrl+T',
+                                    command=self._on_find_tune)
         menu_bar.add_cascade(label='Edition', underline=1, menu=self._edit_menu)
 
         # ---- Play menu
 
         play_menu = tk.Menu(menu_bar, tearoff=0)
         play_menu.add_command(label='Jouer', underline=0, accelerator='Ctrl+J',
-                              command=self._player_deck.on_open_deck)
+                              command=self._on_open_deck)
         menu_bar.add_cascade(label='Jouer', underline=0, menu=play_menu)
 
         self.tk_root.config(menu=menu_bar)
@@ -131,7 +144,7 @@ class RootWindow():
         self.tk_root.bind('<Control-o>', self._file.on_file_open)
         self.tk_root.bind('<Control-S>', self._file.on_file_save)
         self.tk_root.bind('<Control-s>', self._file.on_file_save)
-        self.tk_root.bind('<Control-j>', self._player_deck.on_open_deck)
+        self.tk_root.bind('<Control-j>', self._on_open_deck)
         self.tk_root.bind('Alt-Keypress-F4', self.exit)
 
         self._edit_zone._scrolled_text.bind('<Control-Y>',
@@ -143,25 +156,104 @@ class RootWindow():
                                             self._edit_zone.on_edit_select_all)
         self._edit_zone._scrolled_text.bind('<Control-a>',
                                             self._edit_zone.on_edit_select_all)
-        self.tk_root.bind('<Control-F>', self._search_bar.on_edit_search)
-        self.tk_root.bind('<Control-f>', self._search_bar.on_edit_search)
+        self.tk_root.bind('<Control-F>', self._on_edit_search)
+        self.tk_root.bind('<Control-f>', self._on_edit_search)
+        self._edit_zone._scrolled_text.bind('<Control-T>',
+                                            self._on_find_tune)
+        self._edit_zone._scrolled_text.bind('<Control-t>',
+                                            self._on_find_tune)
+            # rem: if bound at root level: ctrl+t also transposes characters
+        self.tk_root.bind('<Control-T>', self._on_find_tune)
+        self.tk_root.bind('<Control-t>', self._on_find_tune)
 
         self.tk_root.protocol('WM_DELETE_WINDOW', self.exit)
+        trace.mark('menus and shortcuts')
+
+    # ------------------------------------------------------------------------
+    # Player deck, search bar and tune finder, created on first use
+    # ------------------------------------------------------------------------
+
+    def _get_player_deck(self):
+        if self._player_deck is None:
+            import player_deck
+            self._player_deck = player_deck.PlayerDeck(self.tk_root, self._edit_zone, self._synth)
+        return self._player_deck
+
+    def _on_open_deck(self, event=None):
+        return self._get_player_deck().on_open_deck(event)
+
+    def _get_search_bar(self):
+        if self._search_bar is None:
+            import search_bar
+            self._search_bar = search_bar.SearchBar(self.tk_root, self._edit_zone._scrolled_text)
+            self._search_bar.match_color_bg = self._theme.hlsearchbg
+            self._search_bar.match_color_fg = self._theme.hlsearchfg
+        return self._search_bar
+
+    def _on_edit_search(self, event=None):
+        return self._get_search_bar().on_edit_search(event)
+
+    def _get_tune_finder(self):
+        if self._tune_finder is None:
+            import tune_finder
+            self._tune_finder = tune_finder.TuneFinder(self.tk_root, self._open_tune)
+        return self._tune_finder
+
+    def _on_find_tune(self, event=None):
+        return self._get_tune_finder().on_find_tune(event)
+
+    # ------------------------------------------------------------------------
+    # Synth setup, in a background thread
+    #
+    # Loading the soundfont takes time: the edit zone is usable meanwhile (the
+    # notes typed before the synth is ready are not played).  The result of
+    # the setup is polled with after(), so that the status bar is updated
+    # from the main thread.
+    # ------------------------------------------------------------------------
+
+    SYNTH_POLL_PERIOD = 100  # Milliseconds
+    SYNTH_READY_MESSAGE_TIMEOUT = 3000  # Milliseconds
 
     def _setup_synth(self, libfluidsynth_path: Optional[str] = None):
         self._synth = player.Synth(libfluidsynth_path)
+        self._synth_setup_results = queue.Queue()  # None or PlayerException
+        self._status_bar.show('Initialisation du synthétiseur...')
+        threading.Thread(target=self._run_synth_setup, name='synth_setup', daemon=True).start()
+        self.tk_root.after(self.SYNTH_POLL_PERIOD, self._poll_synth_setup)
+
+    def _run_synth_setup(self):
+        """Setup the synth (background thread: must not call Tk)"""
         try:
             self._synth.setup_synth()
-            self._synth.select_instrument('Acoustic Grand Piano')
         except player.PlayerException as e:
-            # Under Windows, after we display a messagebox before the mainloop():
-            # 1. the edit zone looses its focus (and it is difficult to get it back).
-            # 2. the global keybindings do not work.
-            #
-            # Workaround : hide the root window before showing the messagebox
-            self.tk_root.withdraw()
-            tk_messagebox.showwarning(title='Erreur lors de l\'initialisation du synthétiseur', message=e)
-            self.tk_root.deiconify()
+            self._synth_setup_results.put(e)
+        else:
+            log.info('synth ready')
+            self._synth_setup_results.put(None)
+
+    def _poll_synth_setup(self):
+        try:
+            error = self._synth_setup_results.get_nowait()
+        except queue.Empty:
+            self.tk_root.after(self.SYNTH_POLL_PERIOD, self._poll_synth_setup)
+            return
+        if error is None:
+            self._status_bar.show('Synthétiseur prêt', self.SYNTH_READY_MESSAGE_TIMEOUT)
+        else:
+            self._status_bar.show('Erreur lors de l\'initialisation du synthétiseur: ' + str(error))
+
+    def _open_tune(self, path, tune):
+        """Open a tunebook if it is not the current file and go to a tune
+
+        Args:
+            path: normalized path of the tunebook
+            tune: TuneEntry of the tune in the tunebook
+        """
+        if self._file.get_path() != path:
+            self._file.on_file_open(path=path)
+            if self._file.get_path() != path:
+                return  # Open cancelled or failed
+        self._edit_zone.goto_line(tune.start_line)
 
     def _build_fav_recent_menu_entries(self):
         recents = recent_files.get_recent_files()
@@ -223,7 +315,10 @@ class RootWindow():
             log.debug('ask save changes cancelled/failed, aborting')
             return 'break'
         else:
-            self._player_deck.exit()
+            if self._player_deck is not None:
+                self._player_deck.exit()
+            self._edit_zone.exit()
+            log.debug('musical feedback latency:\n' + latency.default_tracker.format())
             self.tk_root.destroy()
             # TODO: fix segfault on exit
 
@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measure the startup time of abcted: per phase and per import
+
+The phases (eg 'imports', 'edit zone', 'menus') are timed with a monotonic
+clock: the end of each phase is marked (see mark()), and a phase starts at
+the end of the previous one.  Marking a phase is a clock read, so the phases
+are always timed.  The imports are timed only when the import hook is
+installed (see install_import_hook(), option --trace-startup): the hook
+wraps builtins.__import__ and records, for each module imported for the
+first time, the time spent in the import minus the time spent in the
+imports it triggers (self time).  The submodules imported by 'from package
+import submodule' are counted in the import of the package.
+"""
+
+import builtins
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+IMPORT_REPORT_COUNT = 20  # Number of imports in the report, slowest first
+
+
+class StartupTrace:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            clock: monotonic clock, in seconds
+        """
+        self._clock = clock
+        self._start = self._last = clock()
+        self.phases: List[Tuple[str, float]] = []  # (phase, duration), in order
+        self.imports: Dict[str, float] = {}  # Module -> self time of its import
+        self._import_stack: List[float] = []  # Time spent in the nested imports
+        self._original_import = None
+
+    def mark(self, name: str):
+        """End a phase of the startup: the phase starts at the end of the
+        previous phase, or at the creation of the trace"""
+        now = self._clock()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def get_elapsed(self) -> float:
+        """Time since the creation of the trace, in seconds"""
+        return self._clock() - self._start
+
+    def install_import_hook(self):
+        """Start timing the imports"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall_import_hook(self):
+        """Stop timing the imports"""
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._import_stack.append(0.0)
+        start = self._clock()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            duration = self._clock() - start
+            nested = self._import_stack.pop()
+            self.imports[name] = self.imports.get(name, 0.0) + duration - nested
+            if self._import_stack:
+                self._import_stack[-1] += duration
+
+    def format(self) -> str:
+        """Report of the phases, in order, and of the slowest imports"""
+        lines = [f'startup: {self.get_elapsed() * 1000:.1f}ms']
+        lines += [f'  {name}: {duration * 1000:.1f}ms' for name, duration in self.phases]
+        if self.imports:
+            slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+            lines.append(f'imports (self time, {min(len(slowest), IMPORT_REPORT_COUNT)} '
+                         f'slowest of {len(slowest)}, '
+                         f'total {sum(self.imports.values()) * 1000:.1f}ms):')
+            lines += [f'  {name}: {duration * 1000:.1f}ms'
+                      for name, duration in slowest[:IMPORT_REPORT_COUNT]]
+        return '\n'.join(lines)
+
+
+# Trace of the startup of the application
+default_trace = StartupTrace()
@@ -0,0 +1,28 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import tkinter as tk
+from typing import Optional, Union
+
+
+class StatusBar:
+    """A line of text at the bottom of the root window, for the messages of
+    the background tasks (eg setup of the synth)"""
+
+    def __init__(self, container_frame: Union[tk.Tk, tk.Frame], row: int):
+        self._label = tk.Label(container_frame, anchor=tk.W)
+        self._label.grid(row=row, sticky=tk.E + tk.W)
+        self._clear_id = None
+
+    def show(self, message: str, timeout_ms: Optional[int] = None):
+        """Show a message, until the next one or for a given time"""
+        if self._clear_id is not None:
+            self._label.after_cancel(self._clear_id)
+            self._clear_id = None
+        self._label.config(text=message)
+        if timeout_ms is not None:
+            self._clear_id = self._label.after(timeout_ms, self.clear)
+
+    def clear(self):
+        self._clear_id = None
+        self._label.config(text='')
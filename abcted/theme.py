@@ -24,6 +24,19 @@ class Theme():
         self.hlsearchfg = '#f5deb3'  # ~ light orange
         self.hlsearchbg = '#cd853f'  # ~ darker orange
 
+        # Bar being played (follow-playback)
+        self.playbackbg = '#4a4a6a'  # ~ greyish blue
+
+        # Syntax highlighting
+        self.fieldfg = '#bdb76b'       # ~ dark khaki
+        self.commentfg = '#87ceeb'     # ~ sky blue
+        self.barfg = '#ffa0a0'         # ~ pink
+        self.annotationfg = '#ffdead'  # ~ navajo white
+        self.decorationfg = '#98fb98'  # ~ pale green
+
+        # Problems found by the checks of the tune (underlined)
+        self.lintfg = '#ff6347'  # ~ tomato red
+
         self.font_family = "courier new"
         self.font_size = 12
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+"""
+Dialog to find a tune in the recent and favorite files
+
+The tunes are found either by their header fields (see tune_search.py) or,
+in melody mode, by a phrase of their melody (see melody_search.py).
+"""
+
+import tkinter as tk
+from typing import Callable, List, Optional
+
+import file_utils
+import melody_search
+from tune_index import TuneEntry
+import tune_search
+
+
+MAX_RESULTS = 100
+
+
+class TuneFinder:
+    def __init__(self, tk_root: tk.Tk,
+                 open_tune_cb: Callable[[str, TuneEntry], None]):
+        """
+        Args:
+            tk_root: the root window
+            open_tune_cb: function called with the path of a tunebook and
+                a tune of this tunebook to show the tune to the user
+        """
+        self._tk_root = tk_root
+        self._open_tune_cb = open_tune_cb
+
+        self._window: Optional[tk.Toplevel] = None
+        self._query_entry: Optional[tk.Entry] = None
+        self._query_var: Optional[tk.StringVar] = None
+        self._result_list: Optional[tk.Listbox] = None
+        self._melody_mode_var: Optional[tk.IntVar] = None
+
+        self._search_index: Optional[tune_search.TuneSearchIndex] = None
+        self._melody_index: Optional[melody_search.MelodyIndex] = None  # Built on demand
+        self._results: List[tune_search.SearchResult] = []
+
+    def on_find_tune(self, event=None):
+        """Show the dialog, create it if it does not exist yet"""
+        if self._window is None:
+            self._setup_window()
+        # The recent files may have changed since the last search
+        self._search_index = tune_search.build_search_index()
+        self._window.deiconify()
+        self._query_entry.focus()
+        self._query_entry.select_range(0, tk.END)
+        self._on_query_change()
+        return 'break'
+
+    def _setup_window(self):
+        self._window = tk.Toplevel(self._tk_root)
+        self._window.title('Rechercher un morceau')
+        self._window.transient(self._tk_root)
+        self._window.protocol('WM_DELETE_WINDOW', self._on_close)
+        self._window.columnconfigure(0, weight=1)
+        self._window.rowconfigure(1, weight=1)
+
+        self._query_var = tk.StringVar()
+        self._query_var.trace_add('write', self._on_query_change)
+        self._query_entry = tk.Entry(self._window, textvariable=self._query_var)
+        self._query_entry.grid(row=0, column=0, sticky=tk.E + tk.W)
+
+        self._melody_mode_var = tk.IntVar()
+        melody_mode = tk.Checkbutton(self._window, text='Mélodie', underline=0,
+                                     variable=self._melody_mode_var,
+                                     command=self._on_query_change)
+        melody_mode.grid(row=0, column=1)
+
+        self._result_list = tk.Listbox(self._window, width=80, height=20,
+                                       activestyle='dotbox')
+        self._result_list.grid(row=1, columnspan=2, sticky=tk.N + tk.S + tk.E + tk.W)
+
+        self._query_entry.bind('<Return>', self._on_open_tune)
+        self._query_entry.bind('<Down>', self._on_select_next)
+        self._query_entry.bind('<Up>', self._on_select_previous)
+        self._result_list.bind('<Return>', self._on_open_tune)
+        self._result_list.bind('<Double-Button-1>', self._on_open_tune)
+        self._window.bind('<Escape>', self._on_close)
+        self._window.bind('<Alt-m>', self._on_toggle_melody_mode)
+
+    def _on_toggle_melody_mode(self, event=None):
+        self._melody_mode_var.set(1 - self._melody_mode_var.get())
+        self._on_query_change()
+        return 'break'
+
+    def _on_query_change(self, *args):
+        query = self._query_var.get()
+        if self._melody_mode_var.get():
+            if self._melody_index is None:
+                # Reading the melodies of all the tunes takes time the first
+                # time, then they are cached
+                self._window.config(cursor='watch')
+                self._window.update_idletasks()
+                self._melody_index = melody_search.build_melody_index()
+                self._window.config(cursor='')
+            self._results = self._melody_index.search(query, MAX_RESULTS)
+        else:
+            self._results = self._search_index.search(query, MAX_RESULTS)
+        self._result_list.delete(0, tk.END)
+        for result in self._results:
+            tune = result.tune
+            self._result_list.insert(tk.END, '{}  [{}]  {}  ({}, X:{})'.format(
+                tune.title, tune.rhythm or '', tune.raw_key or '',
+                file_utils.prettify_path(result.path), tune.x))
+        if self._results:
+            self._select(0)
+
+    def _select(self, i: int):
+        self._result_list.selection_clear(0, tk.END)
+        self._result_list.selection_set(i)
+        self._result_list.activate(i)
+        self._result_list.see(i)
+
+    def _on_select_next(self, event=None):
+        selection = self._result_list.curselection()
+        if selection and selection[0] + 1 < len(self._results):
+            self._select(selection[0] + 1)
+        return 'break'
+
+    def _on_select_previous(self, event=None):
+        selection = self._result_list.curselection()
+        if selection and selection[0] > 0:
+            self._select(selection[0] - 1)
+        return 'break'
+
+    def _on_open_tune(self, event=None):
+        selection = self._result_list.curselection()
+        if not selection:
+            return 'break'
+        result = self._results[selection[0]]
+        self._on_close()
+        self._open_tune_cb(result.path, result.tune)
+        return 'break'
+
+    def _on_close(self, event=None):
+        self._window.withdraw()
+        self._search_index = None  # Free memory
+        self._melody_index = None
+        return 'break'
@@ -0,0 +1,265 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Index the tunes of a tunebook (ie a whole ABC file or edit buffer)
+
+The index is built in one pass over the text.  It records where each tune
+starts and ends and the header fields that are useful to present or find a
+tune (X:, T:, C:, O:, R:, M:, L:, K:).  Looking for the tune that contains a
+given line is then a bisection in the sorted list of tune start lines.
+
+Tune boundaries follow the same rules as abcparser.get_current_raw_tune(): a
+tune starts with a reference number (X: header) and ends before the next
+empty line or the next reference number.
+
+The index can be built from a text (from_text(), from_lines()) or line by
+line with add_line() and finish(), eg from a memory-mapped file (see
+tunebook.py).  When lines of the text change, the index can be updated in
+place (see update()): only the tunes around the lines changed are indexed
+again.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import starmap
+from typing import Callable, Iterable, List, Optional
+
+
+class TuneEntry:
+    """Position and header fields of a tune in a tunebook
+
+    Line numbers start at 1 (like in the edit zone).  Offsets are character
+    offsets in a text or byte offsets in a file.  Header field values are raw
+    text: they are neither parsed nor validated.
+    """
+
+    __slots__ = ('start_line', 'end_line', 'offset', 'end_offset', 'x',
+                 'titles', 'composer', 'origin', 'rhythm', 'raw_meter',
+                 'raw_note_length', 'raw_key')
+
+    def __init__(self, start_line: int, offset: int, x: str):
+        self.start_line = start_line  # Line of the reference number (X: header)
+        self.end_line = start_line    # Last line of the tune
+        self.offset = offset          # Offset of the start of the tune
+        self.end_offset = offset      # Offset of the end of the last line of the tune
+        self.x = x                    # Reference number
+        self.titles = []              # Titles (T:)
+        self.composer = None          # Composer (C:)
+        self.origin = None            # Origin (O:)
+        self.rhythm = None            # Rhythm (R:)
+        self.raw_meter = None         # Meter (M:)
+        self.raw_note_length = None   # Default note length (L:)
+        self.raw_key = None           # Key (K:), ie the end of the tune header
+
+    @property
+    def title(self):
+        """Return the first tune title or an empty string."""
+        try:
+            return self.titles[0]
+        except IndexError:
+            return ""
+
+    def __repr__(self):
+        return 'TuneEntry(X:{}, lines {}-{}, {!r})'.format(
+            self.x, self.start_line, self.end_line, self.title)
+
+
+def _make_tune_entry(start_line, end_line, offset, end_offset, x, titles,
+                     composer, origin, rhythm, raw_meter, raw_note_length,
+                     raw_key) -> TuneEntry:
+    """Create a TuneEntry from the values of its attributes (in __slots__ order)
+
+    This is faster than TuneEntry() followed by the assignment of the
+    attributes: this matters when a large index is loaded.
+    """
+    tune = object.__new__(TuneEntry)
+    tune.start_line = start_line
+    tune.end_line = end_line
+    tune.offset = offset
+    tune.end_offset = end_offset
+    tune.x = x
+    tune.titles = titles
+    tune.composer = composer
+    tune.origin = origin
+    tune.rhythm = rhythm
+    tune.raw_meter = raw_meter
+    tune.raw_note_length = raw_note_length
+    tune.raw_key = raw_key
+    return tune
+
+
+class TuneIndex:
+    """Index of the tunes of a tunebook"""
+
+    def __init__(self):
+        self.tunes: List[TuneEntry] = []  # Sorted by start line
+        self.line_count = 0
+
+        self._start_lines: List[int] = []  # Start line of each tune
+
+        self._cur_tune: Optional[TuneEntry] = None  # Tune being indexed
+
+    @classmethod
+    def from_text(cls, text: str) -> 'TuneIndex':
+        """Index the tunes of a text, eg the contents of the edit zone"""
+        return cls.from_lines(text.split('\n'))
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> 'TuneIndex':
+        """Index the tunes of a sequence of lines (without end of lines)"""
+        index = cls()
+        line_no = 0
+        offset = 0
+        for line_no, line in enumerate(lines, 1):
+            index.add_line(line_no, line, offset)
+            offset += len(line) + 1
+        index.finish(line_no, max(offset - 1, 0))
+        return index
+
+    def add_line(self, line_no: int, line: str, offset: int = 0):
+        """Index a line.
+
+        Only the empty lines (or lines with only spaces), the information
+        field lines and the lines starting with a space have to be given to
+        the index, in line number order: other lines cannot change the index.
+
+        Args:
+            line_no: line number, starting at 1
+            line: text of the line, without end of line
+            offset: offset of the beginning of the line
+        """
+        if line[1:2] == ':':
+            field = line[0]
+            tune = self._cur_tune
+            if tune is not None and tune.raw_key is None:
+                # In the tune header
+                value = line[2:].strip()
+                if field == 'T':
+                    tune.titles.append(value)
+                elif field == 'C':
+                    tune.composer = value
+                elif field == 'O':
+                    tune.origin = value
+                elif field == 'R':
+                    tune.rhythm = value
+                elif field == 'M':
+                    tune.raw_meter = value
+                elif field == 'L':
+                    tune.raw_note_length = value
+                elif field == 'K':
+                    tune.raw_key = value
+
+        stripped_line = line.strip()
+        if stripped_line.startswith('X:'):
+            self._end_tune(line_no - 1, offset - 1)
+            self._cur_tune = TuneEntry(line_no, offset, stripped_line[2:].strip())
+            self.tunes.append(self._cur_tune)
+            self._start_lines.append(line_no)
+        elif stripped_line == '':
+            self._end_tune(line_no - 1, offset - 1)
+
+    def _end_tune(self, end_line: int, end_offset: int):
+        if self._cur_tune is not None:
+            self._cur_tune.end_line = end_line
+            self._cur_tune.end_offset = end_offset
+            self._cur_tune = None
+
+    def finish(self, line_count: int, end_offset: int = 0):
+        """Close the index once all the lines have been indexed.
+
+        Args:
+            line_count: number of lines in the text
+            end_offset: offset of the end of the text
+        """
+        self._end_tune(line_count, end_offset)
+        self.line_count = line_count
+
+    def __len__(self):
+        return len(self.tunes)
+
+    def update(self, first_line_no: int, old_line_count: int, new_line_count: int,
+               get_lines: Callable[[int, int], List[str]]):
+        """Replace lines of the text
+
+        The tunes that contain the lines replaced, or that end just before
+        them, are indexed again: their lines are read with get_lines().  The
+        tunes below are moved.
+
+        Args:
+            first_line_no: number of the first line replaced, starting at 1
+            old_line_count: number of lines replaced (0 to insert lines)
+            new_line_count: number of new lines
+            get_lines: function that returns a range of lines of the new
+                text: get_lines(first line number, last line number)
+        """
+        delta = new_line_count - old_line_count
+
+        # Tunes above: kept, unless the line that ends them is replaced
+        i = bisect_left(self._start_lines, first_line_no)
+        while i > 0 and self.tunes[i - 1].end_line + 1 >= first_line_no:
+            i -= 1
+        # Tunes below: moved
+        j = bisect_right(self._start_lines, first_line_no + old_line_count - 1)
+
+        if i > 0:
+            line_no = self.tunes[i - 1].end_line + 1
+            offset = self.tunes[i - 1].end_offset + 1
+        else:
+            line_no, offset = 1, 0
+        if j < len(self.tunes):
+            last_line_no = self.tunes[j].start_line + delta - 1
+        else:
+            last_line_no = self.line_count + delta
+        index = TuneIndex()
+        if line_no <= last_line_no:
+            for line_no, line in enumerate(get_lines(line_no, last_line_no), line_no):
+                index.add_line(line_no, line, offset)
+                offset += len(line) + 1
+        if j < len(self.tunes):
+            index._end_tune(last_line_no, offset - 1)
+            offset_delta = offset - self.tunes[j].offset
+            for tune in self.tunes[j:]:
+                tune.start_line += delta
+                tune.end_line += delta
+                tune.offset += offset_delta
+                tune.end_offset += offset_delta
+        else:
+            index.finish(last_line_no, max(offset - 1, 0))
+
+        self.tunes[i:j] = index.tunes
+        self._start_lines[i:] = [tune.start_line for tune in self.tunes[i:]]
+        self.line_count += delta
+
+    # Serialization (eg to cache an index on disk, see tune_index_cache.py):
+    # an index is converted to and from plain Python data.
+
+    def dump(self) -> tuple:
+        """Return the contents of the index as plain Python data."""
+        return (self.line_count,
+                [tuple(getattr(tune, name) for name in TuneEntry.__slots__)
+                 for tune in self.tunes])
+
+    @classmethod
+    def load(cls, data: tuple) -> 'TuneIndex':
+        """Create an index from the data returned by dump()."""
+        index = cls()
+        index.line_count, tunes = data
+        index.tunes = list(starmap(_make_tune_entry, tunes))
+        index._start_lines = [tune.start_line for tune in index.tunes]
+        return index
+
+    def find_tune(self, line_no: int) -> Optional[TuneEntry]:
+        """Find the tune that contains a line.
+
+        Args:
+            line_no: line number, starting at 1
+
+        Returns:
+            The tune that contains the line or, if the line is between two
+            tunes, the tune above the line.  None if there is no tune at or
+            above the line.
+        """
+        i = bisect_right(self._start_lines, line_no)
+        if i == 0:
+            return None
+        return self.tunes[i - 1]
@@ -0,0 +1,142 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Keep the tune indexes of ABC files in a cache on disk
+
+Indexing a large tunebook takes time, so the index of each file is saved in a
+SQLite database in the config dir, next to the lists of recent and favorite
+files.  A cached index is used as long as the file has not changed:
+
+  * same size and same modification time: the cached index is used;
+
+  * same size but different modification time (eg the file was copied or
+    touched): the contents of the file is hashed and the cached index is used
+    if the hash has not changed;
+
+  * otherwise the file is indexed again and the cache is updated.
+"""
+
+import contextlib
+import gc
+import logging as log
+import os
+import pickle
+import sqlite3
+from typing import Optional
+
+import recent_files
+from tune_index import TuneIndex
+from tunebook import Tunebook
+
+
+TUNE_INDEX_CACHE_FILENAME = 'tune_index_cache.sqlite'
+TUNE_INDEX_CACHE_PATH = recent_files.CONFIG_DIR + TUNE_INDEX_CACHE_FILENAME
+
+# Version of the format of the cached data: cached indexes with another
+# version are ignored.  To be incremented each time TuneIndex.dump() changes.
+FORMAT_VERSION = 3
+
+
+def open_tunebook(path: str) -> Tunebook:
+    """Open a tunebook, using the cached index of the file if it is valid.
+
+    Args:
+        path: normalized path of the ABC file
+
+    Returns:
+        The opened Tunebook.
+
+    Raises:
+        OSError: the file cannot be opened
+    """
+    return Tunebook(path, index=load_index(path))
+
+
+def load_index(path: str) -> TuneIndex:
+    """Get the index of an ABC file from the cache, or index the file.
+
+    Args:
+        path: normalized path of the ABC file
+
+    Returns:
+        The index of the file.
+
+    Raises:
+        OSError: the file cannot be opened
+    """
+    stat = os.stat(path)
+    index = _load_cached_index(path, stat)
+    if index is not None:
+        return index
+
+    with Tunebook(path) as tunebook:
+        index = tunebook.index
+        digest = tunebook.get_digest()
+    _store_index(path, stat, digest, index)
+    return index
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the cache database, create it if it does not exist."""
+    cache_path = os.path.expanduser(TUNE_INDEX_CACHE_PATH)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    connection = sqlite3.connect(cache_path)
+    connection.execute('CREATE TABLE IF NOT EXISTS tune_index ('
+                       'path TEXT PRIMARY KEY, version INTEGER, size INTEGER, '
+                       'mtime_ns INTEGER, digest TEXT, data BLOB)')
+    return connection
+
+
+def _load_cached_index(path: str, stat: os.stat_result) -> Optional[TuneIndex]:
+    """Return the cached index of a file if it is still valid, else None."""
+    try:
+        with contextlib.closing(_connect()) as connection:
+            row = connection.execute(
+                'SELECT version, size, mtime_ns, digest, data FROM tune_index WHERE path = ?',
+                (path,)).fetchone()
+            if row is None:
+                log.debug('tune index cache miss: ' + path)
+                return None
+            version, size, mtime_ns, digest, data = row
+            if version != FORMAT_VERSION or size != stat.st_size:
+                log.debug('tune index cache: outdated index for ' + path)
+                return None
+            if mtime_ns != stat.st_mtime_ns:
+                with Tunebook(path, index=TuneIndex()) as tunebook:
+                    if tunebook.get_digest() != digest:
+                        log.debug('tune index cache: file changed: ' + path)
+                        return None
+                with connection:
+                    connection.execute('UPDATE tune_index SET mtime_ns = ? WHERE path = ?',
+                                       (stat.st_mtime_ns, path))
+            log.debug('tune index cache hit: ' + path)
+            return _unpickle_index(data)
+    except (sqlite3.Error, OSError, pickle.UnpicklingError, ValueError, TypeError) as e:
+        log.warning('Failed to read the tune index cache: ' + str(e))
+        return None
+
+
+def _unpickle_index(data: bytes) -> TuneIndex:
+    # Loading a large index creates lots of small objects, which triggers
+    # useless garbage collections: pause the garbage collector meanwhile.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return TuneIndex.load(pickle.loads(data))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _store_index(path: str, stat: os.stat_result, digest: str, index: TuneIndex):
+    """Save the index of a file in the cache."""
+    data = pickle.dumps(index.dump(), protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        with contextlib.closing(_connect()) as connection:
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO tune_index VALUES (?, ?, ?, ?, ?, ?)',
+                    (path, FORMAT_VERSION, stat.st_size, stat.st_mtime_ns, digest, data))
+    except (sqlite3.Error, OSError) as e:
+        log.warning('Failed to write the tune index cache: ' + str(e))
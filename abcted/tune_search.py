@@ -0,0 +1,258 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Find tunes by their header fields across tunebooks
+
+The search index is an inverted index: for each normalized word found in the
+header fields of the tunes (T:, C:, O:, R:, K:, M:), it keeps the list of the
+tunes where the word appears (postings).  A word is indexed twice: alone, and
+prefixed with its field, eg 'kesh' and 't:kesh', so that a query can look for
+a word in any field or in a given field.
+
+Titles are also indexed by trigrams (sequences of 3 characters) to find tunes
+whose title is close to, but not exactly, the query (eg a typo or another
+spelling).
+
+Query syntax: words separated by spaces, all the words have to match (AND).
+A word can be restricted to a field with a prefix: 't:kesh r:jig k:G m:6/8'.
+Keys are normalized: 'k:G', 'k:Gmaj' and 'k:G major' are the same query (the
+word after a key is part of the key when it is a mode, eg 'major' or 'dor').
+"""
+
+from bisect import bisect_left
+from collections import Counter, defaultdict
+import heapq
+import logging as log
+import math
+import re
+import unicodedata
+from typing import Dict, Iterator, List, NamedTuple, Set, Tuple
+
+import recent_files
+from tune_index import TuneEntry, TuneIndex
+import tune_index_cache
+
+
+FIELDS = ('t', 'c', 'o', 'r', 'k', 'm')
+
+FUZZY_MIN_SCORE = 0.5  # Minimum ratio of query trigrams found in a title
+
+_WORD_RE = re.compile(r"[\w#/|]+")
+_QUERY_FIELD_RE = re.compile(r'([a-zA-Z]):(.*)')
+_KEY_RE = re.compile(r'\s*([a-g])([#b]?)\s*([a-z]*)')
+_MODES = {'': 'maj', 'm': 'min', 'maj': 'maj', 'ion': 'maj', 'min': 'min',
+          'aeo': 'min', 'dor': 'dor', 'phr': 'phr', 'lyd': 'lyd', 'mix': 'mix',
+          'loc': 'loc'}
+# Words of a mode that can follow the root of a key, eg 'G major'
+_MODE_WORDS = ('m', 'major', 'ionian', 'minor', 'aeolian', 'dorian', 'phrygian', 'lydian',
+               'mixolydian', 'locrian')
+
+
+class SearchResult(NamedTuple):
+    path: str         # Path of the tunebook
+    tune: TuneEntry   # Tune found, with its position in the tunebook
+    score: float      # 1.0 for an exact match, less for a fuzzy title match
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for searching: lower case, without accents"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def normalize_key(raw_key: str) -> str:
+    """Normalize a key for searching, eg 'D mixolydian' -> 'dmix'
+
+    Unlike AbcParser.normalize_abc_key(), this never fails: an unknown key
+    is returned as normalized text.
+    """
+    key = normalize_text(raw_key)
+    m = _KEY_RE.match(key)
+    if m is not None:
+        root, alteration, mode = m.groups()
+        mode = _MODES.get(mode[:3])
+        if mode is not None:
+            return root + alteration + mode
+    return key.strip()
+
+
+def _is_mode_word(word: str) -> bool:
+    """Tell whether a word is a mode, maybe abbreviated, eg 'dor' or 'minor'"""
+    word = normalize_text(word)
+    if len(word) < 3:
+        return word == 'm'
+    return any(mode.startswith(word) for mode in _MODE_WORDS)
+
+
+def _split_query(query: str) -> List[str]:
+    """Split a query into terms: the words separated by spaces, except that
+    a key term followed by a mode is one term, eg 'k:G major'"""
+    terms = []
+    for word in query.split():
+        if (terms and terms[-1][:2].lower() == 'k:' and ' ' not in terms[-1]
+                and _is_mode_word(word)):
+            terms[-1] += ' ' + word
+        else:
+            terms.append(word)
+    return terms
+
+
+def _contains(sorted_ids: List[int], tune_id: int) -> bool:
+    i = bisect_left(sorted_ids, tune_id)
+    return i < len(sorted_ids) and sorted_ids[i] == tune_id
+
+
+def _trigrams(text: str) -> Set[str]:
+    trigrams = set()
+    for word in _WORD_RE.findall(text):
+        word = ' ' + word + ' '
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def _tune_fields(tune: TuneEntry) -> Iterator[Tuple[str, str]]:
+    """Yield the (field, value) pairs of a tune that are indexed"""
+    for title in tune.titles:
+        yield 't', title
+    for field, value in (('c', tune.composer), ('o', tune.origin),
+                         ('r', tune.rhythm), ('m', tune.raw_meter)):
+        if value:
+            yield field, value
+    if tune.raw_key:
+        yield 'k', tune.raw_key
+
+
+def _field_words(field: str, value: str) -> List[str]:
+    if field == 'k':
+        return [normalize_key(value)]
+    return _WORD_RE.findall(normalize_text(value))
+
+
+class TuneSearchIndex:
+    """Inverted index of the header fields of the tunes of tunebooks"""
+
+    def __init__(self):
+        self._tunes: List[Tuple[str, TuneEntry]] = []  # Tune id -> (path, tune)
+        # Word -> tune ids, sorted since tunes are only added
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)  # Trigram -> tune ids
+
+    def __len__(self):
+        return len(self._tunes)
+
+    def add_tunebook(self, path: str, index: TuneIndex):
+        """Add all the tunes of a tunebook to the search index.
+
+        Args:
+            path: normalized path of the tunebook
+            index: index of the tunebook
+        """
+        for tune in index.tunes:
+            self.add_tune(path, tune)
+
+    def add_tune(self, path: str, tune: TuneEntry):
+        tune_id = len(self._tunes)
+        self._tunes.append((path, tune))
+
+        words = set()
+        for field, value in _tune_fields(tune):
+            for word in _field_words(field, value):
+                words.add(word)
+                words.add(field + ':' + word)
+        for word in words:
+            self._postings[word].append(tune_id)
+
+        for trigram in _trigrams(normalize_text(' '.join(tune.titles))):
+            self._trigrams[trigram].append(tune_id)
+
+    def search(self, query: str, max_results: int = 50) -> List[SearchResult]:
+        """Find the tunes that match a query.
+
+        Args:
+            query: words to look for, see the syntax in the module doc
+            max_results: maximum number of results
+
+        Returns:
+            The tunes found, best matches first.
+        """
+        keys = []        # Keys to look up in the postings
+        free_words = []  # Words without field, for fuzzy title matching
+        for term in _split_query(query):
+            m = _QUERY_FIELD_RE.fullmatch(term)
+            if m is not None and m.group(1).lower() in FIELDS:
+                field = m.group(1).lower()
+                keys += [field + ':' + word for word in _field_words(field, m.group(2))]
+            else:
+                words = _field_words('', term)
+                keys += words
+                free_words += words
+        if not keys:
+            return []
+
+        # Exact matches: intersect the postings.  The shortest postings are
+        # walked in order and the tune ids are looked up in the others by
+        # bisection, until enough results are found.
+        postings = sorted((self._postings.get(key, []) for key in keys), key=len)
+        exact_ids = set()
+        results = []
+        for tune_id in postings[0]:
+            if all(_contains(other, tune_id) for other in postings[1:]):
+                exact_ids.add(tune_id)
+                results.append(SearchResult(*self._tunes[tune_id], 1.0))
+                if len(results) >= max_results:
+                    return results
+        if not free_words:
+            return results
+
+        # Fuzzy title matches: count the query trigrams found in each title.
+        # A title with enough trigrams has at least one of the rarest
+        # trigrams: the candidates are taken from the postings of these
+        # trigrams, then the common trigrams are looked up by bisection when
+        # there are few candidates.  (Titles without any of the rarest
+        # trigrams cannot reach min_count.)
+        query_trigrams = _trigrams(' '.join(free_words))
+        min_count = FUZZY_MIN_SCORE * len(query_trigrams)
+        trigram_postings = sorted((self._trigrams.get(trigram, [])
+                                   for trigram in query_trigrams), key=len)
+        rare_count = len(trigram_postings) - math.ceil(min_count) + 1
+        counts = Counter()
+        for tune_ids in trigram_postings[:rare_count]:
+            counts.update(tune_ids)
+        for tune_ids in trigram_postings[rare_count:]:
+            if len(counts) * 16 < len(tune_ids):
+                for tune_id in counts:
+                    if _contains(tune_ids, tune_id):
+                        counts[tune_id] += 1
+            else:
+                counts.update(tune_ids)
+        # Tunes must still match the words restricted to a field
+        field_keys = [key for key in keys if ':' in key and key not in free_words]
+        field_ids = None
+        if field_keys:
+            field_postings = [self._postings.get(key, []) for key in field_keys]
+            field_ids = set(field_postings[0]).intersection(*field_postings[1:])
+        candidates = ((count, tune_id) for tune_id, count in counts.items()
+                      if count >= min_count and tune_id not in exact_ids
+                      and (field_ids is None or tune_id in field_ids))
+        for count, tune_id in heapq.nlargest(max_results - len(results), candidates):
+            results.append(SearchResult(*self._tunes[tune_id],
+                                        count / len(query_trigrams)))
+        return results
+
+
+def build_search_index() -> TuneSearchIndex:
+    """Index the tunes of the recent and favorite files.
+
+    The tune indexes of the files come from the tune index cache, so that
+    only the files that have changed since they were last indexed are read.
+    The files that cannot be read are skipped.
+    """
+    search_index = TuneSearchIndex()
+    for path in recent_files.get_recent_files():
+        try:
+            search_index.add_tunebook(path, tune_index_cache.load_index(path))
+        except OSError as e:
+            log.debug('cannot index ' + path + ': ' + str(e))
+    log.debug(f'search index: {len(search_index)} tunes')
+    return search_index
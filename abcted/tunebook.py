@@ -0,0 +1,113 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Read-only access to the tunes of (very large) ABC files
+
+A Tunebook maps the file in memory and indexes its tunes by scanning the
+mapped bytes line by line: only the lines that can change the index (field
+lines, empty lines) are decoded.  The text of a tune is decoded when the
+tune is requested.  Memory usage does not depend on the size of the file
+(the operating system pages the mapped file in and out as needed).
+"""
+
+import hashlib
+import logging as log
+import mmap
+from typing import List, Optional
+
+from tune_index import TuneEntry, TuneIndex
+
+
+ENCODING = 'utf-8'  # abcted only works with UTF-8 files (see design notes)
+
+
+class Tunebook:
+    """An ABC file opened for indexing and reading tunes
+
+    A Tunebook can be used as a context manager to close the file:
+
+        with Tunebook(path) as tunebook:
+            for tune in tunebook.index.tunes:
+                raw_tune = tunebook.get_raw_tune(tune)
+    """
+
+    def __init__(self, path: str, index: Optional[TuneIndex] = None):
+        """Open and index an ABC file.
+
+        Args:
+            path: normalized path of the ABC file
+            index: the index of the file if it is already known (eg from
+                the tune index cache), else the file is indexed
+
+        Raises:
+            OSError: the file cannot be opened or mapped
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Cannot map an empty file
+            self._mmap = None
+        if index is None:
+            index = self._build_index()
+        self.index = index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _build_index(self) -> TuneIndex:
+        index = TuneIndex()
+        line_no = 0
+        offset = 0
+        if self._mmap is not None:
+            for line in iter(self._mmap.readline, b''):
+                line_no += 1
+                # Only decode the lines that can change the index: field lines,
+                # empty lines and lines starting with a space (eg ' X:1').
+                if (line[1:2] == b':' and line[:1].isalpha()) \
+                        or line[:1].isspace():
+                    index.add_line(line_no, line.decode(ENCODING, 'replace').rstrip('\r\n'),
+                                   offset)
+                offset += len(line)
+        index.finish(line_no, offset)
+        log.debug(f'indexed {len(index)} tunes in {self.path}')
+        return index
+
+    def get_digest(self) -> str:
+        """Return a hash of the contents of the file (hexadecimal string)."""
+        digest = hashlib.blake2b(digest_size=20)
+        if self._mmap is not None:
+            digest.update(self._mmap)
+        return digest.hexdigest()
+
+    def get_raw_tune(self, tune: TuneEntry) -> List[str]:
+        """Read and decode a tune.
+
+        Args:
+            tune: a tune from the index of the tunebook
+
+        Returns:
+            An array of strings, one per line, starting at the ABC reference
+            number (X: header).
+
+        Raises:
+            UnicodeDecodeError: the tune is not encoded in UTF-8
+        """
+        if self._mmap is None:
+            return []
+        # Split at '\n' only, like the index (not str.splitlines(), that also
+        # splits at eg '\f'), so that the lines match the line numbers
+        lines = self._mmap[tune.offset:tune.end_offset].decode(ENCODING).split('\n')
+        if lines[-1] == '':
+            lines.pop()
+        return [line[:-1] if line.endswith('\r') else line for line in lines]
@@ -0,0 +1,39 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the conversion of ABC notes to MIDI numbers: one note at a time
+(abc2midi.get_midi_note()) vs a sequence of notes (abc2midi.get_midi_notes())
+
+Usage (from the root of the repository):
+
+    $ PYTHONPATH=abcted python3 prototypes/bench_midi_notes.py [note_count]
+"""
+
+import random
+import sys
+import timeit
+
+import abc2midi
+
+
+def main():
+    note_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(0)
+    notes = random.choices(list(abc2midi.MIDI_NOTES), k=note_count)
+
+    scalar = [abc2midi.get_midi_note(note) for note in notes]
+    batch = abc2midi.get_midi_notes(notes)
+    assert list(batch) == scalar
+
+    scalar_time = min(timeit.repeat(lambda: [abc2midi.get_midi_note(note) for note in notes],
+                                    number=1, repeat=3))
+    batch_time = min(timeit.repeat(lambda: abc2midi.get_midi_notes(notes),
+                                   number=1, repeat=3))
+    print(f'{note_count} notes')
+    print(f'get_midi_note():  {scalar_time:.3f} s')
+    print(f'get_midi_notes(): {batch_time:.3f} s ({scalar_time / batch_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.abcevents import (AbcParserException, TICKS_PER_QUARTER, parse_events, parse_length,
+                              parse_tuplet)
+
+
+EIGHTH = TICKS_PER_QUARTER // 2
+
+
+def parse(body, header=('X:1', 'L:1/8', 'K:C')):
+    return parse_events(list(header) + [body])
+
+
+class TestParseLength(unittest.TestCase):
+    def test_parse_length(self):
+        self.assertEqual((1, 1), parse_length(''))
+        self.assertEqual((3, 1), parse_length('3'))
+        self.assertEqual((3, 2), parse_length('3/2'))
+        self.assertEqual((1, 2), parse_length('/'))
+        self.assertEqual((1, 4), parse_length('//'))
+        self.assertEqual((1, 4), parse_length('/4'))
+
+    def test_zero_denominator(self):
+        self.assertRaises(AbcParserException, parse_length, '/0')
+        self.assertRaises(AbcParserException, parse_length, '3/0')
+
+
+class TestParseTuplet(unittest.TestCase):
+    def test_parse_tuplet(self):
+        self.assertEqual((3, 2, 3), parse_tuplet('(3', (4, 4)))
+        self.assertEqual((2, 3, 2), parse_tuplet('(2', (4, 4)))
+        self.assertEqual((3, 2, 4), parse_tuplet('(3:2:4', (4, 4)))
+
+    def test_zero(self):
+        self.assertRaises(AbcParserException, parse_tuplet, '(0', (4, 4))
+        self.assertRaises(AbcParserException, parse_tuplet, '(3:0', (4, 4))
+
+
+class TestParseEvents(unittest.TestCase):
+    def test_pitches_in_key(self):
+        events = parse('FGf', header=('X:1', 'K:D'))
+        self.assertEqual([66, 67, 78], list(events.pitch))
+
+    def test_accidentals_last_until_end_of_bar(self):
+        events = parse('^FF =F|F')
+        self.assertEqual([66, 66, 65, 65], list(events.pitch))
+
+    def test_lengths(self):
+        events = parse('A A2 A/ A3/2')
+        self.assertEqual([EIGHTH, 2 * EIGHTH, EIGHTH // 2, 3 * EIGHTH // 2],
+                         list(events.duration))
+        self.assertEqual([0, EIGHTH, 3 * EIGHTH, 7 * EIGHTH // 2], list(events.onset))
+
+    def test_default_length_from_meter(self):
+        events = parse('A', header=('X:1', 'M:2/4', 'K:C'))
+        self.assertEqual([EIGHTH // 2], list(events.duration))
+        events = parse('A', header=('X:1', 'M:6/8', 'K:C'))
+        self.assertEqual([EIGHTH], list(events.duration))
+
+    def test_broken_rhythm(self):
+        events = parse('A>B C<D')
+        self.assertEqual([3 * EIGHTH // 2, EIGHTH // 2, EIGHTH // 2, 3 * EIGHTH // 2],
+                         list(events.duration))
+        self.assertEqual([0, 3 * EIGHTH // 2, 2 * EIGHTH, 5 * EIGHTH // 2],
+                         list(events.onset))
+
+    def test_chord(self):
+        events = parse('[CEG]2 A')
+        self.assertEqual([0, 0, 0, 2 * EIGHTH], list(events.onset))
+        self.assertEqual([2 * EIGHTH] * 3 + [EIGHTH], list(events.duration))
+
+    def test_tie(self):
+        events = parse('A2-A B')
+        self.assertEqual([69, 71], list(events.pitch))
+        self.assertEqual([3 * EIGHTH, EIGHTH], list(events.duration))
+
+    def test_triplet(self):
+        events = parse('(3ABc d')
+        self.assertEqual([0, EIGHTH * 2 // 3, EIGHTH * 4 // 3, 2 * EIGHTH],
+                         list(events.onset))
+
+    def test_invalid_tuplet(self):
+        events = parse('(0abc d')
+        self.assertEqual([0, EIGHTH, 2 * EIGHTH, 3 * EIGHTH], list(events.onset))
+
+    def test_invalid_lengths(self):
+        events = parse('A/0 B z/0 c')
+        self.assertEqual([71, 72], list(events.pitch))
+        self.assertEqual([0, EIGHTH], list(events.onset))
+
+    def test_rests_and_grace_notes(self):
+        events = parse('z2 {g}A')
+        self.assertEqual([69], list(events.pitch))
+        self.assertEqual([2 * EIGHTH], list(events.onset))
+
+    def test_bars(self):
+        events = parse('|:AB|cd:|\n', header=('X:1', 'L:1/8', 'M:2/8', 'K:C'))
+        self.assertEqual([0, 0, 1, 1], list(events.bar))
+        self.assertEqual([0, 2 * EIGHTH, 4 * EIGHTH], list(events.bar_onsets))
+        self.assertEqual((2, 8), events.meter)
+        self.assertEqual(4 * EIGHTH, events.end_tick)
+
+    def test_source_offsets(self):
+        events = parse_events(['X:1', 'K:C', 'A B', ' c'])
+        self.assertEqual([8, 10, 13], list(events.offset))
+
+    def test_voices(self):
+        events = parse_events(['X:1', 'L:1/8', 'K:C', 'V:1', 'A2', 'V:2', 'C'])
+        self.assertEqual([0, 1], list(events.channel))
+        self.assertEqual([0, 0], list(events.onset))
+
+    def test_dynamics(self):
+        events = parse('A !f!B')
+        self.assertEqual([80, 105], list(events.velocity))
+
+    def test_transpose(self):
+        events = parse('CD')
+        events.transpose(-2)
+        self.assertEqual([58, 60], list(events.pitch))
+
+
+if __name__ == '__main__':
+    unittest.main()
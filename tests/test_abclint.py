@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.abclint import Diagnostic, LintCancelled, check_tune
+
+
+def make_tune(body, header=('M:4/4', 'L:1/8', 'K:G')):
+    return ['X:1', 'T:Test'] + list(header) + body.split('\n')
+
+
+class TestCheckFields(unittest.TestCase):
+    def test_valid_tune(self):
+        raw_tune = make_tune('A|BcdB AGFE|D2 DE FGAB|cdef g2 fe|d4 z3',
+                             header=('M:4/4', 'L:1/8', 'Q:1/4=120', 'K:D mix clef=treble'))
+        self.assertEqual(check_tune(raw_tune), [])
+
+    def test_invalid_fields(self):
+        raw_tune = make_tune('ABcd', header=('M:4/x', 'L:1/y', 'Q:fast', 'K:Hz'))
+        self.assertEqual([(d.line, d.col, d.end_col) for d in check_tune(raw_tune)],
+                         [(3, 2, 5), (4, 2, 5), (5, 2, 6), (6, 2, 4)])
+
+    def test_inline_field(self):
+        raw_tune = make_tune('ABcd [K:Xb] efga')
+        self.assertEqual(check_tune(raw_tune, first_line_no=10),
+                         [Diagnostic(15, 8, 15, 10, 'Tonalité invalide: Xb')])
+
+    def test_invalid_lengths(self):
+        raw_tune = make_tune('A/0 B (0abc z/0')
+        self.assertEqual(check_tune(raw_tune),
+                         [Diagnostic(6, 0, 6, 3, 'Durée invalide: A/0'),
+                          Diagnostic(6, 6, 6, 8, 'N-uplet invalide: (0'),
+                          Diagnostic(6, 12, 6, 15, 'Durée invalide: z/0')])
+
+    def test_special_values(self):
+        raw_tune = make_tune('ABcd', header=('M:none', 'L:1/8', 'Q:"Allegro"', 'K:none'))
+        self.assertEqual(check_tune(raw_tune), [])
+
+
+class TestCheckBarLengths(unittest.TestCase):
+    def test_short_bar(self):
+        raw_tune = make_tune('A|BcdB AGFE|cdef g2|D2 DE FGAB|d4 z3')
+        diagnostics = check_tune(raw_tune)
+        self.assertEqual(diagnostics, [Diagnostic(6, 12, 6, 20, 'Mesure de 3/4 au lieu de 4/4')])
+
+    def test_anacrusis_and_repeats(self):
+        # The first and last bars, and the bars around the repeat signs, are
+        # not checked
+        raw_tune = make_tune('A|BcdB AGFE|D2 DE FGA:|\n|:B|cdef gfed|cBAG FGAB|c6|]')
+        self.assertEqual(check_tune(raw_tune), [])
+
+    def test_meter_change(self):
+        raw_tune = make_tune('A|BcdB AGFE|[M:3/4]cdef g2|D2 DE FGAB|d4 z3')
+        self.assertEqual(check_tune(raw_tune), [])
+
+    def test_cancelled(self):
+        with self.assertRaises(LintCancelled):
+            check_tune(make_tune('ABcd'), is_cancelled=lambda: True)
+
+
+if __name__ == '__main__':
+    unittest.main()
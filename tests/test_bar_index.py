@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.abcevents import BarIndex, WHOLE_NOTE_TICKS, parse_events
+
+
+RAW_TUNE = ['X:1', 'M:4/4', 'L:1/4', 'K:C',
+            'A|:BABc|dedc|1 ABcd:|2 ABcc|',
+            '|:efga|bagf:|']
+
+QUARTER = WHOLE_NOTE_TICKS // 4
+
+
+class TestBarIndex(unittest.TestCase):
+    def setUp(self):
+        events = parse_events(RAW_TUNE).unfold_repeats()
+        self.bar_index = events.get_bar_index(RAW_TUNE, first_line_no=10)
+
+    def test_length(self):
+        # Anacrusis, 3 bars, 2 bars, 1 variant ending and 4 bars: not the
+        # empty bar after the last bar line
+        self.assertEqual(len(self.bar_index), 11)
+
+    def test_last_bar(self):
+        last_bar = len(self.bar_index) - 1
+        self.assertEqual(self.bar_index.get_bar_range_at(last_bar), ((15, 7), (15, 13)))
+        self.assertEqual(self.bar_index.get_bar(11 * WHOLE_NOTE_TICKS), last_bar)
+
+    def test_tick_to_position(self):
+        self.assertEqual(self.bar_index.get_position(0), (14, 0))
+        self.assertEqual(self.bar_index.get_position(QUARTER), (14, 3))
+        self.assertEqual(self.bar_index.get_position(QUARTER + WHOLE_NOTE_TICKS - 1), (14, 3))
+        # Second pass of the first section, then the second variant ending
+        self.assertEqual(self.bar_index.get_position(QUARTER + 3 * WHOLE_NOTE_TICKS), (14, 3))
+        self.assertEqual(self.bar_index.get_position(QUARTER + 5 * WHOLE_NOTE_TICKS), (14, 22))
+        self.assertEqual(self.bar_index.get_position(QUARTER + 6 * WHOLE_NOTE_TICKS), (15, 2))
+
+    def test_get_bar(self):
+        self.assertEqual(self.bar_index.get_bar(0), 0)
+        self.assertEqual(self.bar_index.get_bar(QUARTER), 1)
+        self.assertEqual(self.bar_index.get_bar(QUARTER + 3 * WHOLE_NOTE_TICKS), 4)
+        self.assertEqual(self.bar_index.get_bar_range_at(4), self.bar_index.get_bar_range_at(1))
+
+    def test_bar_range(self):
+        self.assertEqual(self.bar_index.get_bar_range(QUARTER), ((14, 3), (14, 8)))
+        self.assertEqual(self.bar_index.get_bar_range(QUARTER + 5 * WHOLE_NOTE_TICKS),
+                         ((14, 22), (15, 2)))
+        self.assertEqual(self.bar_index.get_bar_range(10 * WHOLE_NOTE_TICKS), ((15, 7), (15, 13)))
+
+    def test_position_to_tick(self):
+        self.assertEqual(self.bar_index.get_tick(11, 0), 0)  # In the header
+        self.assertEqual(self.bar_index.get_tick(14, 1), 0)
+        self.assertEqual(self.bar_index.get_tick(14, 5), QUARTER)  # First pass
+        self.assertEqual(self.bar_index.get_tick(14, 24), QUARTER + 5 * WHOLE_NOTE_TICKS)
+        self.assertEqual(self.bar_index.get_tick(15, 8), QUARTER + 7 * WHOLE_NOTE_TICKS)
+
+    def test_round_trip(self):
+        for tick in range(0, 11 * WHOLE_NOTE_TICKS, QUARTER):
+            bar_tick = self.bar_index.get_tick(*self.bar_index.get_position(tick))
+            self.assertEqual(self.bar_index.get_position(bar_tick),
+                             self.bar_index.get_position(tick))
+
+    def test_empty_tune(self):
+        bar_index = BarIndex(parse_events([]), [])
+        self.assertEqual(bar_index.get_tick(1, 0), 0)
+        self.assertEqual(bar_index.get_position(0), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from abcted.batch import BatchProcessor, get_midi_filename
+from abcted.tune_index import TuneIndex
+
+
+TUNEBOOK = '''%abc-2.1
+
+X:1
+T:The Kesh
+R:jig
+K:G
+GAG GAB|ABA ABd|
+
+X:2
+T:Drowsy Maggie
+R:reel
+K:Edor
+E2BE dEBE|E2BE AFDF|
+
+X:3
+K:D
+'''
+
+
+class TestGetMidiFilename(unittest.TestCase):
+    def test_filename(self):
+        tune = TuneIndex.from_text(TUNEBOOK).tunes[0]
+        self.assertEqual(get_midi_filename('/tmp/session.abc', 1, tune), 'session_0001_the_kesh.mid')
+
+    def test_accents_and_punctuation(self):
+        tune = TuneIndex.from_text('X:7\nT:Là-haut, sur la montagne!\n').tunes[0]
+        self.assertEqual(get_midi_filename('a.abc', 12, tune), 'a_0012_la_haut_sur_la_montagne.mid')
+
+    def test_no_title(self):
+        tune = TuneIndex.from_text(TUNEBOOK).tunes[2]
+        self.assertEqual(get_midi_filename('session.abc', 3, tune), 'session_0003.mid')
+
+
+class TestBatchProcessor(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.tunebook_path = os.path.join(self.temp_dir, 'session.abc')
+        with open(self.tunebook_path, 'w', encoding='utf-8') as tunebook_file:
+            tunebook_file.write(TUNEBOOK)
+        self.output_dir = os.path.join(self.temp_dir, 'midi')
+
+    def test_convert_tunebook(self):
+        results = list(BatchProcessor(max_workers=2).convert_tunebook(self.tunebook_path,
+                                                                      self.output_dir))
+        self.assertEqual(sorted(result.number for result in results), [1, 2, 3])
+        for result in results:
+            self.assertIsNone(result.error)
+            with open(result.midi_path, 'rb') as midi_file:
+                self.assertEqual(midi_file.read(4), b'MThd')
+        self.assertEqual(sorted(os.listdir(self.output_dir)),
+                         ['session_0001_the_kesh.mid', 'session_0002_drowsy_maggie.mid',
+                          'session_0003.mid'])
+
+    def test_check_tunebook(self):
+        with open(self.tunebook_path, 'a', encoding='utf-8') as tunebook_file:
+            tunebook_file.write('\nX:4\nM:foo\nK:G\nABC|\n')
+        results = sorted(BatchProcessor(max_workers=1).check_tunebook(self.tunebook_path))
+        self.assertEqual([result.error for result in results[:3]], [None, None, None])
+        self.assertEqual((results[0].note_count, results[0].bar_count), (12, 3))
+        self.assertIn('Invalid meter', results[3].error)
+
+    def test_cancel(self):
+        converter = BatchProcessor(max_workers=1)
+        converter.cancel()
+        results = list(converter.convert_tunebook(self.tunebook_path, self.output_dir))
+        self.assertEqual(results, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from abcted import batch_main
+
+
+TUNEBOOK = '''X:1
+T:The Kesh
+R:jig
+K:G
+GAG GAB|ABA ABd|
+
+X:2
+T:Drowsy Maggie
+R:reel
+K:Edor
+E2BE dEBE|E2BE AFDF|
+'''
+
+
+class TestBatchMain(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        os.mkdir(os.path.join(self.temp_dir, 'sub'))
+        self.paths = [os.path.join(self.temp_dir, 'b.abc'),
+                      os.path.join(self.temp_dir, 'sub', 'a.abc')]
+        for path in self.paths:
+            with open(path, 'w', encoding='utf-8') as tunebook_file:
+                tunebook_file.write(TUNEBOOK)
+        with open(os.path.join(self.temp_dir, 'notes.txt'), 'w') as other_file:
+            other_file.write('X:1\n')
+
+    def run_main(self, *args):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            exit_status = batch_main.main(['-j', '1'] + list(args))
+        return exit_status, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_find_tunebooks(self):
+        self.assertEqual(list(batch_main.find_tunebooks([self.temp_dir])), self.paths)
+
+    def test_index(self):
+        exit_status, records = self.run_main('index', self.temp_dir)
+        self.assertEqual(exit_status, batch_main.EXIT_SUCCESS)
+        self.assertEqual([(r['path'], r['number'], r['title']) for r in records],
+                         [(self.paths[0], 1, 'The Kesh'), (self.paths[0], 2, 'Drowsy Maggie'),
+                          (self.paths[1], 1, 'The Kesh'), (self.paths[1], 2, 'Drowsy Maggie')])
+
+    def test_index_encoding_error(self):
+        with open(self.paths[1], 'ab') as tunebook_file:
+            tunebook_file.write(b'\nX:3\nT:bad \xff\xfe\nK:G\nABC|\n')
+        exit_status, records = self.run_main('index', self.paths[1])
+        self.assertEqual(exit_status, batch_main.EXIT_FAILURE)
+        self.assertEqual([r['error'] is None for r in records], [True, True, False])
+        self.assertIn('UnicodeDecodeError', records[2]['error'])
+
+    def test_validate_error(self):
+        with open(self.paths[1], 'a', encoding='utf-8') as tunebook_file:
+            tunebook_file.write('\nX:3\nL:x\nK:G\nABC|\n')
+        exit_status, records = self.run_main('validate', self.paths[1])
+        self.assertEqual(exit_status, batch_main.EXIT_FAILURE)
+        self.assertEqual([r['error'] is None for r in sorted(records, key=lambda r: r['number'])],
+                         [True, True, False])
+
+    def test_missing_file(self):
+        exit_status, records = self.run_main('validate', os.path.join(self.temp_dir, 'none.abc'))
+        self.assertEqual(exit_status, batch_main.EXIT_FAILURE)
+        self.assertIn('FileNotFoundError', records[0]['error'])
+
+    def test_convert(self):
+        output_dir = os.path.join(self.temp_dir, 'midi')
+        exit_status, records = self.run_main('convert', '-o', output_dir, self.paths[0])
+        self.assertEqual(exit_status, batch_main.EXIT_SUCCESS)
+        self.assertEqual(sorted(os.listdir(output_dir)),
+                         ['b_0001_the_kesh.mid', 'b_0002_drowsy_maggie.mid'])
+
+    def test_stats(self):
+        exit_status, records = self.run_main('stats', self.temp_dir)
+        self.assertEqual(exit_status, batch_main.EXIT_SUCCESS)
+        self.assertEqual(len(records), 3)
+        total = records[-1]
+        self.assertIsNone(total['path'])
+        self.assertEqual((total['tunes'], total['errors']), (4, 0))
+        self.assertEqual(total['rhythms'], {'jig': 2, 'reel': 2})
+        self.assertEqual(total['keys'], {'gmaj': 2, 'edor': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import tkinter as tk
+import unittest
+
+from abcted.edit_zone_buffer import EditZoneBuffer
+
+
+TEXT = '''X:1
+T:The Kesh
+K:G
+GAG GAB|ABA ABd|
+
+X:2
+T:Tam Lin
+K:Dmix
+A2FA DAFA|'''
+
+
+class FakeText:
+    """The methods of ScrolledText used by the indexes of EditZoneBuffer
+
+    Like tkinter, the text ends with an end of line, and the indices after
+    the end of the text are the end of the text.
+    """
+
+    def __init__(self, text):
+        self.lines = text.split('\n')
+        self.cursor = (1, 0)
+        self.full_reads = 0  # Number of reads of the whole text
+
+    def set_text(self, text, cursor_line_no):
+        """Change the text and put the cursor at the end of a line"""
+        self.lines = text.split('\n')
+        self.cursor = (cursor_line_no, len(self.lines[cursor_line_no - 1]))
+
+    def index(self, index):
+        if index == tk.END:
+            return f'{len(self.lines) + 1}.0'
+        assert index == tk.INSERT
+        return '{}.{}'.format(*self.cursor)
+
+    def get(self, start, end):
+        if start == 1.0 and end == tk.END:
+            self.full_reads += 1
+            return '\n'.join(self.lines) + '\n'
+        first_line_no = int(start.split('.')[0])
+        last_line_no = int(end.split('.')[0])
+        return '\n'.join((self.lines + [''])[first_line_no - 1:last_line_no])
+
+
+class TestFindTune(unittest.TestCase):
+    def setUp(self):
+        self.text = FakeText(TEXT)
+        self.buffer = EditZoneBuffer(self.text)
+        self.assertEqual(self.buffer.find_tune(4).x, '1')
+        self.assertEqual(self.text.full_reads, 1)
+
+    def test_typing_does_not_read_the_whole_text(self):
+        # Insert a tune at the cursor, then type in the last tune
+        lines = TEXT.split('\n')
+        lines[5:5] = ['X:3', 'T:New', 'K:D', '']
+        self.text.set_text('\n'.join(lines), 9)
+        self.buffer.on_text_modified()
+        lines[-1] += ' dfef'
+        self.text.set_text('\n'.join(lines), len(lines))
+        self.buffer.on_text_modified()
+
+        self.assertEqual(self.buffer.find_tune(7).x, '3')
+        tune = self.buffer.find_tune(len(lines))
+        self.assertEqual((tune.x, tune.start_line, tune.end_line), ('2', 10, 13))
+        self.assertEqual(self.buffer.get_key_index().get_raw_key(9), 'D')
+        self.assertEqual(self.text.full_reads, 1)
+
+    def test_wrong_guess_is_fixed(self):
+        # A selection of 2 lines replaced with 2 lines, the cursor at the
+        # end: only the line at the cursor is guessed to have changed
+        lines = TEXT.split('\n')
+        lines[3:5] = ['X:3', 'K:A']
+        self.text.set_text('\n'.join(lines), 5)
+        self.buffer.on_text_modified()
+
+        tune = self.buffer.find_tune(5)
+        self.assertEqual((tune.x, tune.start_line, tune.end_line, tune.raw_key),
+                         ('3', 4, 5, 'A'))
+        self.assertEqual(self.text.full_reads, 2)
+        self.assertEqual(self.buffer.get_key_index().get_raw_key(5), 'A')
+
+
+if __name__ == '__main__':
+    unittest.main()
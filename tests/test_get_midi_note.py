@@ -1,7 +1,7 @@
 import unittest
 
 
-from abcted.abc2midi import get_midi_note
+from abcted.abc2midi import get_midi_note, get_midi_notes
 
 
 class TestGetMidiNote(unittest.TestCase):
@@ -42,5 +42,18 @@ class TestGetMidiNote(unittest.TestCase):
         self.assertEqual(62, midi_note)
 
 
+class TestGetMidiNotes(unittest.TestCase):
+    def test_same_as_get_midi_note(self):
+        notes = ['C,', 'C', 'c', "c'", '_E', '__E', '^^f', "_b'"]
+        self.assertEqual(list(get_midi_notes(notes)), [get_midi_note(note) for note in notes])
+
+    def test_invalid_note(self):
+        # Same error as get_midi_note()
+        self.assertRaises(KeyError, get_midi_notes, ['C,,'])
+
+    def test_empty(self):
+        self.assertEqual(len(get_midi_notes([])), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -11,9 +11,13 @@ class MockEditZone(EditZoneBuffer):
     """
 
     def __init__(self, raw_abc):
+        super().__init__(scrolled_text=None)
         self.raw_abc = raw_abc
         self.abc_lines = raw_abc.split('\n')
 
+    def get(self):
+        return self.raw_abc
+
     def get_current_line_to_cursor(self):
         return self.abc_lines[-1]
 
@@ -43,6 +47,18 @@ class TestGetNoteToPlay(unittest.TestCase):
         note_to_play = get_note_to_play(mock_edit_zone, keysym='f')
         self.assertEqual('f', note_to_play)
 
+    def test_f_after_inline_key(self):
+        raw_abc = """K:C\nCDEF [K:D] GAB"""
+        mock_edit_zone = MockEditZone(raw_abc)
+        note_to_play = get_note_to_play(mock_edit_zone, keysym='f')
+        self.assertEqual('^f', note_to_play)
+
+    def test_f_after_inline_key_above(self):
+        raw_abc = """K:C\nCDEF [K:D] GAB\nA"""
+        mock_edit_zone = MockEditZone(raw_abc)
+        note_to_play = get_note_to_play(mock_edit_zone, keysym='f')
+        self.assertEqual('^f', note_to_play)
+
     # Test octave markers
 
     def test_upper_c_in_c(self):
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import tkinter as tk
+import unittest
+
+from abcted.abctokenizer import TokenCache
+from abcted.highlighter import Highlighter, get_tag_ranges
+from abcted.theme import Theme
+
+
+class TestGetTagRanges(unittest.TestCase):
+    def test_header_and_body(self):
+        lines = ['X:1', '% comment', '"Am"A2 !trill!B|[K:D] c']
+        ranges = get_tag_ranges(enumerate(lines, 10), TokenCache())
+        self.assertEqual(ranges, {
+            'syntax_field': ['10.0', '10.3', '12.16', '12.21'],
+            'syntax_comment': ['11.0', '11.9'],
+            'syntax_annotation': ['12.0', '12.4'],
+            'syntax_decoration': ['12.7', '12.14'],
+            'syntax_bar': ['12.15', '12.16'],
+        })
+
+    def test_notes_only(self):
+        self.assertEqual(get_tag_ranges([(1, 'ABcd efga')], TokenCache()), {})
+
+
+class FakeScrollbar:
+    def set(self, first, last):
+        pass
+
+
+class FakeScrolledText:
+    """The methods of ScrolledText used by the highlighter, with the same
+    signatures as tkinter.  The tags are kept per line, the after()
+    callbacks are run by run_after()."""
+
+    def __init__(self, lines, first_visible_line_no, visible_line_count=20):
+        self.lines = lines
+        self.first_visible_line_no = first_visible_line_no
+        self.visible_line_count = visible_line_count
+        self.vbar = FakeScrollbar()
+        self.tag_lines = {}  # Tag -> numbers of the lines with the tag
+        self._after_ids = {}
+        self._next_id = 0
+
+    def tag_config(self, tagName, cnf=None, **kw):
+        pass
+
+    def config(self, cnf=None, **kw):
+        pass
+
+    def index(self, index):
+        if index == 'end-1c':
+            return f'{len(self.lines)}.{len(self.lines[-1])}'
+        if index in (tk.INSERT, '@0,0'):
+            return f'{self.first_visible_line_no}.0'
+        assert index.startswith('@0,')
+        return f'{self.first_visible_line_no + self.visible_line_count - 1}.0'
+
+    def winfo_height(self):
+        return 400
+
+    def get(self, index1, index2=None):
+        first_line_no = int(index1.split('.')[0])
+        last_line_no = int(index2.split('.')[0])
+        return '\n'.join(self.lines[first_line_no - 1:last_line_no])
+
+    def after(self, ms, func=None, *args):
+        self._next_id += 1
+        self._after_ids[self._next_id] = func
+        return self._next_id
+
+    def after_idle(self, func, *args):
+        return self.after('idle', func)
+
+    def after_cancel(self, id):
+        del self._after_ids[id]
+
+    def run_after(self):
+        """Run the after() callbacks, including the ones that they schedule"""
+        while self._after_ids:
+            self._after_ids.pop(min(self._after_ids))()
+
+    def _get_line_numbers(self, index1, index2):
+        return range(int(index1.split('.')[0]), int(index2.split('.')[0]) + 1)
+
+    def tag_add(self, tagName, index1, *args):
+        indices = (index1,) + args
+        for start, end in zip(indices[::2], indices[1::2]):
+            self.tag_lines.setdefault(tagName, set()).update(self._get_line_numbers(start, end))
+
+    def tag_remove(self, tagName, index1, index2=None):
+        self.tag_lines.get(tagName, set()).difference_update(
+            self._get_line_numbers(index1, index2))
+
+
+class TestHighlighter(unittest.TestCase):
+    def test_catch_up_after_scroll(self):
+        # The lines around line 300 are highlighted first, then the idle
+        # steps highlight the lines above and below them: two runs of dirty
+        # lines in the first step
+        text = FakeScrolledText(['% comment'] * 1200, first_visible_line_no=300)
+        highlighter = Highlighter(text, Theme())
+        highlighter.on_text_modified()
+        self.assertEqual(text.tag_lines['syntax_comment'], set(range(250, 370)))
+        text.run_after()
+        self.assertEqual(text.tag_lines['syntax_comment'], set(range(1, 1201)))
+
+    def test_changed_lines(self):
+        text = FakeScrolledText(['% comment', 'ABcd', '% comment'], first_visible_line_no=1)
+        highlighter = Highlighter(text, Theme())
+        highlighter.on_text_modified()
+        text.lines[0:2] = ['ABcd', '% comment']
+        highlighter.on_text_modified()
+        self.assertEqual(text.tag_lines['syntax_comment'], {2, 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import io
+import unittest
+
+from abcted.abcparser import iter_tunes
+from abcted.tune_index import TuneIndex
+
+
+TEXT = '''%abc-2.1
+%%pagewidth 21cm
+
+X:1
+T:The Kesh
+K:G
+GAG GAB|ABA ABd|
+X:2
+T:Drowsy Maggie
+K:Edor
+E2BE dEBE|
+
+ X:3
+T:Là-haut
+K:D
+'''
+
+
+class TestIterTunes(unittest.TestCase):
+    def test_text_stream(self):
+        tunes = list(iter_tunes(io.StringIO(TEXT)))
+        self.assertEqual([raw_tune for offset, raw_tune in tunes],
+                         [['X:1', 'T:The Kesh', 'K:G', 'GAG GAB|ABA ABd|'],
+                          ['X:2', 'T:Drowsy Maggie', 'K:Edor', 'E2BE dEBE|'],
+                          [' X:3', 'T:Là-haut', 'K:D']])
+        self.assertEqual([TEXT[offset:].split('\n')[0] for offset, raw_tune in tunes],
+                         ['X:1', 'X:2', ' X:3'])
+
+    def test_same_boundaries_as_tune_index(self):
+        index = TuneIndex.from_text(TEXT)
+        lines = TEXT.split('\n')
+        self.assertEqual([raw_tune for offset, raw_tune in iter_tunes(io.StringIO(TEXT))],
+                         [lines[tune.start_line - 1:tune.end_line] for tune in index.tunes])
+        self.assertEqual([offset for offset, raw_tune in iter_tunes(io.StringIO(TEXT))],
+                         [tune.offset for tune in index.tunes])
+
+    def test_binary_stream(self):
+        data = TEXT.replace('\n', '\r\n').encode('utf-8')
+        tunes = list(iter_tunes(io.BytesIO(data)))
+        self.assertEqual(tunes[2][1], [' X:3', 'T:Là-haut', 'K:D'])
+        self.assertEqual([data[offset:offset + 4] for offset, raw_tune in tunes],
+                         [b'X:1\r', b'X:2\r', b' X:3'])
+
+    def test_invalid_utf8(self):
+        tunes = list(iter_tunes(io.BytesIO(b'X:1\nT:L\xe0-haut\n')))
+        self.assertEqual(tunes, [(0, ['X:1', 'T:L�-haut'])])
+
+    def test_no_tune(self):
+        self.assertEqual(list(iter_tunes(io.StringIO('%abc\n\nT:no X\n'))), [])
+
+    def test_lazy(self):
+        lines = iter(['X:1\n', 'K:G\n', '\n', 'X:2\n', 'K:D\n', '\n'])
+        tunes = iter_tunes(lines)
+        self.assertEqual(next(tunes), (0, ['X:1', 'K:G']))
+        self.assertEqual(next(lines), 'X:2\n')  # Not read yet
+
+
+if __name__ == '__main__':
+    unittest.main()
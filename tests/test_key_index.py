@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.key_index import KeyIndex, get_key_change
+
+
+LINES = ['X:1', 'T:Tune 1', 'K:G',    # 1-3
+         'ABcd [K:D] efga',           # 4
+         'ABcd',                      # 5
+         '',                          # 6
+         'X:2', 'K:Am',               # 7-8
+         'ABcd % [K:E]']              # 9
+
+TUNEBOOK = """\
+% Tunebook header
+K:G
+
+X:1
+T:The Kesh
+T:Kesh Jig
+R:jig
+M:6/8
+L:1/8
+K:G
+GAG GAB|ABA ABd|
+K:D
+def gfe|
+
+X:2
+T:Tam Lin
+K:Dmix
+X:3
+T:Sporting Nell
+K:Ador
+"""
+
+
+class TestGetKeyChange(unittest.TestCase):
+    def test_fields(self):
+        self.assertEqual(get_key_change('K:G'), (True, 'G'))
+        self.assertEqual(get_key_change('X:1'), (True, None))
+        self.assertEqual(get_key_change(' X:1'), (True, None))
+        self.assertEqual(get_key_change('T:[K:D]'), (False, None))
+
+    def test_inline_fields(self):
+        self.assertEqual(get_key_change('AB [K:D] cd [K:A] ef'), (True, 'A'))
+        self.assertEqual(get_key_change('AB % [K:D]'), (False, None))
+        self.assertEqual(get_key_change('ABcd'), (False, None))
+
+
+class TestKeyIndex(unittest.TestCase):
+    def test_get_raw_key(self):
+        key_index = KeyIndex(LINES)
+        self.assertEqual(len(key_index), 5)
+        self.assertEqual(key_index.line_count, 9)
+        self.assertEqual([key_index.get_raw_key(line_no) for line_no in range(0, 10)],
+                         [None, None, None, 'G', 'D', 'D', 'D', None, 'Am', 'Am'])
+
+    def test_tunebook(self):
+        # Keys of the tunebook header, of the tune headers and of the tune
+        # bodies
+        key_index = KeyIndex(TUNEBOOK.split('\n'))
+        self.assertIsNone(key_index.get_raw_key(1))
+        self.assertEqual('G', key_index.get_raw_key(2))
+        self.assertIsNone(key_index.get_raw_key(9))
+        self.assertEqual('G', key_index.get_raw_key(11))
+        self.assertEqual('D', key_index.get_raw_key(13))
+        self.assertIsNone(key_index.get_raw_key(15))
+        self.assertEqual('Dmix', key_index.get_raw_key(17))
+
+    def test_update_in_line(self):
+        key_index = KeyIndex(LINES)
+        key_index.update(5, 1, ['AB [K:F] cd'])
+        self.assertEqual(key_index.get_raw_key(5), 'F')
+        key_index.update(4, 1, ['ABcd efga'])
+        self.assertEqual(key_index.get_raw_key(4), 'G')
+        self.assertEqual(key_index.get_raw_key(8), 'Am')
+
+    def test_insert_and_delete_lines(self):
+        key_index = KeyIndex(LINES)
+        # Split line 5 in 3 lines, with a key change
+        key_index.update(5, 1, ['AB', 'K:Bb', 'cd'])
+        self.assertEqual(key_index.line_count, 11)
+        self.assertEqual(key_index.get_raw_key(6), 'Bb')
+        self.assertEqual(key_index.get_raw_key(9), None)
+        self.assertEqual(key_index.get_raw_key(10), 'Am')
+        # Join them again
+        key_index.update(5, 3, ['ABcd'])
+        self.assertEqual(key_index.line_count, 9)
+        self.assertEqual([key_index.get_raw_key(line_no) for line_no in range(0, 10)],
+                         [None, None, None, 'G', 'D', 'D', 'D', None, 'Am', 'Am'])
+
+    def test_same_as_rebuilt(self):
+        key_index = KeyIndex(LINES)
+        lines = list(LINES)
+        for first_line_no, old_line_count, new_lines in [
+                (1, 0, ['K:C', '']), (9, 2, ['X:3']), (3, 4, []), (4, 1, ['a', '[K:E]'])]:
+            key_index.update(first_line_no, old_line_count, new_lines)
+            lines[first_line_no - 1:first_line_no - 1 + old_line_count] = new_lines
+            rebuilt = KeyIndex(lines)
+            self.assertEqual(key_index.line_count, rebuilt.line_count)
+            self.assertEqual([key_index.get_raw_key(line_no) for line_no in range(len(lines) + 1)],
+                             [rebuilt.get_raw_key(line_no) for line_no in range(len(lines) + 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
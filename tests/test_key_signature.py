@@ -0,0 +1,39 @@
+import unittest
+
+from abcted.abc2midi import get_midi_note
+from abcted.abcparser import AbcParser
+from abcted.musictheory import KEY_SIGNATURES, MAJOR_SCALES, MODE_ALTERATIONS, \
+    get_key_signature, get_note_alteration_in_key
+
+
+class TestKeySignature(unittest.TestCase):
+    def test_all_keys(self):
+        self.assertEqual(len(KEY_SIGNATURES), len(MAJOR_SCALES) * len(MODE_ALTERATIONS))
+        self.assertIn(('Cb', 'loc'), KEY_SIGNATURES)
+
+    def test_midi_notes(self):
+        for abc_key, key_signature in KEY_SIGNATURES.items():
+            for note, midi_note in key_signature.midi_notes.items():
+                alteration = get_note_alteration_in_key(note, abc_key)
+                self.assertEqual(midi_note, get_midi_note(alteration + note), (abc_key, note))
+
+    def test_get_midi_notes(self):
+        key_signature = get_key_signature(('D', 'maj'))
+        self.assertEqual(list(key_signature.get_midi_notes('DFGc')), [62, 66, 67, 73])
+        self.assertEqual(list(key_signature.get_midi_notes(['D', 'f', 'c'], [-1, 1, 0])),
+                         [50, 90, 73])
+
+    def test_invalid_key(self):
+        self.assertRaises(KeyError, get_key_signature, ('H', 'maj'))
+
+
+class TestNormalizeAbcKeyMemoized(unittest.TestCase):
+    def test_memoized(self):
+        AbcParser.normalize_abc_key('Ador')
+        hits = AbcParser.normalize_abc_key.cache_info().hits
+        self.assertEqual(AbcParser.normalize_abc_key('Ador'), ('A', 'dor'))
+        self.assertEqual(AbcParser.normalize_abc_key.cache_info().hits, hits + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.latency import LatencyHistogram, LatencyTracker, MAX_VALUE, TOTAL
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.get_percentile(50), 0)
+        self.assertEqual(histogram.format(), 'n=0')
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 101):
+            histogram.record(value)
+        self.assertEqual(histogram.get_percentile(50), 50)
+        self.assertEqual(histogram.get_percentile(99), 99)
+        self.assertEqual(histogram.get_percentile(100), 100)
+
+    def test_relative_error(self):
+        for value in (129, 1000, 12345, 987654, MAX_VALUE - 1):
+            histogram = LatencyHistogram()
+            histogram.record(value)
+            histogram.record(MAX_VALUE)
+            percentile = histogram.get_percentile(50)
+            self.assertGreaterEqual(percentile, value)
+            self.assertLess(percentile - value, value / 64)
+
+    def test_clamp(self):
+        histogram = LatencyHistogram()
+        histogram.record(-5)
+        histogram.record(10 * MAX_VALUE)
+        self.assertEqual(histogram.get_percentile(50), 0)
+        self.assertEqual(histogram.max, MAX_VALUE)
+
+    def test_format(self):
+        histogram = LatencyHistogram()
+        for value in (400, 400, 800, 3100):
+            histogram.record(value)
+        self.assertEqual(histogram.format(),
+                         'n=4 p50=0.40ms p95=3.10ms p99=3.10ms max=3.10ms')
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.tracker = LatencyTracker(clock=lambda: self.now)
+
+    def key_press(self, *durations_us):
+        self.tracker.start()
+        for stage, duration in zip(('parse', 'noteon'), durations_us):
+            self.now += duration * 1000
+            self.tracker.mark(stage)
+        self.tracker.finish()
+
+    def test_stages_and_total(self):
+        self.key_press(100, 300)
+        self.key_press(200, 500)
+        histograms = self.tracker.histograms
+        self.assertEqual(list(histograms), ['parse', 'noteon', TOTAL])
+        self.assertEqual(histograms['parse'].max, 200)
+        self.assertEqual(histograms['noteon'].max, 500)
+        self.assertAlmostEqual(histograms[TOTAL].get_percentile(50), 400, delta=400 / 64)
+        self.assertEqual(histograms[TOTAL].max, 700)
+
+    def test_cancel(self):
+        self.tracker.start()
+        self.now += 1000
+        self.tracker.mark('parse')
+        self.tracker.cancel()
+        self.tracker.mark('noteon')  # Not tracking
+        self.tracker.finish()
+        self.assertEqual(list(self.tracker.histograms), ['parse'])
+
+    def test_format(self):
+        self.key_press(100, 300)
+        self.assertEqual(self.tracker.format().splitlines()[-1],
+                         'total: n=1 p50=0.40ms p95=0.40ms p99=0.40ms max=0.40ms')
+
+
+if __name__ == '__main__':
+    unittest.main()
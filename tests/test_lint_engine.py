@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.lint_engine import LintEngine
+from abcted.tune_index import TuneIndex
+
+
+TEXT = '% no tune here\n\nX:1\nT:Test\nM:4/4\nL:1/8\nK:G\nA|BcdB AGFE|D2 DE FGAB|d4 z3'
+
+
+class FakeScrolledText:
+    """The methods of ScrolledText used by the engine: the after() callbacks
+    are run by run_after()"""
+
+    def __init__(self):
+        self.after_ids = {}
+        self._next_id = 0
+
+    def tag_config(self, tag, **options):
+        pass
+
+    def tag_remove(self, tag, *indices):
+        pass
+
+    def tag_add(self, tag, *indices):
+        pass
+
+    def after(self, delay_ms, callback):
+        self._next_id += 1
+        self.after_ids[self._next_id] = callback
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        del self.after_ids[after_id]
+
+    def run_after(self, after_id):
+        self.after_ids.pop(after_id)()
+
+
+class FakeBuffer:
+    def __init__(self, text):
+        self._lines = text.split('\n')
+        self._index = TuneIndex.from_text(text)
+        self.line_no = 3
+
+    def find_tune(self, line_no):
+        return self._index.find_tune(line_no)
+
+    def get_line_no_at_cursor(self):
+        return self.line_no
+
+    def get_lines(self, first_line_no, last_line_no):
+        return self._lines[first_line_no - 1:last_line_no]
+
+
+class FakeTheme:
+    lintfg = 'red'
+
+
+class TestLintEngine(unittest.TestCase):
+    def setUp(self):
+        self.text = FakeScrolledText()
+        self.buffer = FakeBuffer(TEXT)
+        self.engine = LintEngine(self.text, self.buffer, FakeTheme())
+        self.addCleanup(self.engine.stop)
+
+    def test_no_tune_at_cursor_stops_polling(self):
+        self.engine.on_text_modified()
+        self.text.run_after(self.engine._delay_id)  # Check of the tune at the cursor
+        self.assertEqual(list(self.text.after_ids), [self.engine._poll_id])
+
+        # The text changes while the check runs, and the cursor leaves the tune
+        self.buffer.line_no = 1
+        self.engine.on_text_modified()
+        self.text.run_after(self.engine._delay_id)  # No tune at the cursor: no check
+        self.assertIsNone(self.engine._poll_id)
+        self.assertEqual(self.text.after_ids, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
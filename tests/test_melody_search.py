@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.melody_search import MelodyIndex, get_intervals, get_pitches
+from abcted.tune_index import TuneIndex
+
+
+class TestGetPitches(unittest.TestCase):
+    def test_notes(self):
+        self.assertEqual([60, 62, 72, 48, 84], get_pitches(["CDc C, c'"]))
+
+    def test_key(self):
+        self.assertEqual([66, 78], get_pitches(['K:G', 'Ff']))
+
+    def test_inline_key(self):
+        self.assertEqual([65, 66], get_pitches(['F[K:D]F']))
+
+    def test_accidentals_last_until_end_of_bar(self):
+        self.assertEqual([66, 67, 66, 65, 67, 65], get_pitches(['K:C', '^FGF=FG|F']))
+        self.assertEqual([73, 72], get_pitches(['^c2 c|c']))
+
+    def test_repeated_notes_are_merged(self):
+        self.assertEqual([69, 62], get_pitches(['A2 AA- A D']))
+
+    def test_ignored_elements(self):
+        self.assertEqual([62, 64, 65],
+                         get_pitches(['"Am"D {ga}E z [FAc]2 !trill!F % comment C']))
+
+
+class TestMelodyIndex(unittest.TestCase):
+    def setUp(self):
+        self.tunes = TuneIndex.from_text('X:1\nT:In D\nK:D\n\nX:2\nT:In G\nK:G\n').tunes
+        self.index = MelodyIndex()
+        # Same melody in D and in G
+        self.index.add_tune('/book.abc', self.tunes[0],
+                            get_intervals(get_pitches(['K:D', 'ADED A2dc|BGGF GABG|'])))
+        self.index.add_tune('/book.abc', self.tunes[1],
+                            get_intervals(get_pitches(['K:G', 'dGAG d2gf|ecc=B cdec|'])))
+
+    def test_search_in_any_key(self):
+        results = self.index.search('[K:D]ADED A2dc B')
+        self.assertEqual(['In D', 'In G'], [r.tune.title for r in results])
+        self.assertEqual([1.0, 1.0], [r.score for r in results])
+
+    def test_search_partial_match(self):
+        results = self.index.search('[K:D]ADED A2dB')
+        self.assertEqual(2, len(results))
+        self.assertLess(results[0].score, 1.0)
+
+    def test_search_no_match(self):
+        self.assertEqual([], self.index.search('CEGc egc\'g'))
+
+    def test_search_too_short(self):
+        self.assertEqual([], self.index.search('AD'))
+
+
+if __name__ == '__main__':
+    unittest.main()
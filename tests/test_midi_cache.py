@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import os
+import unittest
+from unittest import mock
+
+from abcted import abc2midi
+from abcted import midi_cache
+from abcted.midi_cache import MidiCache, get_tune_key
+
+
+TUNE = ['X:1', 'T:The Kesh', 'K:G', 'GAG GAB|ABA ABd|']
+
+
+def make_tune(i):
+    return ['X:{}'.format(i), 'K:G', 'GAG GAB|' * (i + 1)]
+
+
+class TestGetTuneKey(unittest.TestCase):
+    def test_same_tune_same_key(self):
+        self.assertEqual(get_tune_key(TUNE), get_tune_key(list(TUNE)))
+
+    def test_normalized_lines(self):
+        self.assertEqual(get_tune_key(TUNE), get_tune_key([line + '  ' for line in TUNE] + ['']))
+
+    def test_changed_tune_new_key(self):
+        self.assertNotEqual(get_tune_key(TUNE), get_tune_key(TUNE[:-1] + ['GAG GAB|']))
+
+    def test_options_in_key(self):
+        self.assertNotEqual(get_tune_key(TUNE), get_tune_key(TUNE, ('Flute',)))
+
+
+class TestMidiCache(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(midi_cache.abc2midi, 'get_midi_data',
+                                    side_effect=abc2midi.get_midi_data)
+        self.convert = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_cache(self, **kwargs):
+        cache = MidiCache(**kwargs)
+        self.addCleanup(cache.clear)
+        return cache
+
+    def test_unchanged_tune_is_converted_once(self):
+        cache = self.make_cache()
+        data = cache.get_midi_data(TUNE)
+        self.assertEqual(data, cache.get_midi_data(TUNE))
+        self.assertEqual(1, self.convert.call_count)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_midi_file(self):
+        cache = self.make_cache()
+        path = cache.get_midi_file(TUNE)
+        with open(path, 'rb') as f:
+            self.assertEqual(cache.get_midi_data(TUNE), f.read())
+        self.assertEqual(path, cache.get_midi_file(TUNE))
+        self.assertEqual(1, self.convert.call_count)
+
+    def test_spill_to_disk(self):
+        size = len(abc2midi.get_midi_data(make_tune(0)))
+        cache = self.make_cache(max_memory_size=size)
+        cache.get_midi_data(make_tune(0))
+        cache.get_midi_data(make_tune(1))  # make_tune(0) is spilled to disk
+        self.assertEqual(2, len(cache))
+        cache.get_midi_data(make_tune(0))
+        self.assertEqual(2, self.convert.call_count)
+
+    def test_disk_size_is_bounded(self):
+        size = len(abc2midi.get_midi_data(make_tune(0)))
+        cache = self.make_cache(max_memory_size=0, max_disk_size=2 * size)
+        paths = [cache.get_midi_file(make_tune(i)) for i in range(4)]
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[3]))
+        self.assertLess(len(cache), 4)
+
+    def test_clear(self):
+        cache = self.make_cache()
+        path = cache.get_midi_file(TUNE)
+        cache.clear()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(0, len(cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import struct
+import unittest
+
+from abcted.abcevents import TICKS_PER_QUARTER, parse_events
+from abcted.midi_writer import _encode_variable_length, write_midi
+
+
+def read_track(midi_data):
+    """Decode the single track of a MIDI file into (tick, message) tuples"""
+    track_length, = struct.unpack('>I', midi_data[18:22])
+    track = midi_data[22:22 + track_length]
+    messages = []
+    i = 0
+    tick = 0
+    while i < len(track):
+        delta = 0
+        while True:
+            byte = track[i]
+            i += 1
+            delta = (delta << 7) | (byte & 0x7f)
+            if byte < 0x80:
+                break
+        tick += delta
+        if track[i] == 0xff:
+            length = track[i + 2]
+            messages.append((tick, track[i:i + 3 + length]))
+            i += 3 + length
+        else:
+            messages.append((tick, track[i:i + 3]))
+            i += 3
+    return messages
+
+
+class TestWriteMidi(unittest.TestCase):
+    def test_encode_variable_length(self):
+        self.assertEqual(b'\x00', _encode_variable_length(0))
+        self.assertEqual(b'\x7f', _encode_variable_length(0x7f))
+        self.assertEqual(b'\x81\x00', _encode_variable_length(0x80))
+        self.assertEqual(b'\xff\xff\x7f', _encode_variable_length(0x1fffff))
+
+    def test_header(self):
+        midi_data = write_midi(parse_events(['X:1', 'K:C', 'C']))
+        self.assertEqual(b'MThd', midi_data[:4])
+        self.assertEqual((6, 0, 1, TICKS_PER_QUARTER), struct.unpack('>IHHH', midi_data[4:14]))
+        self.assertEqual(b'MTrk', midi_data[14:18])
+
+    def test_notes(self):
+        midi_data = write_midi(parse_events(['X:1', 'L:1/4', 'Q:1/4=100', 'K:G', 'F G']))
+        notes = [(tick, bytes(message)) for tick, message in read_track(midi_data)
+                 if message[0] & 0xf0 in (0x80, 0x90)]
+        self.assertEqual([(0, b'\x90\x42\x50'), (480, b'\x80\x42\x00'),
+                          (480, b'\x90\x43\x50'), (960, b'\x80\x43\x00')], notes)
+
+    def test_tempo_and_meter(self):
+        midi_data = write_midi(parse_events(['X:1', 'M:6/8', 'Q:1/4=100', 'K:C', 'C']))
+        meta = [bytes(message) for tick, message in read_track(midi_data) if message[0] == 0xff]
+        self.assertIn(b'\xff\x58\x04\x06\x03\x18\x08', meta)
+        self.assertIn(b'\xff\x51\x03' + (600000).to_bytes(3, 'big'), meta)
+        self.assertEqual(b'\xff\x2f\x00', meta[-1])
+
+
+class TestUnfoldRepeats(unittest.TestCase):
+    def unfold(self, body):
+        events = parse_events(['X:1', 'L:1/4', 'M:1/4', 'K:C', body])
+        return list(events.unfold_repeats().pitch)
+
+    def test_no_repeat(self):
+        self.assertEqual([60, 62], self.unfold('C|D|'))
+
+    def test_repeat(self):
+        self.assertEqual([60, 62, 60, 62, 64], self.unfold('|:C|D:|E|'))
+
+    def test_variant_endings(self):
+        self.assertEqual([60, 62, 64, 62, 65, 67], self.unfold('C|:D|1E:|2F|G|]'))
+
+    def test_two_sections(self):
+        self.assertEqual([60, 62, 60, 64, 65, 65], self.unfold('|:C|1D:|2E|]\n|:F:|'))
+
+    def test_onsets_follow_playing_order(self):
+        events = parse_events(['X:1', 'L:1/4', 'M:1/4', 'K:C', '|:C|D:|']).unfold_repeats()
+        self.assertEqual([0, 480, 960, 1440], list(events.onset))
+        self.assertEqual([0, 1, 2, 3], list(events.bar))
+
+
+if __name__ == '__main__':
+    unittest.main()
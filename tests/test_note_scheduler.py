@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import threading
+import time
+import unittest
+
+from abcted.note_scheduler import NoteScheduler
+
+
+class TestNoteScheduler(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.scheduler = NoteScheduler(
+            noteon=lambda channel, note, velocity: self.events.append(('on', note)),
+            noteoff=lambda channel, note: self.events.append(('off', note)),
+            max_voices=2)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def wait_voices(self, count, timeout=2):
+        deadline = time.monotonic() + timeout
+        while self.scheduler.get_voice_count() != count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(self.scheduler.get_voice_count(), count)
+
+    def test_note_off(self):
+        self.scheduler.play(0, 60, 1.0, 0.01)
+        self.wait_voices(0)
+        self.assertEqual(self.events, [('on', 60), ('off', 60)])
+
+    def test_polyphony(self):
+        self.scheduler.play(0, 60, 1.0, 10)
+        self.scheduler.play(0, 64, 1.0, 10)
+        self.assertEqual(self.events, [('on', 60), ('on', 64)])
+        self.assertEqual(self.scheduler.get_voice_count(), 2)
+
+    def test_voice_stealing(self):
+        for note in (60, 62, 64):
+            self.scheduler.play(0, note, 1.0, 10)
+        self.assertEqual(self.events, [('on', 60), ('on', 62), ('off', 60), ('on', 64)])
+        self.assertEqual(self.scheduler.get_voice_count(), 2)
+
+    def test_restart_note(self):
+        self.scheduler.play(0, 60, 1.0, 0.05)
+        self.scheduler.play(0, 60, 1.0, 10)
+        self.assertEqual(self.events, [('on', 60), ('off', 60), ('on', 60)])
+        # The note off of the first note is skipped: the note goes on
+        time.sleep(0.1)
+        self.assertEqual(self.scheduler.get_voice_count(), 1)
+
+    def test_single_thread(self):
+        threads = threading.active_count()
+        for i in range(50):
+            self.scheduler.play(0, 60 + i % 12, 1.0, 0.001)
+        self.assertEqual(threading.active_count(), threads + 1)
+        self.wait_voices(0)
+        self.assertEqual(self.events.count(('off', 60)), 5)
+
+    def test_all_notes_off(self):
+        self.scheduler.play(0, 60, 1.0, 10)
+        self.scheduler.play(1, 60, 1.0, 10)
+        self.scheduler.all_notes_off()
+        self.assertEqual(self.events[2:], [('off', 60), ('off', 60)])
+        self.assertEqual(self.scheduler.get_voice_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import builtins
+import os
+import subprocess
+import sys
+import tempfile
+from typing import List
+import unittest
+
+from abcted.startup_trace import StartupTrace
+
+
+ABCTED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'abcted')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPhases(unittest.TestCase):
+    def test_mark(self):
+        clock = FakeClock()
+        trace = StartupTrace(clock=clock)
+        clock.now = 0.125
+        trace.mark('imports')
+        clock.now = 0.25
+        trace.mark('tk')
+        self.assertEqual(trace.phases, [('imports', 0.125), ('tk', 0.125)])
+        self.assertEqual(trace.format(), 'startup: 250.0ms\n  imports: 125.0ms\n  tk: 125.0ms')
+
+
+class TestImportHook(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        for name, text in (('trace_outer', 'import trace_inner\n'),
+                           ('trace_inner', 'X = 1\n')):
+            with open(os.path.join(self._dir.name, name + '.py'), 'w') as f:
+                f.write(text)
+        sys.path.insert(0, self._dir.name)
+
+    def tearDown(self):
+        sys.path.remove(self._dir.name)
+        for name in ('trace_outer', 'trace_inner'):
+            sys.modules.pop(name, None)
+        self._dir.cleanup()
+
+    def test_import_hook(self):
+        trace = StartupTrace()
+        original_import = builtins.__import__
+        trace.install_import_hook()
+        try:
+            import trace_outer  # noqa: F401
+            import trace_inner  # noqa: F401  (already imported: not traced again)
+        finally:
+            trace.uninstall_import_hook()
+        self.assertIs(builtins.__import__, original_import)
+        self.assertEqual(sorted(trace.imports), ['trace_inner', 'trace_outer'])
+        self.assertTrue(all(duration >= 0 for duration in trace.imports.values()))
+        self.assertIn('imports (self time, 2 slowest of 2', trace.format())
+
+
+class TestLazyImports(unittest.TestCase):
+    """The modules that are not needed to show the window are imported on
+    first use"""
+
+    LAZY_MODULES = ('player_deck', 'search_bar', 'tune_finder', 'melody_search',
+                    'tune_index_cache', 'sqlite3', 'pyfluidsynth3')
+
+    def _get_imported_lazy_modules(self, script: str) -> List[str]:
+        # In a new interpreter, with the modules of abcted importable by
+        # their name, as in the application
+        script += ('\nimport sys\n'
+                   f'print(*(m for m in {self.LAZY_MODULES!r} if m in sys.modules))\n')
+        with tempfile.TemporaryDirectory() as home:
+            env = dict(os.environ, HOME=home)
+            output = subprocess.run([sys.executable, '-c', script], cwd=ABCTED_DIR, env=env,
+                                    stdout=subprocess.PIPE, check=True, text=True).stdout
+        return output.split()
+
+    def test_import_root_window(self):
+        self.assertEqual(self._get_imported_lazy_modules('import root_window'), [])
+
+    @unittest.skipUnless(os.environ.get('DISPLAY'), 'needs a display')
+    def test_create_root_window(self):
+        script = ('import root_window\n'
+                  'window = root_window.RootWindow()\n'
+                  'window.tk_root.update()\n'
+                  'window.tk_root.destroy()')
+        self.assertEqual(self._get_imported_lazy_modules(script), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
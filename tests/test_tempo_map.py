@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.abcevents import TICKS_PER_QUARTER, TempoMap, parse_events
+from abcted.abcparser import AbcParser
+
+
+class TestTempoMap(unittest.TestCase):
+    def test_default_tempo(self):
+        tempo_map = TempoMap(())
+        self.assertEqual(tempo_map.tick_to_seconds(2 * TICKS_PER_QUARTER), 1.0)
+        self.assertEqual(tempo_map.seconds_to_tick(1.0), 2 * TICKS_PER_QUARTER)
+
+    def test_tempo_changes(self):
+        # 4 quarter notes at 60 qpm, then 120 qpm
+        tempo_map = TempoMap([(0, 60), (4 * TICKS_PER_QUARTER, 120)])
+        self.assertEqual(len(tempo_map), 2)
+        self.assertEqual(tempo_map.tick_to_seconds(4 * TICKS_PER_QUARTER), 4.0)
+        self.assertEqual(tempo_map.tick_to_seconds(6 * TICKS_PER_QUARTER), 5.0)
+        self.assertEqual(tempo_map.seconds_to_tick(5.0), 6 * TICKS_PER_QUARTER)
+        self.assertEqual(tempo_map.seconds_to_tick(2.0), 2 * TICKS_PER_QUARTER)
+        self.assertEqual(tempo_map.get_qpm(4 * TICKS_PER_QUARTER - 1), 60)
+
+    def test_round_trip(self):
+        tempo_map = TempoMap([(0, 97), (1000, 133.5), (5000, 61)])
+        for tick in range(0, 10000, 37):
+            self.assertEqual(tempo_map.seconds_to_tick(tempo_map.tick_to_seconds(tick)), tick)
+
+    def test_unsorted_tempos(self):
+        tempo_map = TempoMap([(960, 60), (0, 30), (0, 60)])
+        self.assertEqual(list(tempo_map.ticks), [0, 960])
+        self.assertEqual(tempo_map.tick_to_seconds(960), 2.0)  # 2 quarter notes at 60 qpm
+
+    def test_inline_tempo(self):
+        events = parse_events(['X:1', 'L:1/4', 'Q:1/4=60', 'K:C', 'CDEF|[Q:1/4=120]GABc|'])
+        tempo_map = events.get_tempo_map()
+        self.assertEqual(tempo_map.tick_to_seconds(events.end_tick), 6.0)
+
+
+class TestAbcParserTempo(unittest.TestCase):
+    def get_tempo(self, *header):
+        parser = AbcParser(['X:1'] + list(header) + ['K:G'])
+        return parser.tempo_qpm, parser.tempo_bpm
+
+    def test_no_tempo(self):
+        self.assertEqual(self.get_tempo(), (120, 120))
+
+    def test_tempo_with_note_length(self):
+        self.assertEqual(self.get_tempo('M:6/8', 'Q:3/8=120'), (180, 120))
+
+    def test_tempo_with_default_note_length(self):
+        self.assertEqual(self.get_tempo('M:4/4', 'L:1/8', 'Q:200'), (100, 100))
+
+    def test_tempo_with_meter_note_length(self):
+        self.assertEqual(self.get_tempo('M:2/4', 'Q:200'), (50, 50))
+
+    def test_cut_time(self):
+        self.assertEqual(self.get_tempo('M:C|', 'Q:1/2=60'), (120, 60))
+
+
+if __name__ == '__main__':
+    unittest.main()
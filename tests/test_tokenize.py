@@ -0,0 +1,97 @@
+import unittest
+
+
+from abcted.abctokenizer import tokenize, tokenize_line, split_note, Token, TokenCache, \
+    FIELD, COMMENT, NOTE, REST, BAR, CHORD_START, CHORD_END, TUPLET, \
+    DECORATION, ANNOTATION, INLINE_FIELD, BROKEN_RHYTHM, GRACE_START, GRACE_END
+
+
+class TestTokenizeLine(unittest.TestCase):
+    def _kinds(self, line):
+        return [token.kind for token in tokenize_line(line)]
+
+    def test_field_line(self):
+        self.assertEqual((Token(FIELD, 0, 'K:Gmaj'),), tokenize_line('K:Gmaj'))
+
+    def test_comment_line(self):
+        self.assertEqual((Token(COMMENT, 0, '  % a comment'),),
+                         tokenize_line('  % a comment'))
+
+    def test_notes_and_bars(self):
+        self.assertEqual((Token(BAR, 0, '|:'), Token(NOTE, 2, 'D'),
+                          Token(NOTE, 3, "^f'3/2"), Token(NOTE, 10, 'A,/'),
+                          Token(BAR, 14, ':|')),
+                         tokenize_line("|:D^f'3/2 A,/ :|"))
+
+    def test_rest(self):
+        self.assertEqual([REST, NOTE, REST], self._kinds('z2 A x/'))
+
+    def test_chord(self):
+        self.assertEqual((Token(CHORD_START, 0, '['), Token(NOTE, 1, 'D'),
+                          Token(NOTE, 2, 'F'), Token(CHORD_END, 3, ']2')),
+                         tokenize_line('[DF]2'))
+
+    def test_variant_endings(self):
+        self.assertEqual([BAR, NOTE, BAR, BAR, NOTE, BAR],
+                         self._kinds('[1 d2 :|[2 e2 |]'))
+
+    def test_inline_field(self):
+        self.assertEqual((Token(INLINE_FIELD, 0, '[K:D]'), Token(NOTE, 5, 'c')),
+                         tokenize_line('[K:D]c'))
+
+    def test_tuplet(self):
+        self.assertEqual([TUPLET, NOTE, NOTE, NOTE], self._kinds('(3DEF'))
+
+    def test_decorations_and_annotations(self):
+        self.assertEqual([DECORATION, NOTE, DECORATION, NOTE, ANNOTATION, NOTE],
+                         self._kinds('~d !trill!e "Am"A'))
+
+    def test_broken_rhythm_and_grace_notes(self):
+        self.assertEqual([NOTE, BROKEN_RHYTHM, GRACE_START, NOTE, GRACE_END, NOTE],
+                         self._kinds('A>{g}B'))
+
+    def test_trailing_comment(self):
+        self.assertEqual([NOTE, COMMENT], self._kinds('A % comment'))
+
+
+class TestTokenize(unittest.TestCase):
+    def test_one_tuple_per_line(self):
+        tokens = tokenize(['X:1', 'K:C', 'CDE|'])
+        self.assertEqual(3, len(tokens))
+        self.assertEqual(Token(NOTE, 1, 'D'), tokens[2][1])
+
+
+class TestTokenCache(unittest.TestCase):
+    def test_same_tokens_as_tokenize(self):
+        raw_tune = ['X:1', 'K:C', 'CDE|[CEG]2 z2|']
+        self.assertEqual(tokenize(raw_tune), TokenCache().tokenize(raw_tune))
+
+    def test_unchanged_lines_are_reused(self):
+        cache = TokenCache()
+        tokens = cache.tokenize(['K:C', 'CDE|'])
+        new_tokens = cache.tokenize(['K:C', 'CDEF|'])
+        self.assertIs(tokens[0], new_tokens[0])
+        self.assertIsNot(tokens[1], new_tokens[1])
+
+    def test_bounded_size(self):
+        cache = TokenCache(max_lines=2)
+        cache.tokenize(['A', 'B', 'C', 'D', 'E'])
+        self.assertLessEqual(len(cache), 4)
+
+    def test_recent_lines_survive_eviction(self):
+        cache = TokenCache(max_lines=2)
+        tokens = cache.tokenize_line('A')
+        cache.tokenize(['B', 'A', 'C', 'A', 'D'])
+        self.assertIs(tokens, cache.tokenize_line('A'))
+
+
+class TestSplitNote(unittest.TestCase):
+    def test_full_note(self):
+        self.assertEqual(('^', 'f', "'", '3/2'), split_note("^f'3/2"))
+
+    def test_simple_note(self):
+        self.assertEqual(('', 'C', ',,', ''), split_note('C,,'))
+
+
+if __name__ == '__main__':
+    unittest.main()
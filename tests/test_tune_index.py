@@ -0,0 +1,80 @@
+import unittest
+
+
+from abcted.tune_index import TuneIndex
+
+
+TUNEBOOK = """\
+% Tunebook header
+K:G
+
+X:1
+T:The Kesh
+T:Kesh Jig
+R:jig
+M:6/8
+L:1/8
+K:G
+GAG GAB|ABA ABd|
+K:D
+def gfe|
+
+X:2
+T:Tam Lin
+K:Dmix
+X:3
+T:Sporting Nell
+K:Ador
+"""
+
+
+class TestTuneIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TuneIndex.from_text(TUNEBOOK)
+
+    def test_tunes(self):
+        self.assertEqual(['1', '2', '3'], [tune.x for tune in self.index.tunes])
+
+    def test_boundaries(self):
+        self.assertEqual([(4, 13), (15, 17), (18, 20)],
+                         [(tune.start_line, tune.end_line) for tune in self.index.tunes])
+
+    def test_header_fields(self):
+        tune = self.index.tunes[0]
+        self.assertEqual(['The Kesh', 'Kesh Jig'], tune.titles)
+        self.assertEqual('The Kesh', tune.title)
+        self.assertEqual('jig', tune.rhythm)
+        self.assertEqual('6/8', tune.raw_meter)
+        self.assertEqual('1/8', tune.raw_note_length)
+        self.assertEqual('G', tune.raw_key)
+
+    def test_find_tune(self):
+        self.assertIsNone(self.index.find_tune(2))
+        self.assertEqual('1', self.index.find_tune(4).x)
+        self.assertEqual('1', self.index.find_tune(13).x)
+        self.assertEqual('1', self.index.find_tune(14).x)  # Between two tunes
+        self.assertEqual('2', self.index.find_tune(17).x)
+        self.assertEqual('3', self.index.find_tune(18).x)
+
+    def test_update(self):
+        lines = TUNEBOOK.split('\n')
+        for first_line_no, old_line_count, new_lines in [
+                (12, 1, ['GAG GAB|', '', 'X:4', 'T:Split']),  # Split a tune
+                (13, 1, ['ABc|']),                             # Join them again
+                (1, 0, ['X:0', 'K:C']),                        # Tune at the start
+                (7, 4, []),                                    # Delete a header
+                (20, 3, ['X:5'])]:                             # Change the end
+            lines[first_line_no - 1:first_line_no - 1 + old_line_count] = new_lines
+            self.index.update(first_line_no, old_line_count, len(new_lines),
+                              lambda first, last: lines[first - 1:last])
+            rebuilt = TuneIndex.from_lines(lines)
+            self.assertEqual(
+                [[getattr(tune, name) for name in tune.__slots__] for tune in self.index.tunes],
+                [[getattr(tune, name) for name in tune.__slots__] for tune in rebuilt.tunes])
+            self.assertEqual(self.index.line_count, rebuilt.line_count)
+            self.assertEqual([self.index.find_tune(line_no) is None for line_no in range(1, len(lines))],
+                             [rebuilt.find_tune(line_no) is None for line_no in range(1, len(lines))])
+
+
+if __name__ == '__main__':
+    unittest.main()
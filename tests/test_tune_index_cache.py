@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+from abcted import tune_index_cache
+
+
+TUNEBOOK = """\
+X:1
+T:The Kesh
+K:G
+GAG GAB|ABA ABd|
+
+X:2
+T:Tam Lin
+K:Dmix
+A2FA DAFA|
+"""
+
+
+class TestTuneIndexCache(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = mock.patch.object(tune_index_cache, 'TUNE_INDEX_CACHE_PATH',
+                                    os.path.join(tmp_dir.name, 'config', 'cache.sqlite'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.path = os.path.join(tmp_dir.name, 'tunes.abc')
+        self._write(TUNEBOOK)
+
+    def _write(self, text, mtime_ns=None):
+        with open(self.path, 'w') as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def _load_index(self):
+        """Load the index and tell whether the file had to be indexed"""
+        with mock.patch.object(tune_index_cache.Tunebook, '_build_index',
+                               autospec=True,
+                               side_effect=tune_index_cache.Tunebook._build_index) as build:
+            index = tune_index_cache.load_index(self.path)
+        return index, build.called
+
+    def test_first_load_indexes_the_file(self):
+        index, indexed = self._load_index()
+        self.assertTrue(indexed)
+        self.assertEqual(['The Kesh', 'Tam Lin'], [tune.title for tune in index.tunes])
+
+    def test_second_load_uses_the_cache(self):
+        self._load_index()
+        index, indexed = self._load_index()
+        self.assertFalse(indexed)
+        self.assertEqual(['The Kesh', 'Tam Lin'], [tune.title for tune in index.tunes])
+        self.assertEqual('Dmix', index.tunes[1].raw_key)
+        self.assertEqual(6, index.find_tune(9).start_line)
+
+    def test_modified_file_is_indexed_again(self):
+        self._write(TUNEBOOK, mtime_ns=1000000000)
+        self._load_index()
+        self._write(TUNEBOOK.replace('Tam Lin', 'Tam Lim'), mtime_ns=2000000000)
+        index, indexed = self._load_index()
+        self.assertTrue(indexed)
+        self.assertEqual('Tam Lim', index.tunes[1].title)
+
+    def test_touched_file_uses_the_cache(self):
+        self._write(TUNEBOOK, mtime_ns=1000000000)
+        self._load_index()
+        self._write(TUNEBOOK, mtime_ns=2000000000)
+        index, indexed = self._load_index()
+        self.assertFalse(indexed)
+        self.assertEqual(2, len(index))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+import unittest
+
+from abcted.tune_index import TuneIndex
+from abcted.tune_search import TuneSearchIndex, normalize_key, normalize_text
+
+
+TUNEBOOK_1 = '''X:1
+T:The Kesh
+T:Kesh Jig
+R:jig
+M:6/8
+K:G
+GAG GAB|
+
+X:2
+T:Drowsy Maggie
+R:reel
+C:Trad.
+O:Irlande
+M:4/4
+K:Edor
+E2BE dEBE|
+
+X:3
+T:Gavotte d'Honneur
+R:gavotte
+K:D mixolydian
+A2dc|
+'''
+
+TUNEBOOK_2 = '''X:1
+T:The Butterfly
+R:slip jig
+M:9/8
+K:Em
+B2E G2E F3|
+'''
+
+
+class TestNormalize(unittest.TestCase):
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("Gavotte d'Hônneur"), "gavotte d'honneur")
+
+    def test_normalize_key(self):
+        self.assertEqual(normalize_key('G'), 'gmaj')
+        self.assertEqual(normalize_key('Gmaj'), 'gmaj')
+        self.assertEqual(normalize_key('G major'), 'gmaj')
+        self.assertEqual(normalize_key('Em'), 'emin')
+        self.assertEqual(normalize_key('E minor'), 'emin')
+        self.assertEqual(normalize_key('Eaeolian'), 'emin')
+        self.assertEqual(normalize_key('D mixolydian'), 'dmix')
+        self.assertEqual(normalize_key('F#m'), 'f#min')
+        self.assertEqual(normalize_key('Bb'), 'bbmaj')
+        self.assertEqual(normalize_key('HP'), 'hp')
+
+
+class TestTuneSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TuneSearchIndex()
+        self.index.add_tunebook('/book1.abc', TuneIndex.from_text(TUNEBOOK_1))
+        self.index.add_tunebook('/book2.abc', TuneIndex.from_text(TUNEBOOK_2))
+
+    def search(self, query):
+        return [(r.path, r.tune.x) for r in self.index.search(query)]
+
+    def test_len(self):
+        self.assertEqual(len(self.index), 4)
+
+    def test_search_title(self):
+        self.assertEqual(self.search('kesh'), [('/book1.abc', '1')])
+        self.assertEqual(self.search('THE'), [('/book1.abc', '1'), ('/book2.abc', '1')])
+
+    def test_search_all_words(self):
+        self.assertEqual(self.search('the butterfly'), [('/book2.abc', '1')])
+
+    def test_search_accents(self):
+        self.assertEqual(self.search('irlande'), [('/book1.abc', '2')])
+        self.assertEqual(self.search('hônneur'), [('/book1.abc', '3')])
+
+    def test_search_field(self):
+        self.assertEqual(self.search('r:jig'), [('/book1.abc', '1'), ('/book2.abc', '1')])
+        self.assertEqual(self.search('r:jig m:9/8'), [('/book2.abc', '1')])
+        self.assertEqual(self.search('c:trad'), [('/book1.abc', '2')])
+        self.assertEqual(self.search('t:jig'), [('/book1.abc', '1')])
+
+    def test_search_key(self):
+        self.assertEqual(self.search('k:G'), [('/book1.abc', '1')])
+        self.assertEqual(self.search('k:Gmajor'), [('/book1.abc', '1')])
+        self.assertEqual(self.search('k:Emin'), [('/book2.abc', '1')])
+        self.assertEqual(self.search('k:Dmix'), [('/book1.abc', '3')])
+
+    def test_search_key_with_spaced_mode(self):
+        self.assertEqual(self.search('k:G major'), [('/book1.abc', '1')])
+        self.assertEqual(self.search('k:G maj'), [('/book1.abc', '1')])
+        self.assertEqual(self.search('k:E dorian'), [('/book1.abc', '2')])
+        self.assertEqual(self.search('K:E m'), [('/book2.abc', '1')])
+        self.assertEqual(self.search('k:D mixolydian gavotte'), [('/book1.abc', '3')])
+        # A word that is not a mode is a word of the query
+        self.assertEqual(self.search('k:G kesh'), [('/book1.abc', '1')])
+        self.assertEqual(self.search('k:G maggie'), [])
+
+    def test_search_fuzzy_title(self):
+        results = self.index.search('drowsey magie')
+        self.assertEqual([(r.path, r.tune.x) for r in results], [('/book1.abc', '2')])
+        self.assertLess(results[0].score, 1.0)
+
+    def test_search_fuzzy_with_field(self):
+        self.assertEqual(self.search('butterfli r:reel'), [])
+
+    def test_search_max_results(self):
+        self.assertEqual(len(self.index.search('the', max_results=1)), 1)
+
+    def test_search_nothing(self):
+        self.assertEqual(self.search(''), [])
+        self.assertEqual(self.search('xyzzy'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
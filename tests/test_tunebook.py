@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+
+from abcted.tune_index import TuneIndex
+from abcted.tunebook import Tunebook
+
+
+TUNEBOOK = """\
+% Tunebook header
+
+X:1
+T:The Kesh
+K:G
+GAG GAB|ABA ABd|
+
+ X:2
+T:Tam Lin
+K:Dmix
+A2FA DAFA|
+X:3
+T:Sporting Nell
+K:Ador
+e2ae ageg|"""
+
+
+class TestTunebook(unittest.TestCase):
+    def _write(self, data: bytes):
+        with tempfile.NamedTemporaryFile(suffix='.abc', delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_same_index_as_text_index(self):
+        path = self._write(TUNEBOOK.encode('utf-8'))
+        text_index = TuneIndex.from_text(TUNEBOOK)
+        with Tunebook(path) as tunebook:
+            self.assertEqual(
+                [(t.start_line, t.end_line, t.x, t.titles, t.raw_key) for t in text_index.tunes],
+                [(t.start_line, t.end_line, t.x, t.titles, t.raw_key) for t in tunebook.index.tunes])
+
+    def test_get_raw_tune(self):
+        path = self._write(TUNEBOOK.encode('utf-8'))
+        with Tunebook(path) as tunebook:
+            tunes = tunebook.index.tunes
+            self.assertEqual(['X:1', 'T:The Kesh', 'K:G', 'GAG GAB|ABA ABd|'],
+                             tunebook.get_raw_tune(tunes[0]))
+            self.assertEqual(' X:2', tunebook.get_raw_tune(tunes[1])[0])
+            self.assertEqual('e2ae ageg|', tunebook.get_raw_tune(tunes[2])[-1])
+
+    def test_crlf(self):
+        path = self._write(TUNEBOOK.replace('\n', '\r\n').encode('utf-8'))
+        with Tunebook(path) as tunebook:
+            self.assertEqual(3, len(tunebook.index))
+            self.assertEqual('G', tunebook.index.tunes[0].raw_key)
+            self.assertEqual(['X:1', 'T:The Kesh', 'K:G', 'GAG GAB|ABA ABd|'],
+                             tunebook.get_raw_tune(tunebook.index.tunes[0]))
+
+    def test_non_ascii(self):
+        path = self._write('X:1\nT:Crêpes à gogo\nK:D\ndefg|\n'.encode('utf-8'))
+        with Tunebook(path) as tunebook:
+            tune = tunebook.index.tunes[0]
+            self.assertEqual('Crêpes à gogo', tune.title)
+            self.assertEqual('defg|', tunebook.get_raw_tune(tune)[-1])
+
+    def test_form_feed(self):
+        # Only '\n' ends a line, as in the index and in the edit zone
+        path = self._write('X:1\nT:Page\nK:G\nGAG\fGAB|\r\nABA|\n\nX:2\nK:D\n'.encode('utf-8'))
+        with Tunebook(path) as tunebook:
+            tune = tunebook.index.tunes[0]
+            raw_tune = tunebook.get_raw_tune(tune)
+            self.assertEqual(['X:1', 'T:Page', 'K:G', 'GAG\fGAB|', 'ABA|'], raw_tune[:5])
+            self.assertEqual(tune.end_line - tune.start_line + 1, len(raw_tune))
+
+    def test_empty_file(self):
+        path = self._write(b'')
+        with Tunebook(path) as tunebook:
+            self.assertEqual(0, len(tunebook.index))
+
+
+if __name__ == '__main__':
+    unittest.main()